@@ -0,0 +1,455 @@
+import os
+import sys
+import threading
+import time
+import random
+import tracemalloc
+from datetime import datetime
+from difflib import SequenceMatcher
+
+from fuzzy_index import FuzzyIndex
+from graph import Graph
+from trie import Trie, PhoneBookTrie
+from radix_trie import RadixTrie
+from shardovani_graf import ShardovaniGraf
+
+BROJ_POZIVA = 200000
+BROJ_TELEFONA = 10000
+BROJ_KONTAKATA = 100000
+SEED = 2025
+
+
+def generisi_pozive(broj_poziva, broj_telefona, seed=SEED):
+    rnd = random.Random(seed)
+    brojevi = ["0%09d" % rnd.randrange(10 ** 9) for _ in range(broj_telefona)]
+    pocetak = datetime(2025, 1, 1).timestamp()
+    raspon = 260 * 24 * 3600
+
+    pozivi = []
+    for _ in range(broj_poziva):
+        caller = rnd.choice(brojevi)
+        callee = rnd.choice(brojevi)
+        while callee == caller:
+            callee = rnd.choice(brojevi)
+        vreme = pocetak + rnd.randrange(raspon)
+        pozivi.append((caller, callee, rnd.randrange(0, 3600), vreme))
+    return pozivi
+
+
+def ocekuj(uslov, poruka):
+    # Provere ispravnosti; ne koristi se assert da bi radile i sa python -O
+    if not uslov:
+        raise AssertionError(poruka)
+
+
+def izgradi_graf(pozivi, skladiste):
+    graph = Graph(skladiste)
+    for caller, callee, trajanje, vreme in pozivi:
+        graph.add_call(caller, callee, trajanje, datetime.fromtimestamp(vreme))
+    return graph
+
+
+def memorija_skladista(pozivi):
+    print(f"Poredjenje skladista za {len(pozivi)} poziva")
+    print(f"{'Skladiste':<10} | {'Memorija (MB)':>14} | {'Vrh (MB)':>10} | {'Vreme (s)':>10}")
+    print("-" * 54)
+
+    grafovi = {}
+    for skladiste in ('objekti', 'kolone'):
+        # Vreme se meri bez tracemalloc-a, koji usporava svaku alokaciju
+        start = time.perf_counter()
+        izgradi_graf(pozivi, skladiste)
+        trajanje = time.perf_counter() - start
+
+        tracemalloc.start()
+        graph = izgradi_graf(pozivi, skladiste)
+        trenutno, vrh = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        grafovi[skladiste] = graph
+        print(f"{skladiste:<10} | {trenutno / 2 ** 20:>14.1f} | {vrh / 2 ** 20:>10.1f} | {trajanje:>10.2f}")
+
+    return grafovi
+
+
+def uporedi_rezultate(grafovi, broj_provera=200):
+    objekti = grafovi['objekti']
+    kolone = grafovi['kolone']
+    brojevi = list(objekti.nodes.keys())[:broj_provera]
+
+    for broj in brojevi:
+        ocekuj(objekti.izracunaj_popularnost(broj) == kolone.izracunaj_popularnost(broj),
+               f"popularnost {broj} se razlikuje izmedju skladista")
+
+        a = [(e.izvor, e.destinacija, e.trajanjePoziva, e.vremePoziva) for e in objekti.istorija_poziva(broj)]
+        b = [(e.izvor, e.destinacija, e.trajanjePoziva, e.vremePoziva) for e in kolone.istorija_poziva(broj)]
+        ocekuj(a == b, f"istorija {broj} se razlikuje izmedju skladista")
+
+
+def popularnost_iz_pocetka(graph, broj):
+    # Originalna formula, sa prolazom kroz sve dolazece pozive
+    node = graph.get_node(broj)
+    if not node or not node.dolazeci:
+        return 0.0
+
+    dolazeci_broj = len(node.dolazeci)
+    direktni_skor = dolazeci_broj * 10 + (node.trajanje_dolazecih / 60.0) * 0.5
+
+    suma_pozivalaca = 0
+    for call in node.dolazeci:
+        suma_pozivalaca += graph.get_node(graph.skladiste.izvor(call)).get_broj_dolazecih()
+
+    return direktni_skor + (suma_pozivalaca / dolazeci_broj) * 2
+
+
+def proveri_skorove(graph, kada):
+    for broj in graph.nodes:
+        skor = graph.izracunaj_popularnost(broj)
+        ocekivano = popularnost_iz_pocetka(graph, broj)
+        ocekuj(skor == ocekivano, f"popularnost {broj} {kada}: {skor} umesto {ocekivano}")
+
+
+def provera_popularnosti(pozivi, skladiste='objekti'):
+    # Pola poziva ide masovno, ostatak jedan po jedan uz citanje skorova izmedju,
+    # i posle svakog koraka svi skorovi moraju biti isti kao ponovo izracunati
+    graph = Graph(skladiste)
+    polovina = len(pozivi) // 2
+    graph.add_calls([(a, b, t, datetime.fromtimestamp(v)) for a, b, t, v in pozivi[:polovina]])
+
+    for i, (caller, callee, trajanje, vreme) in enumerate(pozivi[polovina:]):
+        graph.add_call(caller, callee, trajanje, datetime.fromtimestamp(vreme))
+        graph.izracunaj_popularnost(callee)
+
+        if i % 1000 == 0:
+            proveri_skorove(graph, f"({skladiste}) posle {polovina + i + 1} poziva")
+
+    proveri_skorove(graph, f"({skladiste}) na kraju")
+
+
+IMENA = ['Marko', 'Marija', 'Marijana', 'Milan', 'Milica', 'Jovan', 'Jelena', 'Nikola', 'Nina',
+         'Stefan', 'Sanja', 'Petar', 'Pavle', 'Ana', 'Andrej', 'Dragan', 'Dragana', 'Ivan', 'Ivana']
+PREZIMENA = ['Petrovic', 'Jovanovic', 'Markovic', 'Nikolic', 'Ilic', 'Pavlovic', 'Popovic',
+             'Stojanovic', 'Bujas', 'Djordjevic', 'Kovacevic', 'Lazic', 'Savic', 'Milosevic']
+
+
+def generisi_kontakte(broj_kontakata, seed=SEED):
+    rnd = random.Random(seed)
+    kontakti = []
+    for _ in range(broj_kontakata):
+        broj = "0%d%d" % (rnd.randrange(10, 99), rnd.randrange(10 ** 6, 10 ** 8))
+        kontakti.append((broj, rnd.choice(IMENA), rnd.choice(PREZIMENA) + rnd.choice(['', 'a', 'ic'])))
+    return kontakti
+
+
+def poredjenje_trie(kontakti, broj_upita=2000):
+    print(f"\nPoredjenje Trie i RadixTrie za {len(kontakti)} kontakata")
+    print(f"{'Struktura':<10} | {'Memorija (MB)':>14} | {'Unos (s)':>9} | {'search (us)':>12} | {'autocomplete (us)':>18}")
+    print("-" * 75)
+
+    rnd = random.Random(SEED)
+    upiti = [rnd.choice(kontakti)[0] for _ in range(broj_upita)]
+    prefiksi = [broj[:rnd.randrange(2, 6)] for broj in upiti]
+
+    imenici = {}
+    for naziv, klasa in (('Trie', Trie), ('RadixTrie', RadixTrie)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        imenik = PhoneBookTrie(klasa)
+        for broj, ime, prezime in kontakti:
+            imenik.add_contact(broj, ime, prezime)
+        unos = time.perf_counter() - start
+        trenutno, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for broj in upiti:
+            imenik.phone_trie.search(broj)
+        search = (time.perf_counter() - start) / broj_upita * 1e6
+
+        start = time.perf_counter()
+        for prefiks in prefiksi:
+            imenik.autocomplete_phone(prefiks)
+        autocomplete = (time.perf_counter() - start) / broj_upita * 1e6
+
+        imenici[naziv] = imenik
+        print(f"{naziv:<10} | {trenutno / 2 ** 20:>14.1f} | {unos:>9.2f} | {search:>12.1f} | {autocomplete:>18.1f}")
+
+    trie, radix = imenici['Trie'], imenici['RadixTrie']
+    for p in prefiksi[:200]:
+        ocekuj(trie.autocomplete_phone(p) == radix.autocomplete_phone(p), f"autocomplete '{p}' se razlikuje")
+        ocekuj(trie.search_by_first_name(p[:1]) == radix.search_by_first_name(p[:1]),
+               f"pretraga imena '{p[:1]}' se razlikuje")
+
+
+def provera_fuzzy_pretrage(kontakti, max_edits=2):
+    # Tacna rec i tacan prefiks moraju doci na rastojanju 0, ispred svih priblizno slicnih
+    for klasa in (Trie, RadixTrie):
+        imenik = PhoneBookTrie(klasa)
+        for broj, ime, prezime in kontakti:
+            imenik.add_contact(broj, ime, prezime)
+
+        trie = imenik.first_name_trie
+        for ime in IMENA:
+            kljuc = trie._normalize_key(ime)
+            for upit, prefiks in ((kljuc, False), (kljuc, True), (kljuc[:3], True)):
+                rezultati = trie.fuzzy_search(upit, max_edits, prefix=prefiks)
+                ocekuj(rezultati and rezultati[0][2] == 0, f"{klasa.__name__}: '{upit}' nije prvi na rastojanju 0")
+                for rec, _, rastojanje in rezultati:
+                    tacno = rec.startswith(upit) if prefiks else rec == upit
+                    ocekuj(not tacno or rastojanje == 0,
+                           f"{klasa.__name__}: '{rec}' za '{upit}' (prefix={prefiks}) na rastojanju {rastojanje}")
+
+
+def did_you_mean_linearno(upit, brojevi):
+    # Originalni did_you_mean: SequenceMatcher protiv svakog broja u imeniku
+    slicnosti = []
+
+    for broj in brojevi:
+        skor = SequenceMatcher(None, upit, broj).ratio()
+        if skor > 0.5:
+            slicnosti.append((broj, skor))
+
+    slicnosti.sort(key=lambda x: x[1], reverse=True)
+    return slicnosti[:5]
+
+
+def pogresno_otkucaj(broj, rnd):
+    cifre = list(broj)
+    for _ in range(rnd.randrange(1, 3)):
+        i = rnd.randrange(len(cifre))
+        izmena = rnd.randrange(3)
+        if izmena == 0:
+            cifre[i] = rnd.choice('0123456789')
+        elif izmena == 1 and len(cifre) > 4:
+            del cifre[i]
+        else:
+            cifre.insert(i, rnd.choice('0123456789'))
+    return ''.join(cifre)
+
+
+def poredjenje_did_you_mean(kontakti, broj_upita=100):
+    brojevi = list(dict.fromkeys(broj for broj, _, _ in kontakti))
+    rnd = random.Random(SEED)
+    upiti = [pogresno_otkucaj(rnd.choice(brojevi), rnd) for _ in range(broj_upita)]
+
+    start = time.perf_counter()
+    indeks = FuzzyIndex(brojevi)
+    izgradnja = time.perf_counter() - start
+
+    start = time.perf_counter()
+    linearno = [did_you_mean_linearno(upit, brojevi) for upit in upiti]
+    vreme_linearno = (time.perf_counter() - start) / broj_upita * 1000
+
+    start = time.perf_counter()
+    indeksirano = [indeks.suggest(upit, 5) for upit in upiti]
+    vreme_indeks = (time.perf_counter() - start) / broj_upita * 1000
+
+    # Pozicije na kojima indeks daje predlog istog skora kao linearna pretraga
+    # (medju brojevima istog skora redosled moze da se razlikuje)
+    pogodaka = sum(1 for a, i in zip(linearno, indeksirano)
+                   for (_, skor_a), (_, skor_i) in zip(a, i) if skor_a == skor_i)
+    ukupno = sum(len(a) for a in linearno)
+    prvi_isti = sum(1 for a, i in zip(linearno, indeksirano) if a[:1] == i[:1])
+
+    print(f"\ndid_you_mean za {len(brojevi)} brojeva ({broj_upita} upita)")
+    print(f"Linearno:  {vreme_linearno:8.2f} ms/upit")
+    print(f"Indeks:    {vreme_indeks:8.2f} ms/upit (izgradnja {izgradnja:.2f}s)")
+    print(f"Isti skor u top 5: {pogodaka / ukupno if ukupno else 1:.1%} | isti prvi predlog: {prvi_isti / broj_upita:.1%}")
+
+
+def stres_test_konkurentnosti(pozivi, trajanje=2.0, citalaca=(0, 1, 2, 4, 8)):
+    # Jedan pisac dodaje pozive dok citaoci mesaju upite nad grafom i imenikom; broje se
+    # operacije i greske (npr. "dictionary changed size during iteration")
+    brojevi = sorted({caller for caller, _, _, _ in pozivi})
+    imena = generisi_kontakte(len(brojevi))
+    polovina = len(pozivi) // 2
+    rezultati = []
+
+    for broj_citalaca in citalaca:
+        graph = Graph()
+        graph.add_calls([(a, b, t, datetime.fromtimestamp(v)) for a, b, t, v in pozivi[:polovina]])
+        imenik = PhoneBookTrie()
+        for broj, (_, ime, prezime) in zip(brojevi, imena):
+            imenik.add_contact(broj, ime, prezime)
+
+        kraj = threading.Event()
+        brojaci = [0] * (broj_citalaca + 1)
+        greske = []
+
+        def skor(kontakt):
+            return graph.izracunaj_popularnost(kontakt['phone'])
+
+        def pisac():
+            try:
+                for i, (caller, callee, trajanje_poziva, vreme) in enumerate(pozivi[polovina:]):
+                    if kraj.is_set():
+                        break
+                    graph.add_call(caller, callee, trajanje_poziva, datetime.fromtimestamp(vreme))
+                    brojaci[0] += 1
+            except Exception as e:
+                greske.append(repr(e))
+
+        def citalac(indeks):
+            rnd = random.Random(indeks)
+            try:
+                while not kraj.is_set():
+                    broj = rnd.choice(brojevi)
+                    operacija = rnd.randrange(5)
+                    if operacija == 0:
+                        graph.istorija_poziva(broj)
+                    elif operacija == 1:
+                        graph.top_pop_brojevi(10)
+                    elif operacija == 2:
+                        graph.rang_broja(broj)
+                    elif operacija == 3:
+                        graph.pozivi_u_intervalu(broj, najnoviji_prvo=True, limit=20)
+                    else:
+                        imenik.refresh_scores(graph.preuzmi_promenjene_skorove())
+                        with graph.citanje():
+                            imenik.ranked_autocomplete_last_name(rnd.choice(PREZIMENA)[:2], skor, 10)
+                    brojaci[indeks] += 1
+            except Exception as e:
+                greske.append(repr(e))
+
+        niti = [threading.Thread(target=pisac)]
+        niti += [threading.Thread(target=citalac, args=(i,)) for i in range(1, broj_citalaca + 1)]
+        start = time.perf_counter()
+        for nit in niti:
+            nit.start()
+        kraj.wait(trajanje)
+        kraj.set()
+        for nit in niti:
+            nit.join()
+        proteklo = time.perf_counter() - start
+
+        ispravno = all(graph.izracunaj_popularnost(broj) == popularnost_iz_pocetka(graph, broj)
+                       for broj in graph.nodes)
+        rezultati.append((broj_citalaca, brojaci[0] / proteklo, sum(brojaci[1:]) / proteklo,
+                          len(greske), ispravno))
+        if greske:
+            print(f"  Prva greska ({broj_citalaca} citalaca): {greske[0]}")
+
+    print(f"\nKonkurentni unos i upiti ({trajanje:g}s po merenju, 1 pisac)")
+    print(f"{'Citalaca':>8} | {'Upisa/s':>9} | {'Upita/s':>9} | {'Gresaka':>7} | Skorovi ispravni")
+    for broj_citalaca, upisa, upita, gresaka, ispravno in rezultati:
+        print(f"{broj_citalaca:>8} | {upisa:>9,.0f} | {upita:>9,.0f} | {gresaka:>7} | {ispravno}")
+    for broj_citalaca, _, _, gresaka, ispravno in rezultati:
+        ocekuj(gresaka == 0, f"{gresaka} gresaka sa {broj_citalaca} citalaca")
+        ocekuj(ispravno, f"skorovi posle konkurentnog unosa nisu ispravni ({broj_citalaca} citalaca)")
+
+
+def poredjenje_shardova(pozivi, shardovi=(1, 2, 4)):
+    # Unos i preracunavanje popularnosti u jednom Graph-u i u ShardovaniGraf-u sa N procesa.
+    # Shardovi dobijaju poslednjih 10% poziva jedan po jedan, pa se proverava i inkrementalno azuriranje
+    pozivi = [(a, b, t, datetime.fromtimestamp(v)) for a, b, t, v in pozivi]
+    granica = len(pozivi) - len(pozivi) // 10
+
+    graph = Graph()
+    start = time.perf_counter()
+    graph.add_calls(pozivi)
+    unos = time.perf_counter() - start
+    start = time.perf_counter()
+    ocekivano = graph.top_pop_brojevi(100)
+    rezultati = [('Graph', unos, time.perf_counter() - start, True)]
+
+    for broj_shardova in shardovi:
+        with ShardovaniGraf(broj_shardova) as shardovani:
+            start = time.perf_counter()
+            shardovani.add_calls(pozivi[:granica])
+            shardovani.velicine_shardova()  # ceka da shardovi obrade sve serije
+            unos = time.perf_counter() - start
+            start = time.perf_counter()
+            shardovani.top_pop_brojevi(100)
+            popularnost = time.perf_counter() - start
+
+            for i, poziv in enumerate(pozivi[granica:]):
+                shardovani.add_call(*poziv)
+                if i % 100 == 0:
+                    shardovani.rang_broja(poziv[1])
+            top = shardovani.top_pop_brojevi(100)
+            isto = top == ocekivano and all(shardovani.izracunaj_popularnost(broj) == graph.izracunaj_popularnost(broj)
+                                            for broj in list(graph.nodes)[:500])
+            rezultati.append((f"{broj_shardova} shard(a)", unos, popularnost, isto))
+
+    print(f"\nShardovani graf, {len(pozivi)} poziva ({os.cpu_count()} jezgara)")
+    print(f"{'Graf':<12} | {'Unos':>8} | {'Popularnost':>11} | Isti top 100")
+    for naziv, unos, popularnost, isto in rezultati:
+        print(f"{naziv:<12} | {unos:>7.2f}s | {popularnost:>10.2f}s | {isto}")
+    for naziv, _, _, isto in rezultati:
+        ocekuj(isto, f"{naziv}: popularnost se razlikuje od jednog Graph-a")
+
+
+def propusnost_shardova(pozivi, shardovi=(1, 2, 4)):
+    # Pojedinacni upisi u sekundi posle masovnog unosa, zakljucno sa obradom u shardovima.
+    # Rast sa brojem shardova vidi se samo kada ima bar toliko jezgara
+    pozivi = [(a, b, t, datetime.fromtimestamp(v)) for a, b, t, v in pozivi]
+    granica = len(pozivi) - len(pozivi) // 10
+    upisi = pozivi[granica:]
+
+    graph = Graph()
+    graph.add_calls(pozivi[:granica])
+    graph.top_pop_brojevi(10)
+    start = time.perf_counter()
+    for poziv in upisi:
+        graph.add_call(*poziv)
+    rezultati = [('Graph', len(upisi) / (time.perf_counter() - start))]
+
+    for broj_shardova in shardovi:
+        with ShardovaniGraf(broj_shardova) as shardovani:
+            shardovani.add_calls(pozivi[:granica])
+            shardovani.top_pop_brojevi(10)
+            start = time.perf_counter()
+            for poziv in upisi:
+                shardovani.add_call(*poziv)
+            shardovani.velicine_shardova()  # ceka da shardovi obrade sve serije
+            rezultati.append((f"{broj_shardova} shard(a)", len(upisi) / (time.perf_counter() - start)))
+
+    print(f"\nPropusnost upisa, {len(upisi)} poziva jedan po jedan ({os.cpu_count()} jezgara)")
+    print(f"{'Graf':<12} | {'Poziva/s':>10}")
+    for naziv, propusnost in rezultati:
+        print(f"{naziv:<12} | {propusnost:>10.0f}")
+
+
+def provere(broj_poziva=20000):
+    # Samo provere ispravnosti, na manjem broju poziva i bez poredjenja brzine
+    pozivi = generisi_pozive(broj_poziva, BROJ_TELEFONA // 5)
+    uporedi_rezultate({skladiste: izgradi_graf(pozivi, skladiste) for skladiste in ('objekti', 'kolone')})
+    print("Skladista daju iste rezultate")
+    for skladiste in ('objekti', 'kolone'):
+        provera_popularnosti(pozivi, skladiste)
+    print("Inkrementalna popularnost = ponovo izracunata")
+    provera_fuzzy_pretrage(generisi_kontakte(5000))
+    print("Fuzzy pretraga daje rastojanje 0 za tacne pogotke")
+    stres_test_konkurentnosti(pozivi, trajanje=1.0, citalaca=(4,))
+    poredjenje_shardova(pozivi, shardovi=(2,))
+
+
+if __name__ == '__main__':
+    # python benchmark.py --provere [broj poziva]: samo provere; neuspela provera
+    # (i ovde i u punom benchmark-u) zavrsava program sa izlaznim kodom 1
+    argumenti = sys.argv[1:]
+    if argumenti[:1] == ['--provere']:
+        try:
+            provere(*map(int, argumenti[1:2]))
+        except AssertionError as e:
+            print(f"\nPROVERA NIJE PROSLA: {e}")
+            sys.exit(1)
+        print("\nSve provere su prosle")
+        sys.exit(0)
+
+    broj_poziva = int(argumenti[0]) if argumenti else BROJ_POZIVA
+    pozivi = generisi_pozive(broj_poziva, BROJ_TELEFONA)
+    grafovi = memorija_skladista(pozivi)
+    uporedi_rezultate(grafovi)
+    print("\nRezultati skladista se poklapaju")
+    provera_popularnosti(pozivi[:20000])
+    print("Inkrementalna popularnost = ponovo izracunata")
+
+    kontakti = generisi_kontakte(BROJ_KONTAKATA)
+    poredjenje_trie(kontakti)
+    print("Rezultati Trie i RadixTrie se poklapaju")
+    provera_fuzzy_pretrage(kontakti)
+    poredjenje_did_you_mean(kontakti)
+    stres_test_konkurentnosti(pozivi[:100000])
+    poredjenje_shardova(pozivi)
+    propusnost_shardova(pozivi)
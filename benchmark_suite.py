@@ -0,0 +1,401 @@
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import main
+from benchmark import IMENA, PREZIMENA, SEED, generisi_pozive, pogresno_otkucaj
+from fuzzy_index import FuzzyIndex
+from graph import Graph
+from trie import PhoneBookTrie
+
+VELICINE = (10000, 100000, 1000000)
+BROJ_UPITA = 1000
+BROJ_UPITA_DID_YOU_MEAN = 100
+PONAVLJANJA = 3
+PRAG_REGRESIJE = 1.2  # vreme vece od 120% baseline-a se prijavljuje kao regresija
+IZLAZNI_FAJL = 'benchmark_rezultati.json'
+BASELINE_FAJL = 'benchmark_baseline.json'
+
+
+@contextlib.contextmanager
+def tiho():
+    # Funkcije iz main.py stampaju napredak; to ne ulazi u izlaz merenja
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def upisi_pozive(filename, pozivi):
+    # Isti format kao calls.txt iz generate_calls.py
+    with open(filename, 'w', encoding='utf-8', buffering=4 * 1024 * 1024) as f:
+        for caller, callee, trajanje, vreme in pozivi:
+            f.write("%s, %s, %s, %02d:%02d:%02d\n" % (
+                caller, callee, datetime.fromtimestamp(vreme).strftime('%d.%m.%Y %H:%M:%S'),
+                trajanje // 3600, trajanje // 60 % 60, trajanje % 60))
+
+
+def pripremi_podatke(velicina, skladiste, direktorijum, seed=SEED):
+    # Sve sto merenja koriste se pravi unapred i sa fiksnim seed-om, pa su
+    # skupovi podataka i upiti isti od pokretanja do pokretanja
+    pozivi = generisi_pozive(velicina, max(1000, velicina // 10), seed)
+    pozivi_dt = [(a, b, t, datetime.fromtimestamp(v)) for a, b, t, v in pozivi]
+
+    podaci = {
+        'velicina': velicina,
+        'skladiste': skladiste,
+        'pozivi': pozivi_dt,
+        'calls': os.path.join(direktorijum, f'calls_{velicina}.txt'),
+        'pickle': os.path.join(direktorijum, f'centrala_{velicina}.pkl'),
+        'snapshot': os.path.join(direktorijum, f'centrala_{velicina}.snap'),
+    }
+    upisi_pozive(podaci['calls'], pozivi)
+
+    graph = Graph(skladiste)
+    graph.add_calls(pozivi_dt)
+    podaci['graph'] = graph
+
+    rnd = random.Random(seed)
+    brojevi = sorted(graph.nodes)
+    podaci['kontakti'] = [(broj, f"{rnd.choice(IMENA)} {rnd.choice(PREZIMENA)}") for broj in brojevi]
+
+    postavi_main(podaci)
+    podaci['phonebook_trie'] = main.phonebook_trie
+    podaci['kontakti_main'] = main.kontakti
+    podaci['fuzzy_indeks'] = main.fuzzy_indeks
+
+    podaci['brojevi'] = [rnd.choice(brojevi) for _ in range(BROJ_UPITA)]
+    podaci['parovi'] = [(a, b) for a, b, _, _ in rnd.sample(pozivi, min(BROJ_UPITA, len(pozivi)))]
+    podaci['prefiksi'] = [broj[:rnd.randrange(3, 7)] for broj in podaci['brojevi']]
+    podaci['greske'] = [pogresno_otkucaj(broj, rnd) for broj in podaci['brojevi'][:BROJ_UPITA_DID_YOU_MEAN]]
+    return podaci
+
+
+def postavi_main(podaci):
+    # Globalno stanje main.py se vraca na pripremljen skup posle merenja koja ga menjaju
+    main.graph = podaci['graph']
+    main.blokirani_brojevi = set()
+
+    if 'phonebook_trie' in podaci:
+        main.phonebook_trie = podaci['phonebook_trie']
+        main.kontakti = podaci['kontakti_main']
+        main.fuzzy_indeks = podaci['fuzzy_indeks']
+        return
+
+    main.phonebook_trie = PhoneBookTrie()
+    main.kontakti = {}
+    main.fuzzy_indeks = FuzzyIndex()
+    for broj, ime_prezime in podaci['kontakti']:
+        main.dodaj_kontakt(ime_prezime, broj)
+
+
+# ===== Operacije =====
+# Svaka operacija je (priprema, izvrsi): priprema pravi pocetno stanje i ne meri se,
+# a izvrsi radi posao koji se meri i vraca broj obavljenih operacija
+
+def prazan_graf(podaci):
+    main.graph = Graph(podaci['skladiste'])
+    main.blokirani_brojevi = set()
+    return main.graph
+
+
+def izvrsi_ucitaj_pozive(podaci, _):
+    with tiho():
+        main.ucitaj_pozive(podaci['calls'])
+    return podaci['velicina']
+
+
+def izvrsi_ucitaj_pozive_brzo(podaci, _):
+    with tiho():
+        main.ucitaj_pozive_brzo(podaci['calls'], procesi=0)
+    return podaci['velicina']
+
+
+def izvrsi_add_call(podaci, _):
+    graph = Graph(podaci['skladiste'])
+    for caller, callee, trajanje, vreme in podaci['pozivi']:
+        graph.add_call(caller, callee, trajanje, vreme)
+    return len(podaci['pozivi'])
+
+
+def izvrsi_istorija_broja(podaci, _):
+    for broj in podaci['brojevi']:
+        podaci['graph'].istorija_poziva(broj)
+    return len(podaci['brojevi'])
+
+
+def izvrsi_istorija_para(podaci, _):
+    for a, b in podaci['parovi']:
+        podaci['graph'].istorija_poziva(a, b)
+    return len(podaci['parovi'])
+
+
+def hladan_graf(podaci):
+    # Graf tek posle masovnog unosa, kao posle ucitavanja: sume pozivalaca, rang lista i
+    # kes popularnosti se prave u prvom upitu, pa se graf pravi ispocetka za svako ponavljanje
+    postavi_main(podaci)
+    graph = Graph(podaci['skladiste'])
+    graph.add_calls(podaci['pozivi'])
+    return graph
+
+
+def zagrejan_graf(podaci):
+    # Pripremljen graf sa vec popunjenim kesom popularnosti i rang listom
+    postavi_main(podaci)
+    graph = podaci['graph']
+    graph.top_pop_brojevi(10)
+    for broj in podaci['brojevi']:
+        graph.izracunaj_popularnost(broj)
+    return graph
+
+
+def izvrsi_popularnost(podaci, graph):
+    for broj in podaci['brojevi']:
+        graph.izracunaj_popularnost(broj)
+    return len(podaci['brojevi'])
+
+
+def izvrsi_top_pop_hladno(podaci, graph):
+    # Samo prvi upit posle unosa je hladan; ostali bi merili kes
+    graph.top_pop_brojevi(10)
+    return 1
+
+
+def izvrsi_top_pop(podaci, graph):
+    for _ in range(BROJ_UPITA):
+        graph.top_pop_brojevi(10)
+    return BROJ_UPITA
+
+
+def izvrsi_starts_with(podaci, _):
+    for prefiks in podaci['prefiksi']:
+        main.phonebook_trie.search_by_phone(prefiks)
+    return len(podaci['prefiksi'])
+
+
+def izvrsi_autocomplete(podaci, _):
+    for prefiks in podaci['prefiksi']:
+        main.phonebook_trie.autocomplete_phone(prefiks)
+    return len(podaci['prefiksi'])
+
+
+def izvrsi_did_you_mean(podaci, _):
+    for upit in podaci['greske']:
+        main.did_you_mean(upit)
+    return len(podaci['greske'])
+
+
+def izvrsi_pickle_sacuvaj(podaci, _):
+    with tiho():
+        main.sacuvaj_pickle(podaci['pickle'])
+    return 1
+
+
+def pripremi_pickle(podaci):
+    postavi_main(podaci)
+    with tiho():
+        main.sacuvaj_pickle(podaci['pickle'])
+
+
+def izvrsi_pickle_ucitaj(podaci, _):
+    with tiho():
+        if not main.ucitaj_pickle(podaci['pickle']):
+            raise RuntimeError(f"Ucitavanje {podaci['pickle']} nije uspelo")
+    return 1
+
+
+def izvrsi_snapshot_sacuvaj(podaci, _):
+    with tiho():
+        main.sacuvaj_snapshot(podaci['snapshot'])
+    return 1
+
+
+def pripremi_snapshot(podaci):
+    postavi_main(podaci)
+    with tiho():
+        main.sacuvaj_snapshot(podaci['snapshot'])
+
+
+def izvrsi_snapshot_ucitaj(podaci, _):
+    with tiho():
+        if not main.ucitaj_snapshot(podaci['snapshot']):
+            raise RuntimeError(f"Ucitavanje {podaci['snapshot']} nije uspelo")
+    return 1
+
+
+OPERACIJE = {
+    'ucitaj_pozive': (prazan_graf, izvrsi_ucitaj_pozive),
+    'ucitaj_pozive_brzo': (prazan_graf, izvrsi_ucitaj_pozive_brzo),
+    'add_call': (postavi_main, izvrsi_add_call),
+    'istorija_poziva_broj': (postavi_main, izvrsi_istorija_broja),
+    'istorija_poziva_par': (postavi_main, izvrsi_istorija_para),
+    'izracunaj_popularnost': (hladan_graf, izvrsi_popularnost),
+    'izracunaj_popularnost_kes': (zagrejan_graf, izvrsi_popularnost),
+    'top_pop_brojevi': (hladan_graf, izvrsi_top_pop_hladno),
+    'top_pop_brojevi_kes': (zagrejan_graf, izvrsi_top_pop),
+    'starts_with': (postavi_main, izvrsi_starts_with),
+    'autocomplete': (postavi_main, izvrsi_autocomplete),
+    'did_you_mean': (postavi_main, izvrsi_did_you_mean),
+    'pickle_sacuvaj': (postavi_main, izvrsi_pickle_sacuvaj),
+    'pickle_ucitaj': (pripremi_pickle, izvrsi_pickle_ucitaj),
+    'snapshot_sacuvaj': (postavi_main, izvrsi_snapshot_sacuvaj),
+    'snapshot_ucitaj': (pripremi_snapshot, izvrsi_snapshot_ucitaj),
+}
+
+
+def izmeri(podaci, priprema, izvrsi, ponavljanja=PONAVLJANJA, memorija=True):
+    # Vreme je najbolje od ponavljanja bez tracemalloc-a (koji usporava), a vrh
+    # memorije se meri u jos jednom, posebnom izvrsavanju
+    vremena = []
+    broj = 0
+    for _ in range(ponavljanja):
+        stanje = None  # stanje prethodnog ponavljanja ne ostaje u memoriji tokom pripreme
+        stanje = priprema(podaci)
+        gc.collect()
+        start = time.perf_counter()
+        broj = izvrsi(podaci, stanje)
+        vremena.append(time.perf_counter() - start)
+
+    rezultat = {
+        'broj_operacija': broj,
+        'vreme_s': min(vremena),
+        'vremena_s': vremena,
+        'us_po_operaciji': min(vremena) / broj * 1e6 if broj else 0.0,
+    }
+
+    if memorija:
+        stanje = None
+        stanje = priprema(podaci)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            izvrsi(podaci, stanje)
+            _, vrh = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        rezultat['vrh_memorije_mb'] = vrh / 2 ** 20
+
+    postavi_main(podaci)
+    return rezultat
+
+
+def pokreni_suite(velicine=VELICINE, operacije=None, skladiste='objekti', ponavljanja=PONAVLJANJA,
+                  memorija=True, seed=SEED):
+    operacije = operacije or list(OPERACIJE)
+    rezultati = {
+        'meta': {
+            'datum': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platforma': platform.platform(),
+            'procesora': os.cpu_count(),
+            'skladiste': skladiste,
+            'seed': seed,
+            'ponavljanja': ponavljanja,
+            'broj_upita': BROJ_UPITA,
+        },
+        'velicine': {},
+    }
+
+    with tempfile.TemporaryDirectory() as direktorijum:
+        for velicina in velicine:
+            print(f"\n{velicina} poziva: priprema podataka...")
+            start = time.perf_counter()
+            podaci = pripremi_podatke(velicina, skladiste, direktorijum, seed)
+            print(f"Pripremljeno za {time.perf_counter() - start:.1f}s")
+
+            print(f"{'Operacija':<26} | {'Vreme (s)':>10} | {'us/op':>12} | {'Vrh (MB)':>9}")
+            print("-" * 66)
+            po_operaciji = {}
+            for naziv in operacije:
+                priprema, izvrsi = OPERACIJE[naziv]
+                rezultat = izmeri(podaci, priprema, izvrsi, ponavljanja, memorija)
+                po_operaciji[naziv] = rezultat
+                vrh = f"{rezultat['vrh_memorije_mb']:>9.1f}" if memorija else f"{'-':>9}"
+                print(f"{naziv:<26} | {rezultat['vreme_s']:>10.4f} | {rezultat['us_po_operaciji']:>12.2f} | {vrh}")
+
+            rezultati['velicine'][str(velicina)] = po_operaciji
+            del podaci
+            gc.collect()
+
+    return rezultati
+
+
+def uporedi_sa_baseline(rezultati, baseline, prag=PRAG_REGRESIJE):
+    # Porede se samo velicine i operacije koje postoje u oba merenja
+    print(f"\nPoredjenje sa baseline-om ({baseline['meta'].get('datum', '?')})")
+    print(f"{'Velicina':>9} | {'Operacija':<26} | {'Baseline (s)':>12} | {'Sada (s)':>10} | {'Odnos':>6}")
+    print("-" * 80)
+
+    regresije = []
+    for velicina, po_operaciji in rezultati['velicine'].items():
+        stari = baseline['velicine'].get(velicina, {})
+        for naziv, rezultat in po_operaciji.items():
+            if naziv not in stari or not stari[naziv]['vreme_s']:
+                continue
+
+            odnos = rezultat['vreme_s'] / stari[naziv]['vreme_s']
+            oznaka = ''
+            if odnos > prag:
+                oznaka = 'REGRESIJA'
+                regresije.append((int(velicina), naziv, odnos))
+            elif odnos < 1 / prag:
+                oznaka = 'brze'
+            print(f"{velicina:>9} | {naziv:<26} | {stari[naziv]['vreme_s']:>12.4f} | "
+                  f"{rezultat['vreme_s']:>10.4f} | {odnos:>5.2f}x {oznaka}")
+
+    if regresije:
+        print(f"\n{len(regresije)} regresija (sporije od {prag:.0%} baseline-a)")
+    else:
+        print("\nNema regresija")
+    return regresije
+
+
+def sacuvaj_json(filename, podaci):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(podaci, f, indent=2, ensure_ascii=False)
+
+
+def ucitaj_json(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark suite za graf poziva i imenik")
+    parser.add_argument('--velicine', default=','.join(map(str, VELICINE)),
+                        help="broj poziva u skupovima podataka, odvojeni zarezom")
+    parser.add_argument('--operacije', default=None,
+                        help="operacije koje se mere, odvojene zarezom (podrazumevano sve)")
+    parser.add_argument('--skladiste', default='objekti', choices=('objekti', 'kolone'))
+    parser.add_argument('--ponavljanja', type=int, default=PONAVLJANJA)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--bez-memorije', action='store_true', help="bez merenja vrha memorije")
+    parser.add_argument('--izlaz', default=IZLAZNI_FAJL)
+    parser.add_argument('--baseline', default=BASELINE_FAJL)
+    parser.add_argument('--prag', type=float, default=PRAG_REGRESIJE)
+    parser.add_argument('--novi-baseline', action='store_true', help="rezultate sacuvaj i kao baseline")
+    args = parser.parse_args()
+
+    operacije = args.operacije.split(',') if args.operacije else None
+    nepoznate = [naziv for naziv in operacije or [] if naziv not in OPERACIJE]
+    if nepoznate:
+        parser.error(f"nepoznate operacije: {', '.join(nepoznate)} (postoje: {', '.join(OPERACIJE)})")
+
+    rezultati = pokreni_suite([int(v) for v in args.velicine.split(',')], operacije, args.skladiste,
+                              args.ponavljanja, not args.bez_memorije, args.seed)
+    sacuvaj_json(args.izlaz, rezultati)
+    print(f"\nRezultati su sacuvani u {args.izlaz}")
+
+    if args.novi_baseline:
+        sacuvaj_json(args.baseline, rezultati)
+        print(f"Baseline je sacuvan u {args.baseline}")
+    elif os.path.exists(args.baseline):
+        if uporedi_sa_baseline(rezultati, ucitaj_json(args.baseline), args.prag):
+            sys.exit(1)
@@ -0,0 +1,110 @@
+from difflib import SequenceMatcher
+
+# Liste do ove duzine se uvek koriste, njihovo preskakanje ne bi nista ustedelo
+KRATKA_LISTA = 100
+
+
+# Pozicioni q-gram indeks za "da li ste mislili" predloge. Kandidati su kljucevi sa
+# zajednickim q-gramima (uz malo pomeranje pozicije zbog umetnutih/izbacenih
+# karaktera), a samo oni se rangiraju SequenceMatcher odnosom kao ranije.
+#
+# q-gram koji ima vise od max_frequency svih kljuceva (npr. zajednicki pozivni broj na
+# pocetku) se preskace, jer ne razlikuje kandidate, a njegova lista bi upit vratila na
+# prolaz kroz sve kljuceve. Odnos je najvise 2*min(m, n)/(m + n) za duzine m i n, pa se
+# kljucevi cija duzina ne moze da predje prag ne proveravaju; tako se i upiti kraci od q
+# resavaju samo kroz kljuceve dozvoljenih duzina.
+class FuzzyIndex:
+
+    def __init__(self, keys=(), q=3, position_slack=1, count_slack=1, max_frequency=0.02,
+                 threshold=0.5):
+        self.q = q
+        self.position_slack = position_slack
+        self.count_slack = count_slack
+        self.max_frequency = max_frequency
+        self.threshold = threshold
+
+        self.keys = []      # id -> kljuc, id je redosled dodavanja
+        self.key_ids = {}
+        self.postings = {}  # (q-gram, pozicija) -> [id, ...]
+        self.by_length = {}  # duzina -> [id, ...]
+
+        for key in keys:
+            self.add(key)
+
+    def _grams(self, key):
+        q = self.q
+        return [(key[i:i + q], i) for i in range(len(key) - q + 1)]
+
+    def add(self, key):
+        if key in self.key_ids:
+            return
+
+        key_id = len(self.keys)
+        self.keys.append(key)
+        self.key_ids[key] = key_id
+        self.by_length.setdefault(len(key), []).append(key_id)
+
+        for gram in self._grams(key):
+            self.postings.setdefault(gram, []).append(key_id)
+
+    def _moguca_duzina(self, m, n):
+        return 2 * min(m, n) > self.threshold * (m + n)
+
+    def candidates(self, query):
+        # Lista (id, broj zajednickih q-grama), od najvise zajednickih
+        m = len(query)
+        if m < self.q:
+            return [(key_id, 0) for duzina in sorted(self.by_length) if self._moguca_duzina(m, duzina)
+                    for key_id in self.by_length[duzina]]
+
+        granica = max(KRATKA_LISTA, int(len(self.keys) * self.max_frequency))
+        liste = []
+        for gram, pozicija in self._grams(query):
+            # Isti kljuc se broji jednom po q-gramu upita, bez obzira na pomeraj
+            lista = [self.postings.get((gram, pozicija + pomeraj), ())
+                     for pomeraj in range(-self.position_slack, self.position_slack + 1)]
+            liste.append((sum(map(len, lista)), lista))
+
+        # Ako su svi q-grami upita cesti, koristi se bar najredji
+        retki = [lista for velicina, lista in liste if velicina <= granica]
+        if not retki:
+            retki = [min(liste, key=lambda stavka: stavka[0])[1]]
+
+        counts = {}
+        for lista in retki:
+            pogodjeni = set()
+            for postings in lista:
+                pogodjeni.update(postings)
+            for key_id in pogodjeni:
+                counts[key_id] = counts.get(key_id, 0) + 1
+
+        keys = self.keys
+        return sorted(((key_id, broj) for key_id, broj in counts.items()
+                       if self._moguca_duzina(m, len(keys[key_id]))),
+                      key=lambda x: (-x[1], x[0]))
+
+    def suggest(self, query, n=5):
+        # Lista (kljuc, skor) kao kod linearnog did_you_mean, sortirana po skoru. Kandidati se
+        # proveravaju od najvise zajednickih q-grama; kada ima n predloga, staje se na prvom
+        # kandidatu sa vise od count_slack zajednickih q-grama manje od n-tog predloga
+        slicnosti = []
+        najmanje_zajednickih = None
+        for key_id, zajednickih in self.candidates(query):
+            if najmanje_zajednickih is not None and zajednickih < najmanje_zajednickih - self.count_slack:
+                break
+
+            key = self.keys[key_id]
+            skor = SequenceMatcher(None, query, key).ratio()
+            if skor > self.threshold:
+                slicnosti.append((key_id, key, skor))
+                if len(slicnosti) == n:
+                    najmanje_zajednickih = zajednickih
+
+        slicnosti.sort(key=lambda x: (-x[2], x[0]))
+        return [(key, skor) for _, key, skor in slicnosti[:n]]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        return f"FuzzyIndex(keys={len(self.keys)}, q={self.q}, grams={len(self.postings)})"
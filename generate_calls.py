@@ -1,87 +1,177 @@
 import random
+import sys
 import time
+from datetime import datetime, timedelta
 
-FILE_LENGTH = 1000000
-
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-def str_time_prop(start, end, time_format, prop):
-    """Get a time at a proportion of a range of two formatted times.
+FILE_LENGTH = 1000000
 
-    start and end should be strings specifying times formatted in the
-    given format (strftime-style), giving an interval [start, end].
-    prop specifies how a proportion of the interval to be taken after
-    start.  The returned time will be in the specified format.
+START_DATE = datetime(2025, 1, 1)
+END_DATE = datetime(2025, 9, 18, 23, 59, 59)
+BATCH_SIZE = 500000
+WRITE_BUFFER = 8 * 1024 * 1024
+SECONDS_PER_DAY = 86400
+
+
+def read_numbers(filename="phones.txt"):
+    # Numbers are split out once; the first line of phones.txt is the header
+    numbers = []
+    with open(filename, encoding="utf-8") as input_file:
+        next(input_file, None)
+        for line in input_file:
+            parts = line.split(",")
+            if len(parts) >= 2 and parts[1].strip():
+                numbers.append(parts[1].strip())
+    return numbers
+
+
+def zipf_cdf(count, skew):
+    # Cumulative weights for rank^-skew over count numbers (skew 0 = uniform)
+    total = 0.0
+    cdf = []
+    for rank in range(1, count + 1):
+        total += rank ** -skew
+        cdf.append(total)
+    return cdf
+
+
+def _numpy_batches(count, total, span, start_second, caller_skew, callee_skew, seed):
+    rng = np.random.default_rng(seed)
+    hot = rng.permutation(count)  # which numbers get the hot ranks
+
+    def sampler(skew):
+        if not skew:
+            return lambda size: rng.integers(0, count, size)
+        cdf = np.asarray(zipf_cdf(count, skew))
+        cdf /= cdf[-1]
+        return lambda size: hot[np.minimum(np.searchsorted(cdf, rng.random(size), side="right"), count - 1)]
+
+    draw_caller = sampler(caller_skew)
+    draw_callee = sampler(callee_skew)
+
+    for done in range(0, total, BATCH_SIZE):
+        size = min(BATCH_SIZE, total - done)
+        callers = draw_caller(size)
+        callees = draw_callee(size)
+        same = np.flatnonzero(callers == callees)
+        while same.size:
+            callees[same] = draw_callee(same.size)
+            same = same[callers[same] == callees[same]]
+
+        offsets = rng.integers(0, span + 1, size) + start_second
+        hours = np.where(rng.random(size) >= 0.9, rng.integers(0, 10, size), 0)
+        durations = hours * 3600 + rng.integers(0, 3600, size)
+
+        yield (callers.tolist(), callees.tolist(), (offsets // SECONDS_PER_DAY).tolist(),
+               (offsets % SECONDS_PER_DAY).tolist(), durations.tolist())
+
+
+def _python_batches(count, total, span, start_second, caller_skew, callee_skew, seed):
+    rng = random.Random(seed)
+    hot = list(range(count))
+    rng.shuffle(hot)
+    indices = range(count)
+
+    def sampler(skew):
+        if not skew:
+            return lambda size: [rng.randrange(count) for _ in range(size)]
+        cdf = zipf_cdf(count, skew)
+        return lambda size: [hot[i] for i in rng.choices(indices, cum_weights=cdf, k=size)]
+
+    draw_caller = sampler(caller_skew)
+    draw_callee = sampler(callee_skew)
+
+    for done in range(0, total, BATCH_SIZE):
+        size = min(BATCH_SIZE, total - done)
+        callers = draw_caller(size)
+        callees = draw_callee(size)
+        for i in range(size):
+            while callees[i] == callers[i]:
+                callees[i] = draw_callee(1)[0]
+
+        days = []
+        seconds = []
+        for _ in range(size):
+            day, second = divmod(rng.randrange(span + 1) + start_second, SECONDS_PER_DAY)
+            days.append(day)
+            seconds.append(second)
+
+        durations = [(rng.randrange(0, 10) if rng.random() >= 0.9 else 0) * 3600 + rng.randrange(3600)
+                     for _ in range(size)]
+
+        yield callers, callees, days, seconds, durations
+
+
+def generate_calls_fast(file_length=FILE_LENGTH, seed=None, caller_skew=0.0, callee_skew=0.0,
+                        input_name="phones.txt", output_name="calls.txt", use_numpy=None):
+    """Generate calls.txt in batches, reproducibly for a given seed.
+
+    Callers and callees are drawn uniformly, or from a Zipf distribution
+    with the given skew (around 1.0 gives a few very hot numbers).  The
+    same seed gives the same file for the same backend: NumPy when it is
+    installed (or use_numpy is True), the random module otherwise.
     """
 
-    stime = time.mktime(time.strptime(start, time_format))
-    etime = time.mktime(time.strptime(end, time_format))
+    numbers = read_numbers(input_name)
+    if len(numbers) < 2:
+        raise ValueError("%s needs at least two phone numbers" % input_name)
 
-    ptime = stime + prop * (etime - stime)
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise ImportError("numpy is not installed")
 
-    return time.strftime(time_format, time.localtime(ptime))
+    day0 = START_DATE.replace(hour=0, minute=0, second=0)
+    start_second = int((START_DATE - day0).total_seconds())
+    span = int((END_DATE - START_DATE).total_seconds())
 
+    # Every date and every clock time is formatted once; durations use the same clock strings
+    days = [(day0 + timedelta(days=day)).strftime("%d.%m.%Y")
+            for day in range((start_second + span) // SECONDS_PER_DAY + 1)]
+    clock = ["%02d:%02d:%02d" % (second // 3600, second // 60 % 60, second % 60)
+             for second in range(SECONDS_PER_DAY)]
 
-def random_date(start, end, prop):
-    return str_time_prop(start, end, '%d.%m.%Y %H:%M:%S', prop)
+    make_batches = _numpy_batches if use_numpy else _python_batches
+    batches = make_batches(len(numbers), file_length, span, start_second, caller_skew, callee_skew, seed)
 
+    started = time.perf_counter()
+    written = 0
+    with open(output_name, "w", encoding="utf-8", buffering=WRITE_BUFFER) as output_file:
+        for callers, callees, day_indices, seconds, durations in batches:
+            output_file.write("".join([
+                f"{numbers[a]}, {numbers[b]}, {days[d]} {clock[s]}, {clock[t]}\n"
+                for a, b, d, s, t in zip(callers, callees, day_indices, seconds, durations)
+            ]))
+            written += len(callers)
+            print("%d/%d (%.1fs)" % (written, file_length, time.perf_counter() - started))
 
-def random_duration(min, max):
-    duration = random.random()
-    minutes = random.randrange(0, 60)
-    seconds = random.randrange(0, 60)
+    return written
 
-    hours = 0
 
-    if duration >= 0.9:
-        hours = random.randrange(min, max)
+def generate_calls():
+    # Old entry point, kept as a thin wrapper around the batched generator
+    return generate_calls_fast(FILE_LENGTH)
 
-    return "%02d:%02d:%02d" % (hours, minutes, seconds)
 
+def generate_blocks(number_of_blocked=100, seed=None, input_name="phones.txt", output_name="blocked.txt"):
+    numbers = read_numbers(input_name)
+    rng = random.Random(seed)
 
-def generate_calls():
-    with open("phones.txt") as input_file:
-        with open("calls.txt", "w") as output_file:
-            content = input_file.readlines()
-            for current_index in range(FILE_LENGTH):
-                date = random_date("01.01.2025 0:0:0",
-                                   "18.09.2025 23:59:59",
-                                   random.random())
-
-                duration = random_duration(0, 10)
-                while True:
-                    caller_index = random.randrange(0, len(content))
-                    callee_index = random.randrange(0, len(content))
-                    if caller_index != callee_index:
-                        break
-
-                caller_number = content[caller_index].replace("\n", "").split(",")[1]
-                callee_number = content[callee_index].replace("\n", "").split(",")[1]
-
-                data = [caller_number, callee_number, date, duration]
-                output_file.write(", ".join(data) + "\n")
-                print("%d/%d" % (current_index, FILE_LENGTH))
-
-
-def generate_blocks():
-    number_of_blocked = 100
-    choosen = set()
-
-    with open("phones.txt") as input_file:
-        with open("blocked.txt", "w") as output_file:
-            content = input_file.readlines()
-            while number_of_blocked > 0:
-                index = random.randint(0, len(content))
-                if index in choosen:
-                    continue
-
-                choosen.add(index)
-                number = content[index].split(",")[1]
-                output_file.write(number)
-                number_of_blocked -= 1
+    with open(output_name, "w", encoding="utf-8") as output_file:
+        for number in rng.sample(numbers, min(number_of_blocked, len(numbers))):
+            output_file.write(number + "\n")
 
 
 if __name__ == '__main__':
-    generate_calls()
-    generate_blocks()
-
-
+    # python generate_calls.py [number_of_calls] [seed] [caller_skew] [callee_skew]
+    file_length = int(sys.argv[1]) if len(sys.argv) > 1 else FILE_LENGTH
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    caller_skew = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    callee_skew = float(sys.argv[4]) if len(sys.argv) > 4 else caller_skew
+
+    generate_calls_fast(file_length, seed, caller_skew, callee_skew)
+    generate_blocks(seed=seed)
@@ -1,10 +1,53 @@
-from datetime import datetime
+from array import array
+from bisect import bisect_left, insort
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from heapq import merge
+from itertools import groupby, islice, repeat
+
+from rang_lista import RangLista
+from rw_lock import RWLock
+from saobracaj import Saobracaj, sat_vremena
+
+EPOHA = datetime(1970, 1, 1)
+
+# Verzija pickle formata; pickle osnovne verzije (bez polja verzija) se dopunjuje u
+# Graph.__setstate__
+VERZIJA_GRAFA = 1
+
+
+def skor_popularnosti(dolazeci_broj, trajanje_dolazecih, suma_pozivalaca):
+    # suma_pozivalaca je zbir broja dolazecih poziva pozivalaca, po jednom za svaki dolazeci poziv
+    skor_poziva = dolazeci_broj * 10
+
+    ukupno_trajanje_min = trajanje_dolazecih / 60.0
+    skor_trajanja = ukupno_trajanje_min * 0.5
+
+    direktni_skor = skor_poziva + skor_trajanja
+
+    prosecna_pop_pozivalaca = suma_pozivalaca / dolazeci_broj
+    bonus_pozivalaci = prosecna_pop_pozivalaca * 2
+
+    return direktni_skor + bonus_pozivalaci
+
+
+def dodaj_po_vremenu(pozivi, poziv, vreme):
+    # Pozivi uglavnom stizu hronoloski, pa je dodavanje na kraj najcesci slucaj
+    if not pozivi or vreme(pozivi[-1]) <= vreme(poziv):
+        pozivi.append(poziv)
+    else:
+        insort(pozivi, poziv, key=vreme)
+
 
 class Node:
-    def __init__(self, broj):
+    def __init__(self, broj, lista=list, redni_broj=0, pozvani=True):
         self.broj = broj
-        self.dolazeci = []
-        self.odlazeci = []
+        self.redni_broj = redni_broj  # redosled dodavanja, za iste skorove na rang listi
+        # Kod objektnog skladista liste drze Edge objekte, kod kolonskog samo indekse poziva
+        self.dolazeci = lista()
+        self.odlazeci = lista()
 
         self.trajanje_dolazecih = 0
         self.trajanje_odlazecih = 0
@@ -12,15 +55,30 @@ class Node:
         self.popularnost = None
         self.popularnost_last_updated = None
 
+        # Za popularnost: zbir broja dolazecih poziva svih pozivalaca (po pozivu)
+        # i koliko puta je ovaj broj zvao svaki drugi broj (None kod kolonskog skladista)
+        self.suma_pozivalaca = 0
+        self.pozvani = {} if pozvani else None
+
 
-    def dodaj_dolazeci(self, poziv):
-        self.dolazeci.append(poziv)
-        self.trajanje_dolazecih += poziv.trajanjePoziva
+    def dodaj_dolazeci(self, poziv, trajanje=None, vreme=None):
+        if trajanje is None:
+            trajanje = poziv.trajanjePoziva
+        if vreme is None:
+            self.dolazeci.append(poziv)
+        else:
+            dodaj_po_vremenu(self.dolazeci, poziv, vreme)
+        self.trajanje_dolazecih += trajanje
         self.popularnost = None
 
-    def dodaj_odlazeci(self, poziv):
-        self.odlazeci.append(poziv)
-        self.trajanje_odlazecih += poziv.trajanjePoziva
+    def dodaj_odlazeci(self, poziv, trajanje=None, vreme=None):
+        if trajanje is None:
+            trajanje = poziv.trajanjePoziva
+        if vreme is None:
+            self.odlazeci.append(poziv)
+        else:
+            dodaj_po_vremenu(self.odlazeci, poziv, vreme)
+        self.trajanje_odlazecih += trajanje
 
     def get_broj(self):
         return self.broj
@@ -57,15 +115,223 @@ class Edge:
         self.vremePoziva = vremePoziva
 
 
-class Graph:
+# Svaki poziv je jedan Edge objekat (podrazumevano skladiste)
+class ObjektnoSkladiste:
+
+    naziv = 'objekti'
+    indeksi_veza = True
 
     def __init__(self):
+        self.broj_poziva = 0
+
+    def nova_lista(self):
+        return []
+
+    def dodaj(self, izvor, destinacija, trajanje, vreme):
+        self.broj_poziva += 1
+        return Edge(izvor, destinacija, trajanje, vreme)
+
+    def izvor(self, poziv):
+        return poziv.izvor
+
+    def destinacija(self, poziv):
+        return poziv.destinacija
+
+    def trajanje(self, poziv):
+        return poziv.trajanjePoziva
+
+    def vreme(self, poziv):
+        return poziv.vremePoziva
+
+    def kljuc_vremena(self, vreme):
+        return vreme
+
+    def edge(self, poziv):
+        return poziv
+
+    def __len__(self):
+        return self.broj_poziva
+
+
+# Pozivi u paralelnim tipiziranim nizovima, poziv je samo indeks u tim nizovima.
+# Vreme se cuva kao broj sekundi od EPOHA (naivni datetime), a Edge objekat
+# se pravi tek kada se poziv cita. Graf uz ovo skladiste ne drzi objekte po vezi
+# (indeks parova, recnike pozvanih): to se cita iz kolona preko lista cvorova.
+class KolonskoSkladiste:
+
+    naziv = 'kolone'
+    indeksi_veza = False
+
+    def __init__(self):
+        self.brojevi = []       # id -> broj
+        self.id_broja = {}      # broj -> id
+        self.izvori = array('I')
+        self.destinacije = array('I')
+        self.vremena = array('d')
+        self.trajanja = array('I')
+
+    def nova_lista(self):
+        return array('I')
+
+    def _id(self, broj):
+        id_ = self.id_broja.get(broj)
+        if id_ is None:
+            id_ = len(self.brojevi)
+            self.id_broja[broj] = id_
+            self.brojevi.append(broj)
+        return id_
+
+    def dodaj(self, izvor, destinacija, trajanje, vreme):
+        poziv = len(self.vremena)
+        id_broja = self.id_broja
+        id_izvora = id_broja.get(izvor)
+        id_destinacije = id_broja.get(destinacija)
+        self.izvori.append(self._id(izvor) if id_izvora is None else id_izvora)
+        self.destinacije.append(self._id(destinacija) if id_destinacije is None else id_destinacije)
+        self.vremena.append((vreme - EPOHA).total_seconds())
+        self.trajanja.append(int(trajanje))
+        return poziv
+
+    def izvor(self, poziv):
+        return self.brojevi[self.izvori[poziv]]
+
+    def destinacija(self, poziv):
+        return self.brojevi[self.destinacije[poziv]]
+
+    def trajanje(self, poziv):
+        return self.trajanja[poziv]
+
+    def vreme(self, poziv):
+        return self.vremena[poziv]
+
+    def kljuc_vremena(self, vreme):
+        return (vreme - EPOHA).total_seconds()
+
+    def edge(self, poziv):
+        return Edge(self.izvor(poziv),
+                    self.destinacija(poziv),
+                    self.trajanja[poziv],
+                    EPOHA + timedelta(seconds=self.vremena[poziv]))
+
+    def __len__(self):
+        return len(self.vremena)
+
+
+SKLADISTA = {
+    ObjektnoSkladiste.naziv: ObjektnoSkladiste,
+    KolonskoSkladiste.naziv: KolonskoSkladiste,
+}
+
+
+class Graph:
+
+    def __init__(self, skladiste='objekti'):
+        if skladiste not in SKLADISTA:
+            raise ValueError(f"Nepoznato skladiste poziva: {skladiste}")
+
         self.nodes = {}
         self.pop_cache = {}
+        self.skladiste = SKLADISTA[skladiste]()
+        # (manji broj, veci broj) -> pozivi izmedju njih sortirani po vremenu; None kod
+        # skladista bez indeksa veza
+        self.parovi = {} if self.skladiste.indeksi_veza else None
+        self.sume_zastarele = False  # posle masovnog unosa sume pozivalaca se racunaju ispocetka
+
+        # Rang lista popularnosti sa kljucevima (-skor, redni broj, broj); brojevi kojima se
+        # skor promenio cekaju u rang_prljavi i premestaju se tek pri sledecem upitu
+        self.rang = RangLista()
+        self.rang_kljucevi = {}
+        self.rang_prljavi = set()
+        self.rang_zastareo = False
+
+        # Brojevi kojima se skor promenio od poslednjeg preuzimanja (za keseve van grafa)
+        self.promenjeni_skorovi = set()
+        self.svi_skorovi_promenjeni = False
+
+        # Broj poziva po satu i po danu za svaki broj (vidi saobracaj.py)
+        self.saobracaj = Saobracaj()
+
+        self.verzija = VERZIJA_GRAFA
+
+        # Opcioni zurnal (zurnal.Zurnal) u koji se upisuje svaki dodat poziv
+        self.zurnal = None
+        self._napravi_brave()
+
+    def _napravi_brave(self):
+        # Unos poziva drzi lock za pisanje, upiti za citanje; rang lista i kes popularnosti
+        # se osvezavaju lenjo i pri citanju, pa to citaoci rade jedan po jedan pod rang_lock
+        self.lock = RWLock()
+        self.rang_lock = threading.Lock()
+
+    def __getstate__(self):
+        stanje = self.__dict__.copy()
+        for kljuc in ('zurnal', 'lock', 'rang_lock'):
+            stanje.pop(kljuc, None)
+        return stanje
+
+    def __setstate__(self, stanje):
+        self.__dict__.update(stanje)
+        self.zurnal = None
+        self._napravi_brave()
+        if stanje.get('verzija', 0) < VERZIJA_GRAFA:
+            self._dopuni_osnovni_format()
+
+    def _dopuni_osnovni_format(self):
+        # Pickle osnovne verzije ima samo cvorove sa listama Edge objekata (redom dodavanja)
+        # i pop_cache; skladiste, indeksi, rang lista i saobracaj se prave iz cvorova, a
+        # sume pozivalaca i skorovi se racunaju pri prvom upitu
+        self.skladiste = skladiste = ObjektnoSkladiste()
+        self.parovi = {}
+        self.saobracaj = Saobracaj()
+        vreme = skladiste.vreme
+
+        for redni_broj, node in enumerate(self.nodes.values()):
+            node.redni_broj = redni_broj
+            node.dolazeci.sort(key=vreme)
+            node.odlazeci.sort(key=vreme)
+            node.suma_pozivalaca = 0
+            node.pozvani = dict(Counter(poziv.destinacija for poziv in node.odlazeci))
+
+            for poziv in node.odlazeci:
+                skladiste.broj_poziva += 1
+                self._dodaj_u_par(poziv)
+                self.saobracaj.dodaj(poziv.izvor, poziv.destinacija, poziv.trajanjePoziva,
+                                     sat_vremena(poziv.vremePoziva))
+
+        self.sume_zastarele = True
+        self.pop_cache = {}
+        self.rang = RangLista()
+        self.rang_kljucevi = {}
+        self.rang_prljavi = set()
+        self.rang_zastareo = True
+        self.promenjeni_skorovi = set()
+        self.svi_skorovi_promenjeni = True
+        self.verzija = VERZIJA_GRAFA
+
+    @staticmethod
+    def _kljuc_para(broj1, broj2):
+        return (broj1, broj2) if broj1 < broj2 else (broj2, broj1)
+
+    def _dodaj_u_par(self, poziv):
+        if self.parovi is None:
+            return
+        skladiste = self.skladiste
+        kljuc = self._kljuc_para(skladiste.izvor(poziv), skladiste.destinacija(poziv))
+
+        pozivi = self.parovi.get(kljuc)
+        if pozivi is None:
+            pozivi = self.parovi[kljuc] = skladiste.nova_lista()
+
+        dodaj_po_vremenu(pozivi, poziv, skladiste.vreme)
 
     def add_phone(self, broj):
+        with self.lock.za_pisanje():
+            return self._dodaj_broj(broj)
+
+    def _dodaj_broj(self, broj):
         if broj not in self.nodes:
-            self.nodes[broj] = Node(broj)
+            self.nodes[broj] = Node(broj, self.skladiste.nova_lista, len(self.nodes), self.skladiste.indeksi_veza)
+            self.rang_prljavi.add(broj)
         return self.nodes[broj]
 
     def add_call(self, caller, callee, trajanje, timestamp=None):
@@ -79,17 +345,264 @@ class Graph:
         if timestamp is None:
             timestamp = datetime.now()
 
-        caller_node = self.add_phone(caller)
-        callee_node = self.add_phone(callee)
-
-        call_edge = Edge(caller, callee, trajanje, timestamp)
-
-        caller_node.dodaj_odlazeci(call_edge)
-        callee_node.dodaj_dolazeci(call_edge)
-
+        with self.lock.za_pisanje():
+            if self.zurnal is not None:
+                self.zurnal.zapisi_poziv(caller, callee, trajanje, timestamp)
+
+            poziv = self._dodaj_poziv(caller, callee, trajanje, timestamp, not self.sume_zastarele)
+
+        return self.skladiste.edge(poziv)
+
+    def add_calls(self, pozivi):
+        # Masovni unos (caller, callee, trajanje, timestamp) n-torki. Za seriju vecu od broja
+        # cvorova jeftinije je jednom preracunati sve sume nego azurirati ih poziv po poziv
+        if not isinstance(pozivi, (list, tuple)):
+            pozivi = list(pozivi)
+
+        with self.lock.za_pisanje():
+            return self._dodaj_pozive(pozivi)
+
+    def _dodaj_pozive(self, pozivi):
+        inkrementalno = not self.sume_zastarele and len(pozivi) < len(self.nodes)
+        dodato = 0
+        normal_broj = self._normal_broj
+        dodaj_poziv = self._dodaj_poziv
+        zurnal = self.zurnal
+
+        for caller, callee, trajanje, timestamp in pozivi:
+            caller = normal_broj(caller)
+            callee = normal_broj(callee)
+
+            if not caller or not callee or caller == callee:
+                continue
+
+            if timestamp is None:
+                timestamp = datetime.now()
+
+            if zurnal is not None:
+                zurnal.zapisi_poziv(caller, callee, trajanje, timestamp)
+
+            dodaj_poziv(caller, callee, trajanje, timestamp, inkrementalno)
+            dodato += 1
+
+        if dodato and not inkrementalno:
+            self.sume_zastarele = True
+            self.rang_zastareo = True
+            self.svi_skorovi_promenjeni = True
+            self.promenjeni_skorovi = set()
+            self.pop_cache = {}
+
+        return dodato
+
+    def _dodaj_poziv(self, caller, callee, trajanje, timestamp, inkrementalno=True):
+        caller_node = self._dodaj_broj(caller)
+        callee_node = self._dodaj_broj(callee)
+
+        poziv = self.skladiste.dodaj(caller, callee, trajanje, timestamp)
+        self.saobracaj.dodaj(caller, callee, trajanje, sat_vremena(timestamp))
+
+        # Liste cvorova se drze sortirane po vremenu, i kad pozivi ne stizu hronoloski
+        vreme = self.skladiste.vreme
+        caller_node.dodaj_odlazeci(poziv, trajanje, vreme)
+        if caller_node.pozvani is not None:
+            caller_node.pozvani[callee] = caller_node.pozvani.get(callee, 0) + 1
+            self._dodaj_u_par(poziv)
+
+        if inkrementalno:
+            # Novi poziv menja skor pozvanog, i skor svakog broja koga pozvani zove
+            # jer se njegov broj dolazecih poziva sabira u njihove sume pozivalaca
+            callee_node.suma_pozivalaca += caller_node.get_broj_dolazecih()
+            self.pop_cache.pop(callee, None)
+            self.rang_prljavi.add(callee)
+            self.promenjeni_skorovi.add(callee)
+
+            nodes = self.nodes
+            pop_cache = self.pop_cache
+            rang_prljavi = self.rang_prljavi
+            promenjeni_skorovi = self.promenjeni_skorovi
+            for broj, puta in self._pozvani(callee_node):
+                nodes[broj].suma_pozivalaca += puta
+                pop_cache.pop(broj, None)
+                rang_prljavi.add(broj)
+                promenjeni_skorovi.add(broj)
+
+        callee_node.dodaj_dolazeci(poziv, trajanje, vreme)
+
+        return poziv
+
+    def _pozvani(self, node):
+        # (pozvani broj, koliko puta); bez indeksa veza ide se kroz odlazece pozive,
+        # O(odlazecih) umesto O(razlicitih pozvanih), a isti broj moze doci vise puta
+        if node.pozvani is not None:
+            return node.pozvani.items()
+        skladiste = self.skladiste
+        return zip(map(skladiste.brojevi.__getitem__, map(skladiste.destinacije.__getitem__, node.odlazeci)),
+                   repeat(1))
+
+    def _pozivi_para(self, broj1, broj2):
+        if self.parovi is not None:
+            return self.parovi.get(self._kljuc_para(broj1, broj2), ())
+
+        # Pozivi para se biraju iz cvora sa manje poziva, po koloni drugog kraja
+        node1 = self.nodes.get(broj1)
+        node2 = self.nodes.get(broj2)
+        if node1 is None or node2 is None:
+            return ()
+        if node2.get_broj_ukupno() < node1.get_broj_ukupno():
+            node1, broj2 = node2, broj1
+
+        skladiste = self.skladiste
+        id2 = skladiste.id_broja[broj2]
+        izvori = skladiste.izvori
+        destinacije = skladiste.destinacije
+        pozivi = [poziv for poziv in node1.odlazeci if destinacije[poziv] == id2]
+        pozivi += [poziv for poziv in node1.dolazeci if izvori[poziv] == id2]
+        # Isti redosled kao u indeksu parova: po vremenu, pa redom dodavanja
+        vremena = skladiste.vremena
+        pozivi.sort(key=lambda poziv: (vremena[poziv], poziv))
+        return pozivi
+
+    def preuzmi_promenjene_skorove(self):
+        # Vraca brojeve kojima se skor promenio od prethodnog poziva, ili None ako su svi
+        with self.lock.za_pisanje():
+            if self.svi_skorovi_promenjeni:
+                promenjeni = None
+            else:
+                promenjeni = self.promenjeni_skorovi
+
+            self.promenjeni_skorovi = set()
+            self.svi_skorovi_promenjeni = False
+            return promenjeni
+
+    @contextmanager
+    def citanje(self):
+        # Lock za citanje uz sveze sume pozivalaca; preracunavanje je upis, pa se
+        # radi pod lock-om za pisanje pre nego sto se citanje nastavi. Unutra se mogu
+        # zvati i drugi upiti (npr. skor za svaki kontakt rangirane pretrage) bez ponovnog
+        # cekanja na pisce, ali ne i add_call.
+        while True:
+            self.lock.acquire_read()
+            if not self.sume_zastarele:
+                break
+            self.lock.release_read()
+            with self.lock.za_pisanje():
+                if self.sume_zastarele:
+                    self._preracunaj_sume()
+
+        try:
+            yield
+        finally:
+            self.lock.release_read()
+
+    def _preracunaj_sume(self):
+        nodes = self.nodes
+        izvor = self.skladiste.izvor
+        for node in nodes.values():
+            node.suma_pozivalaca = sum(len(nodes[izvor(poziv)].dolazeci) for poziv in node.dolazeci)
+        self.sume_zastarele = False
+
+    def kolone(self):
+        # Svi brojevi (redom dodavanja) i pozivi kao paralelni nizovi indeksa u te brojeve,
+        # epoha sekundi i trajanja; pozivi su sortirani po vremenu
+        with self.lock.za_citanje():
+            return self._kolone()
+
+    def _kolone(self):
+        brojevi = list(self.nodes)
+        id_broja = {broj: i for i, broj in enumerate(brojevi)}
+        skladiste = self.skladiste
+
+        if isinstance(skladiste, KolonskoSkladiste):
+            preslikaj = array('I', (id_broja[broj] for broj in skladiste.brojevi))
+            pozivi = sorted(range(len(skladiste)), key=skladiste.vremena.__getitem__)
+            izvori = array('I', (preslikaj[skladiste.izvori[i]] for i in pozivi))
+            destinacije = array('I', (preslikaj[skladiste.destinacije[i]] for i in pozivi))
+            vremena = array('d', (skladiste.vremena[i] for i in pozivi))
+            trajanja = array('I', (skladiste.trajanja[i] for i in pozivi))
+            return brojevi, izvori, destinacije, vremena, trajanja
+
+        pozivi = [poziv for node in self.nodes.values() for poziv in node.odlazeci]
+        pozivi.sort(key=skladiste.vreme)
+        izvori = array('I', (id_broja[poziv.izvor] for poziv in pozivi))
+        destinacije = array('I', (id_broja[poziv.destinacija] for poziv in pozivi))
+        vremena = array('d', ((poziv.vremePoziva - EPOHA).total_seconds() for poziv in pozivi))
+        trajanja = array('I', (int(poziv.trajanjePoziva) for poziv in pozivi))
+        return brojevi, izvori, destinacije, vremena, trajanja
+
+    def ucitaj_kolone(self, brojevi, izvori, destinacije, vremena, trajanja):
+        # Obrnuto od kolone(): puni prazan graf bez pojedinacnih add_call poziva. Pozivi su
+        # sortirani po vremenu, pa stabilno sortiranje indeksa po pozivaocu, pozvanom i paru
+        # daje liste cvorova i parova koje su vec hronoloske (sve petlje su u C-u ili po grupi)
+        with self.lock.za_pisanje():
+            self._ucitaj_kolone(brojevi, izvori, destinacije, vremena, trajanja)
+
+    def _ucitaj_kolone(self, brojevi, izvori, destinacije, vremena, trajanja):
+        if self.nodes or len(self.skladiste):
+            raise ValueError("ucitaj_kolone radi samo nad praznim grafom")
+
+        for broj in brojevi:
+            self._dodaj_broj(broj)
+        skladiste = self.skladiste
+        n = len(vremena)
+
+        if isinstance(skladiste, KolonskoSkladiste):
+            skladiste.brojevi = list(brojevi)
+            skladiste.id_broja = {broj: i for i, broj in enumerate(brojevi)}
+            skladiste.izvori = izvori
+            skladiste.destinacije = destinacije
+            skladiste.vremena = vremena
+            skladiste.trajanja = trajanja
+
+            def lista(indeksi):
+                return array('I', indeksi)
+        else:
+            pozivi = [skladiste.dodaj(brojevi[izvori[i]], brojevi[destinacije[i]], trajanja[i],
+                                      EPOHA + timedelta(seconds=vremena[i]))
+                      for i in range(n)]
+
+            def lista(indeksi):
+                return list(map(pozivi.__getitem__, indeksi))
+
+        cvorovi = list(self.nodes.values())
+        indeksi_veza = skladiste.indeksi_veza
+        if indeksi_veza:
+            imena_destinacija = list(map(brojevi.__getitem__, destinacije))
+
+        po_pozvanom = sorted(range(n), key=destinacije.__getitem__)
+        for id_broja, grupa in groupby(po_pozvanom, key=destinacije.__getitem__):
+            indeksi = list(grupa)
+            node = cvorovi[id_broja]
+            node.dolazeci = lista(indeksi)
+            node.trajanje_dolazecih = sum(map(trajanja.__getitem__, indeksi))
+
+        po_pozivaocu = sorted(range(n), key=izvori.__getitem__)
+        for id_broja, grupa in groupby(po_pozivaocu, key=izvori.__getitem__):
+            indeksi = list(grupa)
+            node = cvorovi[id_broja]
+            node.odlazeci = lista(indeksi)
+            node.trajanje_odlazecih = sum(map(trajanja.__getitem__, indeksi))
+            if indeksi_veza:
+                node.pozvani = dict(Counter(map(imena_destinacija.__getitem__, indeksi)))
+
+        if indeksi_veza:
+            parovi = self.parovi
+            parovi_poziva = list(zip(map(min, izvori, destinacije), map(max, izvori, destinacije)))
+            po_paru = sorted(range(n), key=parovi_poziva.__getitem__)
+            for (a, b), grupa in groupby(po_paru, key=parovi_poziva.__getitem__):
+                broj_a = brojevi[a]
+                broj_b = brojevi[b]
+                parovi[(broj_a, broj_b) if broj_a < broj_b else (broj_b, broj_a)] = lista(grupa)
+
+        self.saobracaj = Saobracaj.iz_kolona(brojevi, izvori, destinacije, vremena, trajanja)
+
+        self.sume_zastarele = True
+        self.rang_zastareo = True
+        self.svi_skorovi_promenjeni = True
         self.pop_cache = {}
 
-        return call_edge
+    @property
+    def naziv_skladista(self):
+        return self.skladiste.naziv
 
     def _normal_broj(self, broj):
         if isinstance(broj, str):
@@ -104,10 +617,20 @@ class Graph:
 
         broj = self._normal_broj(broj)
 
+        # Pogodak u kesu ne trazi lock: pisac brise stavku tek kada je skor vec promenjen
+        skor = self.pop_cache.get(broj)
+        if skor is not None:
+            return skor
+
+        with self.citanje():
+            return self._popularnost(broj)
+
+    def _popularnost(self, broj):
+        # Poziva se pod citanje(), kada su sume pozivalaca sveze
         if broj in self.pop_cache:
             return self.pop_cache[broj]
 
-        node = self.get_node(broj)
+        node = self.nodes.get(broj)
         if not node:
             return 0.0
 
@@ -117,43 +640,48 @@ class Graph:
             self.pop_cache[broj] = 0.0
             return 0.0
 
-        skor_poziva = dolazeci_broj * 10
-
-        ukupno_trajanje_min = node.trajanje_dolazecih / 60.0
-        skor_trajanja = ukupno_trajanje_min * 0.5
-
-        direktni_skor = skor_poziva + skor_trajanja
-
-
-        suma_pozivalaca = 0
-
-        for call in node.dolazeci:
-            caller_node = self.get_node(call.izvor)
-            if caller_node:
-                caller_pozivi = caller_node.get_broj_dolazecih()
-                suma_pozivalaca += caller_pozivi #broj poziva pozivalaca
-
-        if dolazeci_broj > 0:
-            prosecna_pop_pozivalaca = suma_pozivalaca / dolazeci_broj
-            bonus_pozivalaci = prosecna_pop_pozivalaca * 2
-        else:
-            bonus_pozivalaci = 0
-
-        final_score = direktni_skor + bonus_pozivalaci
+        # suma_pozivalaca se odrzava u add_call, pa nije potreban prolaz kroz dolazece pozive
+        final_score = skor_popularnosti(dolazeci_broj, node.trajanje_dolazecih, node.suma_pozivalaca)
 
         self.pop_cache[broj] = final_score
         return final_score
 
-    def top_pop_brojevi(self, n):
-        popularnosti = []
+    def _osvezi_rang(self):
+        if self.rang_zastareo:
+            kljucevi = {}
+            for broj, node in self.nodes.items():
+                kljucevi[broj] = (-self._popularnost(broj), node.redni_broj, broj)
+            self.rang = RangLista(kljucevi.values())
+            self.rang_kljucevi = kljucevi
+            self.rang_prljavi = set()
+            self.rang_zastareo = False
+            return
+
+        for broj in self.rang_prljavi:
+            stari = self.rang_kljucevi.get(broj)
+            novi = (-self._popularnost(broj), self.nodes[broj].redni_broj, broj)
+            if stari == novi:
+                continue
+            if stari is not None:
+                self.rang.ukloni(stari)
+            self.rang.dodaj(novi)
+            self.rang_kljucevi[broj] = novi
+        self.rang_prljavi = set()
 
-        for broj in self.nodes.keys():
-            score = self.izracunaj_popularnost(broj)
-            popularnosti.append((broj, score))
+    def top_pop_brojevi(self, n):
+        with self.citanje(), self.rang_lock:
+            self._osvezi_rang()
+            return [(broj, -skor) for skor, _, broj in self.rang.prvih(n)]
 
-        popularnosti.sort(key=lambda x: x[1], reverse=True)
+    def rang_broja(self, broj):
+        # Pozicija broja po popularnosti (1 = najpopularniji), None ako broj ne postoji
+        broj = self._normal_broj(broj)
+        if broj not in self.nodes:
+            return None
 
-        return popularnosti[:n]
+        with self.citanje(), self.rang_lock:
+            self._osvezi_rang()
+            return self.rang.indeks(self.rang_kljucevi[broj]) + 1
 
     def istorija_poziva(self, broj1, broj2=None):
         broj1 = self._normal_broj(broj1)
@@ -162,26 +690,84 @@ class Graph:
         if not node1:
             return []
 
-        if broj2:
+        skladiste = self.skladiste
 
-            broj2 = self._normal_broj(broj2)
-            calls = []
+        with self.lock.za_citanje():
+            if broj2:
+                # Indeks parova je vec sortiran po vremenu, cena je O(broj poziva izmedju njih);
+                # bez indeksa O(poziva manje aktivnog broja)
+                broj2 = self._normal_broj(broj2)
+                calls = self._pozivi_para(broj1, broj2)
+                return [skladiste.edge(call) for call in calls]
 
+            return list(self._pozivi_u_intervalu(node1))
 
-            for call in node1.odlazeci:
-                if call.destinacija == broj2:
-                    calls.append(call)
+    def pozivi_u_intervalu(self, broj, od=None, do=None, najnoviji_prvo=False, limit=None, offset=0):
+        # Lista Edge objekata broja sa vremenom u [od, do), spaja vec sortirane liste. Strana
+        # (offset, limit) se kopira pod lock-om: unos moze da umetne poziv usred liste cvora,
+        # pa indeksi u nju ne smeju da prezive lock
+        node = self.get_node(broj)
+        if not node:
+            return []
 
-            # Pozivi od phone2 ka phone1
-            for call in node1.dolazeci:
-                if call.izvor == broj2:
-                    calls.append(call)
+        with self.lock.za_citanje():
+            return list(self._pozivi_u_intervalu(node, od, do, najnoviji_prvo, limit, offset))
+
+    def _pozivi_u_intervalu(self, node, od=None, do=None, najnoviji_prvo=False, limit=None, offset=0):
+        skladiste = self.skladiste
+        vreme = skladiste.vreme
+        od = None if od is None else skladiste.kljuc_vremena(od)
+        do = None if do is None else skladiste.kljuc_vremena(do)
+
+        def opseg(pozivi):
+            pocetak = 0 if od is None else bisect_left(pozivi, od, key=vreme)
+            kraj = len(pozivi) if do is None else bisect_left(pozivi, do, key=vreme)
+            if najnoviji_prvo:
+                return (pozivi[i] for i in range(kraj - 1, pocetak - 1, -1))
+            return (pozivi[i] for i in range(pocetak, kraj))
+
+        if najnoviji_prvo:
+            # Obrnut redosled od rastuceg, pa odlazeci idu pre dolazecih kod istog vremena
+            spojeno = merge(opseg(node.odlazeci), opseg(node.dolazeci), key=vreme, reverse=True)
         else:
-            calls = node1.dolazeci + node1.odlazeci
+            spojeno = merge(opseg(node.dolazeci), opseg(node.odlazeci), key=vreme)
 
-        calls.sort(key=lambda x: x.vremePoziva)
+        kraj = None if limit is None else offset + limit
+        return map(skladiste.edge, islice(spojeno, offset, kraj))
 
-        return calls
+    def broj_poziva_u_intervalu(self, broj, od=None, do=None):
+        node = self.get_node(broj)
+        if not node:
+            return 0
+
+        skladiste = self.skladiste
+        vreme = skladiste.vreme
+        ukupno = 0
+        with self.lock.za_citanje():
+            for pozivi in (node.dolazeci, node.odlazeci):
+                pocetak = 0 if od is None else bisect_left(pozivi, skladiste.kljuc_vremena(od), key=vreme)
+                kraj = len(pozivi) if do is None else bisect_left(pozivi, skladiste.kljuc_vremena(do), key=vreme)
+                ukupno += max(0, kraj - pocetak)
+        return ukupno
+
+    # Upiti nad zbirnim saobracajem: prolaze kroz satne i dnevne bakete, ne kroz pozive
+
+    def najoptereceniji_sat(self, od=None, do=None):
+        with self.lock.za_citanje():
+            return self.saobracaj.najoptereceniji_sat(od, do)
+
+    def saobracaj_po_satu_dana(self, od=None, do=None):
+        with self.lock.za_citanje():
+            return self.saobracaj.po_satu_dana(od, do)
+
+    def saobracaj_po_danima(self, broj=None, od=None, do=None, smer='oba'):
+        broj = self._normal_broj(broj) if broj else None
+        with self.lock.za_citanje():
+            return self.saobracaj.po_danima(broj, od, do, smer)
+
+    def top_brojevi_u_intervalu(self, n, od=None, do=None, smer='oba'):
+        with self.lock.za_citanje():
+            return self.saobracaj.top_brojevi(n, od, do, smer)
 
     def __len__(self):
         return len(self.nodes)
\ No newline at end of file
@@ -0,0 +1,221 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+# Stanja sesije poziva
+USPOSTAVLJANJE = 'uspostavljanje'
+PROVERA = 'provera'
+ZVONI = 'zvoni'
+RAZGOVOR = 'razgovor'
+ZAVRSEN = 'zavrsen'
+
+# Ishodi zavrsene sesije
+USPESAN = 'uspesan'
+NEISPRAVAN = 'neispravan'
+BLOKIRAN = 'blokiran'
+ZAUZET = 'zauzet'
+BEZ_ODGOVORA = 'bez_odgovora'
+ODUSTAO = 'odustao'
+
+ISHODI = (USPESAN, NEISPRAVAN, BLOKIRAN, ZAUZET, BEZ_ODGOVORA, ODUSTAO)
+
+
+class Sesija:
+
+    __slots__ = ('id', 'caller', 'callee', 'stanje', 'ishod', 'pocetak', 'javljanje', 'trajanje', 'tajmer')
+
+    def __init__(self, id, caller, callee, pocetak):
+        self.id = id
+        self.caller = caller
+        self.callee = callee
+        self.stanje = USPOSTAVLJANJE
+        self.ishod = None
+        self.pocetak = pocetak    # simulirane sekunde od pocetka rada centrale
+        self.javljanje = None
+        self.trajanje = 0
+        self.tajmer = None        # asyncio.TimerHandle za sledeci dogadjaj sesije
+
+    def __repr__(self):
+        return f"Sesija(id={self.id}, {self.caller} -> {self.callee}, stanje={self.stanje}, ishod={self.ishod})"
+
+
+# Komutacioni deo centrale na asyncio petlji: svaka sesija je mali automat stanja koji
+# napreduje preko tajmera petlje (loop.call_later), bez niti i bez korutine po pozivu.
+# Vreme je simulirano: ubrzanje 60 znaci da jedan minut poziva traje jednu sekundu.
+class Centrala:
+
+    def __init__(self, graph, blokirani_brojevi, normalizuj=None, validan=None, ubrzanje=1.0,
+                 max_zvonjenje=30.0, pocetak=None):
+        self.graph = graph
+        self.blokirani_brojevi = blokirani_brojevi
+        self.normalizuj = normalizuj or (lambda broj: broj)
+        self.validan = validan or (lambda broj: bool(broj))
+        self.ubrzanje = ubrzanje
+        self.max_zvonjenje = max_zvonjenje
+        self.pocetak = pocetak or datetime.now()
+
+        self.loop = None
+        self._t0 = 0.0
+        self._sledeci_id = 0
+
+        self.aktivne = {}   # id -> sesija koja zvoni ili je u razgovoru
+        self.zauzeti = {}   # broj -> sesija u kojoj ucestvuje
+        self.u_razgovoru = 0
+        self.najvise_aktivnih = 0
+        self.ishodi = dict.fromkeys(ISHODI, 0)
+        self.sve_zavrseno = None
+
+    def pokreni(self):
+        self.loop = asyncio.get_running_loop()
+        self._t0 = self.loop.time()
+        self.sve_zavrseno = asyncio.Event()
+        self.sve_zavrseno.set()
+
+    def sada(self):
+        return (self.loop.time() - self._t0) * self.ubrzanje
+
+    def _kasnije(self, vreme, funkcija, *args):
+        # Zakazuje dogadjaj za zadato simulirano vreme
+        kasnjenje = max(0.0, (vreme - self.sada()) / self.ubrzanje)
+        return self.loop.call_later(kasnjenje, funkcija, *args)
+
+    def pozovi(self, caller, callee, zvonjenje=None, razgovor=None, vreme=None):
+        # zvonjenje: posle koliko sekundi se pozvani javlja (None = ne javlja se);
+        # razgovor: posle koliko sekundi od javljanja se spusta slusalica (None = rucno, spusti())
+        vreme = self.sada() if vreme is None else vreme
+        self._sledeci_id += 1
+        sesija = Sesija(self._sledeci_id, self.normalizuj(caller), self.normalizuj(callee), vreme)
+
+        sesija.stanje = PROVERA
+        if (not self.validan(sesija.caller) or not self.validan(sesija.callee)
+                or sesija.caller == sesija.callee):
+            return self._zavrsi(sesija, NEISPRAVAN, vreme)
+
+        if sesija.caller in self.blokirani_brojevi or sesija.callee in self.blokirani_brojevi:
+            return self._zavrsi(sesija, BLOKIRAN, vreme)
+
+        if sesija.caller in self.zauzeti or sesija.callee in self.zauzeti:
+            return self._zavrsi(sesija, ZAUZET, vreme)
+
+        sesija.stanje = ZVONI
+        self.aktivne[sesija.id] = sesija
+        self.zauzeti[sesija.caller] = sesija
+        self.zauzeti[sesija.callee] = sesija
+        self.sve_zavrseno.clear()
+        if len(self.aktivne) > self.najvise_aktivnih:
+            self.najvise_aktivnih = len(self.aktivne)
+
+        if zvonjenje is not None and zvonjenje < self.max_zvonjenje:
+            sesija.tajmer = self._kasnije(vreme + zvonjenje, self.javi_se, sesija, razgovor, vreme + zvonjenje)
+        else:
+            kraj = vreme + self.max_zvonjenje
+            sesija.tajmer = self._kasnije(kraj, self._zavrsi, sesija, BEZ_ODGOVORA, kraj)
+
+        return sesija
+
+    def javi_se(self, sesija, razgovor=None, vreme=None):
+        if sesija.stanje != ZVONI:
+            return
+
+        vreme = self.sada() if vreme is None else vreme
+        sesija.tajmer.cancel()
+        sesija.stanje = RAZGOVOR
+        sesija.javljanje = vreme
+        self.u_razgovoru += 1
+
+        sesija.tajmer = None
+        if razgovor is not None:
+            sesija.tajmer = self._kasnije(vreme + razgovor, self.spusti, sesija, vreme + razgovor)
+
+    def spusti(self, sesija, vreme=None):
+        if sesija.stanje == RAZGOVOR:
+            self._zavrsi(sesija, USPESAN, vreme)
+        elif sesija.stanje == ZVONI:
+            self._zavrsi(sesija, ODUSTAO, vreme)
+
+    def _zavrsi(self, sesija, ishod, vreme=None):
+        vreme = self.sada() if vreme is None else vreme
+
+        if sesija.tajmer is not None:
+            sesija.tajmer.cancel()
+            sesija.tajmer = None
+
+        if sesija.stanje == RAZGOVOR:
+            self.u_razgovoru -= 1
+            sesija.trajanje = int(vreme - sesija.javljanje)
+
+        if self.aktivne.pop(sesija.id, None) is not None:
+            del self.zauzeti[sesija.caller]
+            del self.zauzeti[sesija.callee]
+            if not self.aktivne:
+                self.sve_zavrseno.set()
+
+        sesija.stanje = ZAVRSEN
+        sesija.ishod = ishod
+        self.ishodi[ishod] += 1
+
+        # U graf ide samo uspostavljen razgovor, sa vremenom pocetka poziva
+        if ishod == USPESAN:
+            self.graph.add_call(sesija.caller, sesija.callee, sesija.trajanje,
+                                self.pocetak + timedelta(seconds=sesija.pocetak))
+        return sesija
+
+    async def izvrsi_scenario(self, koraci):
+        # koraci: (vreme, caller, callee, zvonjenje, razgovor) sortirani po vremenu
+        if self.loop is None:
+            self.pokreni()
+
+        for vreme, caller, callee, zvonjenje, razgovor in koraci:
+            kasnjenje = (vreme - self.sada()) / self.ubrzanje
+            if kasnjenje > 0:
+                await asyncio.sleep(kasnjenje)
+            self.pozovi(caller, callee, zvonjenje, razgovor, vreme)
+
+        await self.sve_zavrseno.wait()
+
+    def statistika(self):
+        return {
+            'zavrseno': sum(self.ishodi.values()),
+            'aktivnih': len(self.aktivne),
+            'u_razgovoru': self.u_razgovoru,
+            'najvise_aktivnih': self.najvise_aktivnih,
+            'ishodi': dict(self.ishodi),
+        }
+
+    def __repr__(self):
+        return (f"Centrala(aktivnih={len(self.aktivne)}, u_razgovoru={self.u_razgovoru}, "
+                f"zavrseno={sum(self.ishodi.values())})")
+
+
+def ucitaj_scenario(filename):
+    # Red scenarija: pomeraj_s, pozivalac, pozvani, zvonjenje_s, trajanje_s
+    # (zvonjenje '-' = pozvani se ne javlja); prazni redovi i redovi sa # se preskacu
+    koraci = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = [p.strip() for p in line.split(',')]
+            if len(parts) < 5:
+                continue
+            zvonjenje = None if parts[3] == '-' else float(parts[3])
+            koraci.append((float(parts[0]), parts[1], parts[2], zvonjenje, float(parts[4])))
+
+    koraci.sort(key=lambda korak: korak[0])
+    return koraci
+
+
+def slucajni_scenario(brojevi, broj_sesija, trajanje, seed=None, verovatnoca_odgovora=0.8,
+                      prosecan_razgovor=180.0, max_zvonjenje=20.0):
+    rng = random.Random(seed)
+    koraci = []
+    for _ in range(broj_sesija):
+        caller = rng.choice(brojevi)
+        callee = rng.choice(brojevi)
+        zvonjenje = rng.uniform(1.0, max_zvonjenje) if rng.random() < verovatnoca_odgovora else None
+        koraci.append((rng.uniform(0, trajanje), caller, callee, zvonjenje,
+                       rng.expovariate(1 / prosecan_razgovor)))
+
+    koraci.sort(key=lambda korak: korak[0])
+    return koraci
@@ -1,23 +1,88 @@
+import asyncio
 import os
 import time
 import pickle
 import threading
 import random
+import sys
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from difflib import SequenceMatcher
 
+import komutacija
+import metrike
+import opterecenje
+import snapshot
+import strimovanje
+import zurnal as zurnal_modul
+from fuzzy_index import FuzzyIndex
 from graph import Graph
+from shardovani_graf import ShardovaniGraf
 from trie import PhoneBookTrie
 
 
-graph = Graph()
+# Velicina bloka (u bajtovima) za masovno ucitavanje poziva i broj procesa za parsiranje (0 = bez procesa)
+VELICINA_BLOKA = 4 * 1024 * 1024
+PROCESI_ZA_UCITAVANJE = 0
+
+# Binarni snapshot stanja (zamena za centrala_data.pkl, vidi snapshot.py)
+SNAPSHOT_FAJL = 'centrala_data.snap'
+
+# Zurnal promena od poslednjeg snapshot-a; posle CHECKPOINT_SVAKIH zapisa pravi se novi snapshot
+ZURNAL_FAJL = 'centrala_data.journal'
+CHECKPOINT_SVAKIH = 50000
+
+# Broj poziva po strani pri prikazu istorije jednog broja
+STRANA_ISTORIJE = 20
+
+# Broj prikazanih rezultata pretrage imenika i dozvoljen broj gresaka u imenu
+MAX_REZULTATA = 20
+MAX_IZMENA_IMENA = 2
+
+# Operacije simulacije opterecenja i podrazumevana mesavina (procenti)
+OPERACIJE_OPTERECENJA = ('poziv', 'istorija', 'pretraga', 'top')
+MESAVINA_OPTERECENJA = (70, 10, 10, 10)
+
+# 'objekti' (Edge objekti) ili 'kolone' (kompaktni nizovi, za velike calls.txt fajlove)
+SKLADISTE_POZIVA = 'objekti'
+
+# Prijem poziva uzivo (vidi strimovanje.py): podrazumevani fajl koji se prati i velicina serije za unos
+PRIJEM_FAJL = 'cdr.txt'
+PRIJEM_SERIJA = 5000
+
+# Instrumentacija (vidi metrike.py): ukljucena od pokretanja, fajl za izvoz i port HTTP servera (0 = bez servera)
+METRIKE_UKLJUCENE = False
+METRIKE_FAJL = 'centrala_metrike'
+METRIKE_PORT = 0
+
+# Broj procesa preko kojih se deli graf (vidi shardovani_graf.py); 0 = jedan Graph u ovom procesu
+BROJ_SHARDOVA = 0
+
+graph = Graph(SKLADISTE_POZIVA)
 phonebook_trie = PhoneBookTrie()
 blokirani_brojevi = set()
 kontakti = {}  # broj -> {ime, prezime, puno_ime, original_broj}
+fuzzy_indeks = FuzzyIndex()  # q-gram indeks brojeva iz imenika za did_you_mean
+zurnal = None
+sekvenca_checkpointa = 0  # poslednji zapis zurnala sadrzan u ucitanom snapshot-u
+
+# Pozivi iz calls.txt se ucitavaju u pozadini; nit drzi graf_lock dok unosi jedan blok
+graf_lock = threading.Lock()
+ucitavanje_gotovo = threading.Event()
+ucitavanje_gotovo.set()
+delimicni_upiti = False  # korisnik je izabrao upite nad delimicno ucitanim grafom
+napredak_ucitavanja = {'poziva': 0, 'bajtova': 0, 'ukupno_bajtova': 0, 'izvestaj': None}
 
 
 # ===== HELPER FUNKCIJE =====
 
+def novi_graf():
+    if BROJ_SHARDOVA:
+        return ShardovaniGraf(BROJ_SHARDOVA, SKLADISTE_POZIVA)
+    return Graph(SKLADISTE_POZIVA)
+
+
 def normalizuj_broj(broj):
     if isinstance(broj, str):
         return broj.replace(" ", "").replace("-", "")
@@ -39,6 +104,58 @@ def parsiraj_trajanje(trajanje_str):
     return 0
 
 
+def parsiraj_trajanje_brzo(trajanje_str):
+    # Fiksni format HH:MM:SS bez split-a, ostalo ide kroz parsiraj_trajanje
+    if len(trajanje_str) == 8 and trajanje_str[2] == ':' and trajanje_str[5] == ':':
+        try:
+            return (int(trajanje_str[0:2]) * 3600
+                    + int(trajanje_str[3:5]) * 60
+                    + int(trajanje_str[6:8]))
+        except ValueError:
+            pass
+    return parsiraj_trajanje(trajanje_str)
+
+
+def parsiraj_vreme_brzo(datum_vreme):
+    # Fiksni format dd.mm.YYYY HH:MM:SS bez strptime, ostalo ide kroz strptime
+    if len(datum_vreme) == 19 and datum_vreme[2] == '.' and datum_vreme[13] == ':':
+        try:
+            return datetime(int(datum_vreme[6:10]), int(datum_vreme[3:5]), int(datum_vreme[0:2]),
+                            int(datum_vreme[11:13]), int(datum_vreme[14:16]), int(datum_vreme[17:19]))
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(datum_vreme, '%d.%m.%Y %H:%M:%S')
+    except ValueError:
+        return datetime.now()
+
+
+def parsiraj_blok_poziva(linije):
+    # Vraca (pozivi, broj neispravnih linija); poziva se i iz procesa za parsiranje
+    pozivi = []
+    neispravnih = 0
+
+    for line in linije:
+        parts = line.split(',', 4)
+        if len(parts) < 4:
+            if line.strip():
+                neispravnih += 1
+            continue
+
+        caller = parts[0].strip().replace(" ", "").replace("-", "")
+        callee = parts[1].strip().replace(" ", "").replace("-", "")
+
+        if not validan_broj(caller) or not validan_broj(callee):
+            neispravnih += 1
+            continue
+
+        pozivi.append((caller, callee,
+                       parsiraj_trajanje_brzo(parts[3].strip()),
+                       parsiraj_vreme_brzo(parts[2].strip())))
+
+    return pozivi, neispravnih
+
+
 def formatiraj_trajanje(sekunde):
     sati = int(sekunde // 3600)
     minuti = int((sekunde % 3600) // 60)
@@ -53,6 +170,67 @@ def get_kontakt_info(broj):
     return broj
 
 
+def popularnost_kontakta(kontakt_data):
+    # Dok se pozivi ucitavaju imenik se ne rangira (svi skorovi su 0, redosled je abecedni)
+    if not ucitavanje_gotovo.is_set():
+        return 0
+    return graph.izracunaj_popularnost(normalizuj_broj(kontakt_data['phone']))
+
+
+def osvezi_rangiranje():
+    # Top-k kesevi u imeniku se brisu samo za brojeve kojima se popularnost promenila
+    if ucitavanje_gotovo.is_set():
+        phonebook_trie.refresh_scores(graph.preuzmi_promenjene_skorove())
+
+
+def opis_napretka():
+    ukupno = napredak_ucitavanja['ukupno_bajtova']
+    procenat = 100 * napredak_ucitavanja['bajtova'] / ukupno if ukupno else 0
+    return f"{procenat:.0f}% ({napredak_ucitavanja['poziva']:,} poziva)"
+
+
+def sacekaj_ucitavanje():
+    if ucitavanje_gotovo.is_set():
+        return
+    while not ucitavanje_gotovo.wait(0.5):
+        print(f"\r  Ucitavanje poziva: {opis_napretka()}   ", end='', flush=True)
+    print(f"\r  Ucitavanje poziva zavrseno: {napredak_ucitavanja['poziva']:,} poziva      ")
+
+
+@contextmanager
+def pristup_grafu(samo_citanje=False):
+    # Upisi uvek cekaju kraj ucitavanja; upiti mogu da cekaju ili da rade nad delimicnim grafom
+    global delimicni_upiti
+    if ucitavanje_gotovo.is_set():
+        yield
+        return
+
+    print(f"\nPozivi se jos ucitavaju: {opis_napretka()}")
+    if samo_citanje and input("Sacekati kraj ucitavanja? (d/n): ").strip().lower() == 'n':
+        print("DELIMICNI REZULTATI: prikazani su samo do sada ucitani pozivi "
+              "(ucitavanje je pauzirano samo dok traje pojedinacni upit)")
+        delimicni_upiti = True
+        try:
+            yield
+        finally:
+            delimicni_upiti = False
+        return
+
+    sacekaj_ucitavanje()
+    yield
+
+
+@contextmanager
+def upit_grafu():
+    # Kod delimicnih upita graf_lock se drzi samo dok traje upit nad grafom, a ne dok se
+    # ceka unos ili ispisuju rezultati, pa ucitavanje ne stoji dok korisnik kuca
+    if delimicni_upiti:
+        with graf_lock:
+            yield
+    else:
+        yield
+
+
 def autocomplete_input(prompt, tip='broj'):
 
     while True:
@@ -65,18 +243,26 @@ def autocomplete_input(prompt, tip='broj'):
                 print("Unesite bar jedan karakter pre * za autocomplete")
                 continue
 
+            # Sugestije su rangirane po popularnosti u grafu
+            osvezi_rangiranje()
             if tip == 'broj':
-                sugestije = phonebook_trie.autocomplete_phone(prefiks, max_suggestions=5)
+                sugestije = phonebook_trie.ranked_autocomplete_phone(prefiks, popularnost_kontakta, 5)
             elif tip == 'ime':
-                sugestije = phonebook_trie.autocomplete_first_name(prefiks, max_suggestions=5)
+                sugestije = phonebook_trie.ranked_autocomplete_first_name(prefiks, popularnost_kontakta, 5)
             else:
-                sugestije = phonebook_trie.autocomplete_last_name(prefiks, max_suggestions=5)
+                sugestije = phonebook_trie.ranked_autocomplete_last_name(prefiks, popularnost_kontakta, 5)
 
             if not sugestije:
                 print(f"Nema sugestija za '{prefiks}'")
                 continue
 
 
+            # Kljucevi imena su bez akcenata, pa se prikazuje originalno ime iz kontakta
+            if tip == 'ime':
+                sugestije = [(data['first_name'], data) for _, data in sugestije]
+            elif tip == 'prezime':
+                sugestije = [(data['last_name'], data) for _, data in sugestije]
+
             print(f"\nSugestije za {prefiks}:")
             for i, (text, data) in enumerate(sugestije, 1):
                 if tip == 'broj':
@@ -112,32 +298,39 @@ def ucitaj_kontakte(filename='phones.txt'):
 
             parts = line.split(',')
             if len(parts) >= 2:
-                ime_prezime = parts[0].strip()
-                broj = parts[1].strip()
-
-                # Razdvoji ime i prezime
-                name_parts = ime_prezime.split()
-                if len(name_parts) >= 2:
-                    ime = name_parts[0]
-                    prezime = ' '.join(name_parts[1:])
-                else:
-                    ime = ime_prezime
-                    prezime = ""
+                dodaj_kontakt(parts[0].strip(), parts[1].strip())
 
-                normalizovan_broj = normalizuj_broj(broj)
+    print(f"Učitano {len(kontakti)} kontakata.")
 
-                phonebook_trie.add_contact(normalizovan_broj, ime, prezime)
 
-                graph.add_phone(normalizovan_broj)
+def dodaj_kontakt(ime_prezime, broj):
 
-                kontakti[normalizovan_broj] = {
-                    'ime': ime,
-                    'prezime': prezime,
-                    'puno_ime': ime_prezime,
-                    'original_broj': broj
-                }
+    if zurnal is not None:
+        zurnal.zapisi_kontakt(ime_prezime, broj)
 
-    print(f"Učitano {len(kontakti)} kontakata.")
+    # Razdvoji ime i prezime
+    name_parts = ime_prezime.split()
+    if len(name_parts) >= 2:
+        ime = name_parts[0]
+        prezime = ' '.join(name_parts[1:])
+    else:
+        ime = ime_prezime
+        prezime = ""
+
+    normalizovan_broj = normalizuj_broj(broj)
+
+    phonebook_trie.add_contact(normalizovan_broj, ime, prezime)
+
+    graph.add_phone(normalizovan_broj)
+
+    fuzzy_indeks.add(normalizovan_broj)
+
+    kontakti[normalizovan_broj] = {
+        'ime': ime,
+        'prezime': prezime,
+        'puno_ime': ime_prezime,
+        'original_broj': broj
+    }
 
 
 def ucitaj_blokirane(filename='blocked.txt'):
@@ -152,12 +345,23 @@ def ucitaj_blokirane(filename='blocked.txt'):
         for line in f:
             broj = line.strip()
             if broj:
-                normalizovan = normalizuj_broj(broj)
-                blokirani_brojevi.add(normalizovan)
+                blokiraj_broj(broj)
 
     print(f"Ucitano {len(blokirani_brojevi)} blokiranih brojeva.")
 
 
+def blokiraj_broj(broj, blokiran=True):
+    normalizovan = normalizuj_broj(broj)
+
+    if zurnal is not None:
+        zurnal.zapisi_blokadu(normalizovan, blokiran)
+
+    if blokiran:
+        blokirani_brojevi.add(normalizovan)
+    else:
+        blokirani_brojevi.discard(normalizovan)
+
+
 def ucitaj_pozive(filename='calls.txt', max_poziva=None):
 
     if not os.path.exists(filename):
@@ -214,14 +418,111 @@ def ucitaj_pozive(filename='calls.txt', max_poziva=None):
     print(f"Učitano {pozivi_ucitani} poziva (od toga {pozivi_blokirani} sa blokiranim brojevima)")
 
 
+def citaj_blokove(f, velicina_bloka=VELICINA_BLOKA):
+    while True:
+        linije = f.readlines(velicina_bloka)
+        if not linije:
+            return
+        yield linije
+
+
+def parsirani_blokovi(f, procesi=0, velicina_bloka=VELICINA_BLOKA):
+    if not procesi:
+        for linije in citaj_blokove(f, velicina_bloka):
+            yield parsiraj_blok_poziva(linije)
+        return
+
+    # Najvise 2 bloka po procesu su u obradi, da se ceo fajl ne bi ucitao u memoriju
+    with ProcessPoolExecutor(max_workers=procesi) as pool:
+        u_obradi = deque()
+        for linije in citaj_blokove(f, velicina_bloka):
+            u_obradi.append(pool.submit(parsiraj_blok_poziva, linije))
+            if len(u_obradi) >= 2 * procesi:
+                yield u_obradi.popleft().result()
+
+        while u_obradi:
+            yield u_obradi.popleft().result()
+
+
+def ucitaj_pozive_brzo(filename='calls.txt', max_poziva=None, procesi=PROCESI_ZA_UCITAVANJE,
+                       velicina_bloka=VELICINA_BLOKA, pozadina=False):
+
+    if not os.path.exists(filename):
+        print(f"UPOZORENJE: Fajl {filename} ne postoji! Pokrenite generate_calls.py prvo.")
+        return
+
+    # U pozadini se napredak samo belezi (prikazuje ga meni), a izvestaj se cuva za kraj
+    if not pozadina:
+        print(f"Masovno učitavanje poziva iz {filename}" + (f" ({procesi} procesa)..." if procesi else "..."))
+        if max_poziva:
+            print(f"(učitavanje prvih {max_poziva} poziva)")
+    napredak_ucitavanja['ukupno_bajtova'] = os.path.getsize(filename)
+
+    start = time.perf_counter()
+    pozivi_ucitani = 0
+    pozivi_blokirani = 0
+    neispravnih = 0
+
+    with open(filename, 'r', encoding='utf-8') as f:
+        for pozivi, los_blok in parsirani_blokovi(f, procesi, velicina_bloka):
+            neispravnih += los_blok
+
+            if max_poziva and pozivi_ucitani + len(pozivi) > max_poziva:
+                pozivi = pozivi[:max_poziva - pozivi_ucitani]
+
+            if blokirani_brojevi:
+                for caller, callee, _, _ in pozivi:
+                    if caller in blokirani_brojevi or callee in blokirani_brojevi:
+                        pozivi_blokirani += 1
+
+            with graf_lock:
+                graph.add_calls(pozivi)
+            pozivi_ucitani += len(pozivi)
+            napredak_ucitavanja['poziva'] = pozivi_ucitani
+            napredak_ucitavanja['bajtova'] = f.buffer.tell()
+            if not pozadina:
+                print(f"  Učitano {pozivi_ucitani} poziva...")
+
+            if max_poziva and pozivi_ucitani >= max_poziva:
+                break
+
+    proteklo = time.perf_counter() - start
+    linija = pozivi_ucitani + neispravnih
+    brzina = linija / proteklo if proteklo > 0 else 0
+
+    izvestaj = (f"Učitano {pozivi_ucitani} poziva (od toga {pozivi_blokirani} sa blokiranim brojevima, "
+                f"{neispravnih} neispravnih linija)\n"
+                f"Vreme: {proteklo:.2f}s | {brzina:,.0f} linija/s")
+    if pozadina:
+        napredak_ucitavanja['izvestaj'] = izvestaj
+    else:
+        print(izvestaj)
+
+
+def ucitaj_pozive_u_pozadini(filename='calls.txt'):
+    # Zurnal se ponavlja i otvara tek posle fajla, da se pozivi iz calls.txt ne bi upisivali u njega
+    def ucitavanje():
+        try:
+            ucitaj_pozive_brzo(filename, pozadina=True)
+            with graf_lock:
+                pokreni_zurnal()
+        finally:
+            ucitavanje_gotovo.set()
+
+    ucitavanje_gotovo.clear()
+    threading.Thread(target=ucitavanje, daemon=True).start()
+
+
 def sacuvaj_pickle(filename='centrala_data.pkl'):
     print(f"\nCuvanje podataka u {filename}...")
 
+    # Kao kod snapshot-a: sekvenca poslednjeg zapisa zurnala koji je vec u ovim podacima
     data = {
         'graph': graph,
         'phonebook_trie': phonebook_trie,
         'blokirani_brojevi': blokirani_brojevi,
-        'kontakti': kontakti
+        'kontakti': kontakti,
+        'sekvenca_zurnala': zurnal.sekvenca if zurnal is not None else 0
     }
 
     with open(filename, 'wb') as f:
@@ -231,7 +532,7 @@ def sacuvaj_pickle(filename='centrala_data.pkl'):
 
 
 def ucitaj_pickle(filename='centrala_data.pkl'):
-    global graph, phonebook_trie, blokirani_brojevi, kontakti
+    global graph, phonebook_trie, blokirani_brojevi, kontakti, fuzzy_indeks, sekvenca_checkpointa
 
     if not os.path.exists(filename):
         return False
@@ -243,9 +544,15 @@ def ucitaj_pickle(filename='centrala_data.pkl'):
             data = pickle.load(f)
 
         graph = data['graph']
+        if BROJ_SHARDOVA:
+            graph = novi_graf()
+            graph.ucitaj_kolone(*data['graph'].kolone())
         phonebook_trie = data['phonebook_trie']
         blokirani_brojevi = data['blokirani_brojevi']
         kontakti = data['kontakti']
+        fuzzy_indeks = FuzzyIndex(kontakti.keys())
+        # Pickle fajlovi bez sekvence su stariji od zurnala, pa se ponavlja ceo zurnal
+        sekvenca_checkpointa = data.get('sekvenca_zurnala', 0)
 
         print("Podaci uspešno ucitani")
         return True
@@ -255,6 +562,90 @@ def ucitaj_pickle(filename='centrala_data.pkl'):
         return False
 
 
+def sacuvaj_snapshot(filename=SNAPSHOT_FAJL):
+    print(f"\nCuvanje podataka u {filename}...")
+    start = time.perf_counter()
+    sekvenca = zurnal.sekvenca if zurnal is not None else 0
+    snapshot.sacuvaj(filename, graph, kontakti, blokirani_brojevi, sekvenca)
+    print(f"Podaci uspešno sacuvani ({time.perf_counter() - start:.2f}s)")
+
+
+def ucitaj_snapshot(filename=SNAPSHOT_FAJL):
+    global graph, phonebook_trie, blokirani_brojevi, kontakti, fuzzy_indeks, sekvenca_checkpointa
+
+    if not os.path.exists(filename):
+        return False
+
+    print(f"Ucitavanje podataka iz {filename}...")
+
+    try:
+        start = time.perf_counter()
+        data = snapshot.ucitaj(filename, graph=novi_graf() if BROJ_SHARDOVA else None)
+
+        graph = data['graph']
+        phonebook_trie = data['phonebook_trie']
+        blokirani_brojevi = data['blokirani_brojevi']
+        kontakti = data['kontakti']
+        fuzzy_indeks = FuzzyIndex(kontakti.keys())
+        sekvenca_checkpointa = data['sekvenca_zurnala']
+
+        print(f"Podaci uspešno ucitani ({time.perf_counter() - start:.2f}s)")
+        return True
+
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Greska pri ucitavanju snapshot-a: {e}")
+        return False
+
+
+def primeni_zapise(zapisi):
+    # Uzastopni pozivi iz zurnala se unose zajedno, a kontakti i blokade redom izmedju njih
+    pozivi = []
+    for zapis in zapisi:
+        tip = zapis[1]
+        if tip == zurnal_modul.POZIV:
+            caller, callee, trajanje, vreme = zapis[2:]
+            pozivi.append((caller, callee, trajanje, zurnal_modul.vreme_zapisa(vreme)))
+            continue
+
+        if pozivi:
+            graph.add_calls(pozivi)
+            pozivi = []
+
+        if tip == zurnal_modul.KONTAKT:
+            dodaj_kontakt(*zapis[2:])
+        elif tip == zurnal_modul.BLOKIRAN:
+            blokiraj_broj(zapis[2])
+        elif tip == zurnal_modul.ODBLOKIRAN:
+            blokiraj_broj(zapis[2], blokiran=False)
+
+    if pozivi:
+        graph.add_calls(pozivi)
+
+
+def pokreni_zurnal(filename=ZURNAL_FAJL):
+    global zurnal
+
+    # Zapisi posle poslednjeg checkpoint-a se ponavljaju pre nego sto se zurnal ponovo otvori
+    zapisi, _ = zurnal_modul.procitaj(filename)
+    zapisi = [zapis for zapis in zapisi if zapis[0] > sekvenca_checkpointa]
+
+    if zapisi:
+        print(f"Ponavljanje {len(zapisi)} zapisa iz zurnala {filename}...")
+        start = time.perf_counter()
+        primeni_zapise(zapisi)
+        print(f"Zurnal primenjen ({time.perf_counter() - start:.2f}s)")
+
+    zurnal = zurnal_modul.Zurnal(filename, sekvenca_checkpointa)
+    graph.zurnal = zurnal
+
+
+def checkpoint():
+    # Novi snapshot sadrzi sve iz zurnala, pa se zurnal prazni tek kada je snapshot upisan
+    zurnal.sinhronizuj()
+    sacuvaj_snapshot()
+    zurnal.isprazni()
+
+
 def simulacija_pozivanja_uzivo():
     print("Simulacija pozivanja uzivo")
     print("=" * 80)
@@ -456,7 +847,8 @@ def istorija_poziva_dva_broja():
                 print(f"  {i}. {get_kontakt_info(broj)}")
         return
 
-    pozivi = graph.istorija_poziva(broj1_norm, broj2_norm)
+    with upit_grafu():
+        pozivi = graph.istorija_poziva(broj1_norm, broj2_norm)
 
     if not pozivi:
         print("\n Nema istorije poziva izmedju ova dva broja.")
@@ -499,37 +891,59 @@ def istorija_poziva_jedan_broj():
                 print(f"  {i}. {get_kontakt_info(slican_broj)}")
         return
 
-    pozivi = graph.istorija_poziva(broj_norm)
+    with upit_grafu():
+        ukupno = graph.broj_poziva_u_intervalu(broj_norm)
+        rang = graph.rang_broja(broj_norm)
+        broj_cvorova = len(graph)
 
-    if not pozivi:
+    if not ukupno:
         print(f"\nNema istorije poziva za broj {broj}.")
         return
 
     print(f"\n=====================================")
     print(f"ISTORIJA: {get_kontakt_info(broj_norm)}")
     print("==========================================")
-    print(f"Pronadjeno {len(pozivi)} poziva:\n")
+    print(f"Rang po popularnosti: {rang}/{broj_cvorova}")
+    print(f"Pronadjeno {ukupno} poziva:\n")
     print(f"{'#':>3} | {'Datum/Vreme':<20} | {'Trajanje':<10} | {'Tip':>8} | Drugi broj")
     print("-----------------------------------------------------------------------------------")
 
-    for i, poziv in enumerate(pozivi, 1):
-        vreme = poziv.vremePoziva.strftime('%d.%m.%Y %H:%M:%S')
-        trajanje = formatiraj_trajanje(poziv.trajanjePoziva)
+    # Istorija se cita strana po strana, bez sortiranja svih poziva; svaka strana je kopija
+    # uzeta pod lock-om, pa unos za vreme cekanja na Enter ne kvari vec prikazanu stranu
+    i = 0
+    while True:
+        with upit_grafu():
+            strana = graph.pozivi_u_intervalu(broj_norm, limit=STRANA_ISTORIJE, offset=i)
+        for poziv in strana:
+            i += 1
+            prikazi_poziv_istorije(i, poziv, broj_norm)
 
-        if poziv.izvor == broj_norm:
-            tip = "Odlazni"
-            drugi_broj = get_kontakt_info(poziv.destinacija)
-        else:
-            tip = "Dolazni"
-            drugi_broj = get_kontakt_info(poziv.izvor)
+        if len(strana) < STRANA_ISTORIJE or i >= ukupno:
+            break
+        if input(f"-- {i}/{ukupno} | Enter za sledecu stranu, q za kraj: ").strip().lower() == 'q':
+            break
 
-        print(f"{i:3} | {vreme:<20} | {trajanje:<10} | {tip:>8} | {drugi_broj}")
+
+def prikazi_poziv_istorije(i, poziv, broj_norm):
+    vreme = poziv.vremePoziva.strftime('%d.%m.%Y %H:%M:%S')
+    trajanje = formatiraj_trajanje(poziv.trajanjePoziva)
+
+    if poziv.izvor == broj_norm:
+        tip = "Odlazni"
+        drugi_broj = get_kontakt_info(poziv.destinacija)
+    else:
+        tip = "Dolazni"
+        drugi_broj = get_kontakt_info(poziv.izvor)
+
+    print(f"{i:3} | {vreme:<20} | {trajanje:<10} | {tip:>8} | {drugi_broj}")
 
 
 def pretraga_imenika():
     print("\n===============================================" )
     print("PRETRAGA TELEFONSKOG IMENIKA")
     print("===============================================")
+    if not ucitavanje_gotovo.is_set():
+        print(f"(Pozivi se jos ucitavaju, {opis_napretka()} - rezultati nisu rangirani po popularnosti)")
     print("1. Pretraga po imenu")
     print("2. Pretraga po prezimenu")
     print("3. Pretraga po broju telefona")
@@ -549,25 +963,31 @@ def pretraga_imenika():
 def pretraga_po_imenu():
     print("\nDodajte * za autocomplete (npr: Mar*)")
     upit = autocomplete_input("Unesite ime za pretragu: ", tip='ime')
-    rezultati = phonebook_trie.search_by_first_name(upit)
-    prikazi_rezultate_pretrage(rezultati, upit, "ime")
+    osvezi_rangiranje()
+    rezultati = phonebook_trie.ranked_autocomplete_first_name(upit, popularnost_kontakta, MAX_REZULTATA)
+    ukupno = phonebook_trie.first_name_trie.count_prefix(upit)
+    prikazi_rezultate_pretrage(rezultati, upit, "ime", ukupno)
 
 
 def pretraga_po_prezimenu():
     print("\nDodajte * za autocomplete (npr: Mar*)")
     upit = autocomplete_input("Unesite prezime za pretragu: ", tip='prezime')
-    rezultati = phonebook_trie.search_by_last_name(upit)
-    prikazi_rezultate_pretrage(rezultati, upit, "prezime")
+    osvezi_rangiranje()
+    rezultati = phonebook_trie.ranked_autocomplete_last_name(upit, popularnost_kontakta, MAX_REZULTATA)
+    ukupno = phonebook_trie.last_name_trie.count_prefix(upit)
+    prikazi_rezultate_pretrage(rezultati, upit, "prezime", ukupno)
 
 
 def pretraga_po_broju():
     print("\nDodajte * za autocomplete (npr: 064*)")
     upit = autocomplete_input("Unesite pocetne cifre broja: ", tip='broj')
-    rezultati = phonebook_trie.search_by_phone(upit)
-    prikazi_rezultate_pretrage(rezultati, upit, "broj")
+    osvezi_rangiranje()
+    rezultati = phonebook_trie.ranked_autocomplete_phone(upit, popularnost_kontakta, MAX_REZULTATA)
+    ukupno = phonebook_trie.phone_trie.count_prefix(upit)
+    prikazi_rezultate_pretrage(rezultati, upit, "broj", ukupno)
 
 
-def prikazi_rezultate_pretrage(rezultati, upit, tip):
+def prikazi_rezultate_pretrage(rezultati, upit, tip, ukupno=None):
     if not rezultati:
         print("\nNema rezultata pretrage.")
 
@@ -577,13 +997,21 @@ def prikazi_rezultate_pretrage(rezultati, upit, tip):
                 print("\nDa li ste mislili na:")
                 for i, (broj, skor) in enumerate(sugestije[:5], 1):
                     print(f"  {i}. {get_kontakt_info(broj)}")
+        else:
+            # Imena sa greskom u kucanju, npr. "Marjana" -> "Marijana"
+            kljuc = 'first_names' if tip == 'ime' else 'last_names'
+            sugestije = phonebook_trie.fuzzy_search(upit, MAX_IZMENA_IMENA, max_results=5)[kljuc]
+            if sugestije:
+                print("\nDa li ste mislili na:")
+                for i, (_, kontakt, _) in enumerate(sugestije, 1):
+                    print(f"  {i}. {get_kontakt_info(normalizuj_broj(kontakt['phone']))}")
         return
 
     rangirani = []
     for ime_ili_broj, kontakt_data in rezultati:
         broj = kontakt_data['phone']
         broj_norm = normalizuj_broj(broj)
-        popularnost = graph.izracunaj_popularnost(broj_norm)
+        popularnost = popularnost_kontakta(kontakt_data)
         rangirani.append((broj_norm, kontakt_data, popularnost))
 
     rangirani.sort(key=lambda x: x[2], reverse=True)
@@ -591,11 +1019,13 @@ def prikazi_rezultate_pretrage(rezultati, upit, tip):
     print(f"\n==================================================================")
     print(f"REZULTATI PRETRAGE: '{upit}'")
     print("===================================================================")
-    print(f"Pronadeno {len(rangirani)} rezultata (rangirano po popularnosti):\n")
+    if ukupno is None:
+        ukupno = len(rangirani)
+    print(f"Pronadeno {ukupno} rezultata (rangirano po popularnosti):\n")
     print(f"{'#':>3} | {'Ime i Prezime':<25} | {'Broj':<18} | Popularnost")
     print("-------------------------------------------------------------------")
 
-    for i, (broj, kontakt, popularnost) in enumerate(rangirani[:20], 1):
+    for i, (broj, kontakt, popularnost) in enumerate(rangirani[:MAX_REZULTATA], 1):
         ime = kontakt.get('first_name', '')
         prezime = kontakt.get('last_name', '')
         puno_ime = f"{ime} {prezime}".strip()
@@ -613,37 +1043,89 @@ def prikazi_rezultate_pretrage(rezultati, upit, tip):
 
 
 def did_you_mean(upit):
-    svi_brojevi = list(kontakti.keys())
-    slicnosti = []
+    # SequenceMatcher se racuna samo za kandidate iz q-gram indeksa, ne za ceo imenik
+    return fuzzy_indeks.suggest(upit, 5)
 
-    for broj in svi_brojevi:
-        skor = SequenceMatcher(None, upit, broj).ratio()
-        if skor > 0.5:  # Threshold
-            slicnosti.append((broj, skor))
 
-    slicnosti.sort(key=lambda x: x[1], reverse=True)
-    return slicnosti[:5]
+# ===== Simulacija opterecenja =====
 
+def unos_sa_podrazumevanim(prompt, podrazumevano, tip=str):
+    unos = input(prompt + (f" [{podrazumevano}]" if podrazumevano is not None else "") + ": ").strip()
+    if not unos:
+        return podrazumevano
+    try:
+        return tip(unos)
+    except ValueError:
+        print(f"Neispravan unos, koristi se {podrazumevano}")
+        return podrazumevano
 
-# ===== Simulacija opterecenja =====
 
 def simulacija_opterecenja():
     print("\n" + "=" * 80)
     print("SIMULACIJA OPTEREĆENJA TELEFONSKE CENTRALE")
     print("=" * 80)
-    print("Generisanje 1000 poziva u toku 1 minuta...")
-    print("Pritisnite 'p' za pauzu, 'n' za nastavak, 'q' za prekid\n")
 
-    start_time = time.time()
-    ciljno_vreme = 60  # sekunde
-    broj_poziva = 1000
-    interval = ciljno_vreme / broj_poziva
+    # Lista brojeva se pravi jednom, a ne pri svakom pozivu
+    svi_brojevi = list(kontakti.keys())
+    if len(svi_brojevi) < 2:
+        print("Nedovoljno brojeva u bazi!")
+        return
 
-    generisani_pozivi = 0
-    blokirano = 0
-    ukupno_trajanje = 0
+    brzina = unos_sa_podrazumevanim("Ciljna brzina (operacija/s, 0 = maksimalno)", 100.0, float)
+    trajanje = unos_sa_podrazumevanim("Trajanje (s)", 60.0, float)
+    obrazac = unos_sa_podrazumevanim(f"Obrazac dolazaka ({'/'.join(opterecenje.OBRASCI)})", 'poisson')
+    if obrazac not in opterecenje.OBRASCI:
+        print("Nepoznat obrazac, koristi se poisson")
+        obrazac = 'poisson'
+    seed = unos_sa_podrazumevanim("Seed (Enter = slucajan)", None, int)
+    mesavina = unos_sa_podrazumevanim(f"Mesavina {'/'.join(OPERACIJE_OPTERECENJA)} (%)",
+                                      '/'.join(str(t) for t in MESAVINA_OPTERECENJA))
+
+    try:
+        tezine = [float(t) for t in mesavina.split('/')]
+        if len(tezine) != len(OPERACIJE_OPTERECENJA) or min(tezine) < 0 or sum(tezine) <= 0:
+            raise ValueError
+    except ValueError:
+        print("Neispravna mesavina, koristi se podrazumevana")
+        tezine = MESAVINA_OPTERECENJA
+
+    rng = random.Random(seed)
+    blokirano = [0]
+    ukupno_trajanje = [0]
+
+    def poziv():
+        caller = rng.choice(svi_brojevi)
+        callee = rng.choice(svi_brojevi)
+        while caller == callee:
+            callee = rng.choice(svi_brojevi)
+
+        # Proveri blokirane brojeve
+        if caller in blokirani_brojevi or callee in blokirani_brojevi:
+            blokirano[0] += 1
+            return
+
+        trajanje_poziva = rng.randint(10, 600)
+        ukupno_trajanje[0] += trajanje_poziva
+        graph.add_call(caller, callee, trajanje_poziva)
+
+    def istorija():
+        broj = rng.choice(svi_brojevi)
+        graph.pozivi_u_intervalu(broj, najnoviji_prvo=True, limit=STRANA_ISTORIJE)
+
+    def pretraga():
+        prezime = kontakti[rng.choice(svi_brojevi)]['prezime'] or 'a'
+        osvezi_rangiranje()
+        phonebook_trie.ranked_autocomplete_last_name(prezime[:2], popularnost_kontakta, MAX_REZULTATA)
+
+    def top():
+        graph.top_pop_brojevi(5)
+
+    operacije = dict(zip(OPERACIJE_OPTERECENJA, (poziv, istorija, pretraga, top)))
+
+    print(f"\n{'Maksimalna brzina' if brzina <= 0 else f'{brzina:g} operacija/s'}, {trajanje:g}s, "
+          f"obrazac {obrazac}, seed {seed}")
+    print("Pritisnite 'p' za pauzu, 'n' za nastavak, 'q' za prekid\n")
 
-    paused = False
     finished = False
 
     # Non-blocking input thread
@@ -653,76 +1135,59 @@ def simulacija_opterecenja():
         while not finished:
             try:
                 cmd = input().strip().lower()
+                if cmd == 'p':
+                    print("\n [PAUZIRANO] Pritisnite 'n' za nastavak...")
+                elif cmd == 'n':
+                    print(" [NASTAVLJENO]")
+                elif cmd == 'q':
+                    print("\n [PREKINUTO]")
                 command[0] = cmd
+            except EOFError:
+                break
             except:
                 pass
 
+    def napredak(proteklo, izvrseno):
+        print(f"Proteklo: {int(proteklo)}s | Operacija: {izvrseno} | "
+              f"{izvrseno / proteklo:,.0f} op/s | Blokirano: {blokirano[0]}")
+
     t = threading.Thread(target=input_thread, daemon=True)
     t.start()
 
     try:
-        while generisani_pozivi < broj_poziva:
-            if command[0] == 'p':
-                paused = True
-                print("\n [PAUZIRANO] Pritisnite 'n' za nastavak...")
-                command[0] = None
-            elif command[0] == 'n':
-                paused = False
-                print(" [NASTAVLJENO]")
-                command[0] = None
-            elif command[0] == 'q':
-                print("\n [PREKINUTO]")
-                break
-
-            if paused:
-                time.sleep(0.1)
-                continue
-
-            # Generiši slučajan poziv
-            svi_brojevi = list(kontakti.keys())
-            if len(svi_brojevi) < 2:
-                print("Nedovoljno brojeva u bazi!")
-                break
-
-            caller = random.choice(svi_brojevi)
-            callee = random.choice(svi_brojevi)
-            while caller == callee:
-                callee = random.choice(svi_brojevi)
-
-            # Proveri blokirane brojeve
-            if caller in blokirani_brojevi or callee in blokirani_brojevi:
-                blokirano += 1
-            else:
-                # Generiši trajanje (10-600 sekundi)
-                trajanje = random.randint(10, 600)
-                ukupno_trajanje += trajanje
-
-                # Dodaj poziv u graf
-                graph.add_call(caller, callee, trajanje)
-
-            generisani_pozivi += 1
-
-            if generisani_pozivi % 100 == 0:
-                proteklo = time.time() - start_time
-                print(f"Generisano: {generisani_pozivi}/{broj_poziva} | "
-                      f"Proteklo: {int(proteklo)}s | Blokirano: {blokirano}")
-
-            time.sleep(interval)
-
+        rezultat = opterecenje.pokreni(operacije, dict(zip(OPERACIJE_OPTERECENJA, tezine)), brzina, trajanje,
+                                       rng, obrazac, command, napredak)
         finished = True
 
+        proteklo = rezultat['proteklo']
+        histogrami = rezultat['operacije']
+        pozivi = len(histogrami['poziv'])
 
         print("\n=======================================================" )
         print("Izvestaj simulacije")
         print("=======================================================")
-        print(f"Ukupno generisano poziva: {generisani_pozivi}")
-        print(f"Blokirano poziva:         {blokirano}")
-        print(f"Uspesno procesuirano:     {generisani_pozivi - blokirano}")
-
-        if generisani_pozivi - blokirano > 0:
-            prosecno = ukupno_trajanje / (generisani_pozivi - blokirano)
+        print(f"Trajanje:                 {proteklo:.2f}s")
+        print(f"Ukupno operacija:         {rezultat['izvrseno']}")
+        print(f"Ostvarena brzina:         {rezultat['izvrseno'] / proteklo:,.1f} op/s"
+              + (f" (cilj {brzina:g})" if brzina > 0 else ""))
+        print(f"Ukupno generisano poziva: {pozivi}")
+        print(f"Blokirano poziva:         {blokirano[0]}")
+        print(f"Uspesno procesuirano:     {pozivi - blokirano[0]}")
+
+        if pozivi - blokirano[0] > 0:
+            prosecno = ukupno_trajanje[0] / (pozivi - blokirano[0])
             print(f"Prosecno trajanje poziva: {formatiraj_trajanje(prosecno)}")
 
+        # Latencije su od planiranog dolaska (sa cekanjem u redu), servis je samo izvrsavanje
+        print(f"\n{'Operacija':<10} | {'Broj':>8} | {'op/s':>9} | {'p50 ms':>8} | {'p95 ms':>8} | "
+              f"{'p99 ms':>8} | {'max ms':>8} | {'servis p99':>10}")
+        print("-" * 92)
+        for naziv, histogram in histogrami.items():
+            print(f"{naziv:<10} | {len(histogram):>8} | {len(histogram) / proteklo:>9,.1f} | "
+                  f"{histogram.percentil(50) / 1e6:>8.3f} | {histogram.percentil(95) / 1e6:>8.3f} | "
+                  f"{histogram.percentil(99) / 1e6:>8.3f} | {histogram.maksimum / 1e6:>8.3f} | "
+                  f"{rezultat['servis'][naziv].percentil(99) / 1e6:>10.3f}")
+
         print("\nTop 5 najpopularnijih brojeva:")
         print("-------------------------------------------------------------")
         top_brojevi = graph.top_pop_brojevi(5)
@@ -733,31 +1198,330 @@ def simulacija_opterecenja():
     except KeyboardInterrupt:
         print("\n\n Simulacija prekinuta")
 
+    finished = True
+
+
+def simulacija_centrale():
+    print("\n" + "=" * 80)
+    print("SIMULACIJA CENTRALE (vise istovremenih poziva)")
+    print("=" * 80)
+
+    fajl = input("Fajl sa scenarijem (Enter = slucajni scenario): ").strip()
+    ubrzanje = unos_sa_podrazumevanim("Ubrzanje simuliranog vremena", 60.0, float)
+
+    if fajl:
+        try:
+            koraci = komutacija.ucitaj_scenario(fajl)
+        except (OSError, ValueError) as e:
+            print(f"Greska pri ucitavanju scenarija: {e}")
+            return
+    else:
+        svi_brojevi = list(kontakti.keys())
+        if len(svi_brojevi) < 2:
+            print("Nedovoljno brojeva u bazi!")
+            return
+        broj_sesija = unos_sa_podrazumevanim("Broj poziva", 10000, int)
+        trajanje = unos_sa_podrazumevanim("Trajanje scenarija (simulirane sekunde)", 600.0, float)
+        seed = unos_sa_podrazumevanim("Seed (Enter = slucajan)", None, int)
+        koraci = komutacija.slucajni_scenario(svi_brojevi, broj_sesija, trajanje, seed)
+
+    centrala = komutacija.Centrala(graph, blokirani_brojevi, normalizuj_broj, validan_broj, ubrzanje)
+    print(f"\nScenario: {len(koraci)} poziva, ubrzanje {ubrzanje:g}x. Ctrl+C za prekid.\n")
+
+    async def prikaz():
+        while True:
+            await asyncio.sleep(1)
+            st = centrala.statistika()
+            print(f"Simulirano: {formatiraj_trajanje(centrala.sada())} | Aktivnih: {st['aktivnih']} | "
+                  f"U razgovoru: {st['u_razgovoru']} | Zavrseno: {st['zavrseno']}")
+
+    async def izvrsi():
+        centrala.pokreni()
+        zadatak = asyncio.create_task(prikaz())
+        try:
+            await centrala.izvrsi_scenario(koraci)
+        finally:
+            zadatak.cancel()
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(izvrsi())
+    except KeyboardInterrupt:
+        print("\n\n Simulacija prekinuta")
+    proteklo = time.perf_counter() - start
+
+    st = centrala.statistika()
+    print("\n=======================================================")
+    print("Izvestaj simulacije centrale")
+    print("=======================================================")
+    print(f"Stvarno vreme:            {proteklo:.2f}s")
+    print(f"Zavrseno sesija:          {st['zavrseno']}")
+    print(f"Najvise istovremenih:     {st['najvise_aktivnih']}")
+    for ishod, broj in st['ishodi'].items():
+        print(f"  {ishod:<22}  {broj}")
+    print(f"Dodato u graf:            {st['ishodi'][komutacija.USPESAN]}")
+
+
+def prijem_poziva():
+    print("\n" + "=" * 80)
+    print("PRIJEM POZIVA UZIVO")
+    print("=" * 80)
+
+    izvor = unos_sa_podrazumevanim("Fajl koji se prati ('-' = standardni ulaz)", PRIJEM_FAJL)
+    od_pocetka = True
+    if izvor != '-':
+        if not os.path.exists(izvor):
+            print(f"Fajl {izvor} ne postoji!")
+            return
+        od_pocetka = input("Citati fajl od pocetka? (d/n): ").strip().lower() == 'd'
+
+    prijem = strimovanje.Prijem(graph, blokirani_brojevi, normalizuj_broj, validan_broj, parsiraj_vreme_brzo,
+                                parsiraj_trajanje_brzo, velicina_serije=PRIJEM_SERIJA)
+    prethodno = [0, time.perf_counter()]
+
+    def izvestaj(p):
+        st = p.stat
+        sada = time.perf_counter()
+        brzina = (st.procitano - prethodno[0]) / (sada - prethodno[1])
+        prethodno[:] = [st.procitano, sada]
+        delova, max_delova, serija, max_serija = p.popunjenost()
+        print(f"\rProcitano: {st.procitano:,} | Uneto: {st.uneto:,} | Neispravnih: {st.neispravnih} | "
+              f"Blokiranih: {st.blokiranih} | Duplikata: {st.duplikata} | {brzina:,.0f} linija/s | "
+              f"Redovi: {delova}/{max_delova}, {serija}/{max_serija}   ", end='', flush=True)
+
+    print(f"\nPraćenje {'standardnog ulaza' if izvor == '-' else izvor}. "
+          f"{'Kraj ulaza ili ' if izvor == '-' else ''}Ctrl+C za kraj.\n")
+    try:
+        st = prijem.pokreni(izvor, prati=izvor != '-', od_pocetka=od_pocetka, izvestaj=izvestaj)
+    except OSError as e:
+        print(f"\nGreska pri citanju: {e}")
+        return
+
+    print("\n\n=======================================================")
+    print("Izvestaj prijema poziva")
+    print("=======================================================")
+    print(f"Trajanje:                 {st.proteklo():.2f}s")
+    print(f"Procitano linija:         {st.procitano}")
+    print(f"Uneto u graf:             {st.uneto} ({st.serija} serija)")
+    print(f"Neispravnih:              {st.neispravnih}")
+    print(f"Blokiranih:               {st.blokiranih}")
+    print(f"Duplikata:                {st.duplikata}")
+    print(f"Prosecna brzina:          {st.brzina():,.0f} linija/s")
+
+
+def unos_datuma(prompt):
+    # Prazan unos znaci bez granice; do je iskljucen, pa je "do 02.03." ceo 1. mart
+    while True:
+        unos = input(prompt).strip()
+        if not unos:
+            return None
+        try:
+            return datetime.strptime(unos, '%d.%m.%Y')
+        except ValueError:
+            print("Datum mora biti u formatu dd.mm.gggg")
+
+
+def analiza_saobracaja():
+    print("\n" + "=" * 80)
+    print("ANALIZA SAOBRACAJA")
+    print("=" * 80)
+    print("1. Najoptereceniji sat")
+    print("2. Saobracaj po satu u danu")
+    print("3. Broj poziva po danima za jedan broj")
+    print("4. Najaktivniji brojevi u periodu")
+
+    izbor = input("\nIzaberite opciju: ").strip()
+    if izbor not in ('1', '2', '3', '4'):
+        print("Nepoznata opcija.")
+        return
+
+    broj_norm = None
+    if izbor == '3':
+        broj_norm = normalizuj_broj(autocomplete_input("\nUnesite broj: ", tip='broj'))
+        if broj_norm not in graph.nodes:
+            print(f"\nNema poziva za broj {broj_norm}.")
+            return
+
+    od = unos_datuma("Od datuma (dd.mm.gggg, Enter = od pocetka): ")
+    do = unos_datuma("Do datuma, iskljucen (Enter = do kraja): ")
+
+    if izbor == '1':
+        with upit_grafu():
+            rezultat = graph.najoptereceniji_sat(od, do)
+        if rezultat is None:
+            print("\nNema poziva u periodu.")
+            return
+        sat, poziva, trajanje = rezultat
+        print(f"\nNajoptereceniji sat: {sat.strftime('%d.%m.%Y %H:00')}-{sat.hour + 1:02}:00 | "
+              f"{poziva} poziva | ukupno {formatiraj_trajanje(trajanje)}")
+
+    elif izbor == '2':
+        with upit_grafu():
+            po_satu = graph.saobracaj_po_satu_dana(od, do)
+        najvise = max(poziva for poziva, _ in po_satu)
+        if not najvise:
+            print("\nNema poziva u periodu.")
+            return
+        print(f"\n{'Sat':<11} | {'Poziva':>8} | {'Prosek':>10} |")
+        print("-" * 80)
+        for sat, (poziva, trajanje) in enumerate(po_satu):
+            prosek = formatiraj_trajanje(trajanje // poziva) if poziva else '-'
+            print(f"{sat:02}:00-{sat + 1:02}:00 | {poziva:>8} | {prosek:>10} | {'#' * (40 * poziva // najvise)}")
+
+    elif izbor == '3':
+        with upit_grafu():
+            dani = [(dan, poziva) for dan, poziva in graph.saobracaj_po_danima(broj_norm, od, do) if poziva]
+        if not dani:
+            print("\nNema poziva u periodu.")
+            return
+        print(f"\n{get_kontakt_info(broj_norm)}: {sum(poziva for _, poziva in dani)} poziva u {len(dani)} dana\n")
+        for dan, poziva in dani:
+            print(f"{dan.strftime('%d.%m.%Y')} | {poziva:>5}")
+
+    else:
+        n = unos_sa_podrazumevanim("Broj brojeva", 10, int)
+        with upit_grafu():
+            top = graph.top_brojevi_u_intervalu(n, od, do)
+        if not top:
+            print("\nNema poziva u periodu.")
+            return
+        print()
+        for i, (broj, poziva) in enumerate(top, 1):
+            print(f"{i:3}. {get_kontakt_info(broj)} - {poziva} poziva")
+
+
+# ===== Metrike =====
+
+def prikazi_metrike():
+    podaci = metrike.stanje()
+    print(f"\nInstrumentacija: {'ukljucena' if podaci['ukljuceno'] else 'iskljucena'} "
+          f"| Mereno {formatiraj_trajanje(int(podaci['trajanje_s']))}")
+
+    if not podaci['latencije_ns']:
+        print("Nema merenja.")
+        return
+
+    print(f"\n{'Operacija':<38} | {'Broj':>9} | {'p50 (us)':>10} | {'p99 (us)':>10} | {'Max (ms)':>9} | {'Ukupno (s)':>10}")
+    print("-" * 100)
+    for naziv, l in podaci['latencije_ns'].items():
+        print(f"{naziv:<38} | {l['broj']:>9} | {l['p50'] / 1e3:>10.1f} | {l['p99'] / 1e3:>10.1f} | "
+              f"{l['max'] / 1e6:>9.2f} | {l['ukupno'] / 1e9:>10.3f}")
+
+    kes = podaci['pop_cache']
+    if kes['stopa_pogodaka'] is not None:
+        print(f"\npop_cache: {kes['pogodaka']} pogodaka, {kes['promasaja']} promasaja "
+              f"({kes['stopa_pogodaka']:.1%} pogodaka)")
+
+    greske = {naziv: broj for naziv, broj in podaci['brojaci'].items() if naziv.endswith('.greske')}
+    for naziv, broj in greske.items():
+        print(f"{naziv}: {broj}")
+
+
+def meni_metrika():
+    print("\n===============================================")
+    print("METRIKE I INSTRUMENTACIJA")
+    print("===============================================")
+    print("1. Prikazi metrike")
+    print(f"2. {'Iskljuci' if metrike.ukljuceno else 'Ukljuci'} instrumentaciju")
+    print(f"3. Sacuvaj kao JSON ({METRIKE_FAJL}.json)")
+    print(f"4. Sacuvaj u Prometheus formatu ({METRIKE_FAJL}.prom)")
+    print("5. Pokreni HTTP server (/metrics, /metrics.json)")
+    print("6. Resetuj metrike")
+
+    izbor = input("\nIzaberite opciju: ").strip()
+
+    if izbor == '1':
+        prikazi_metrike()
+    elif izbor == '2':
+        if metrike.ukljuceno:
+            metrike.iskljuci()
+            print("Instrumentacija iskljucena (izmerene vrednosti ostaju do reseta).")
+        else:
+            metrike.ukljuci()
+            print("Instrumentacija ukljucena.")
+    elif izbor in ('3', '4'):
+        format, ekstenzija = ('json', 'json') if izbor == '3' else ('prometheus', 'prom')
+        filename = f"{METRIKE_FAJL}.{ekstenzija}"
+        metrike.sacuvaj(filename, format)
+        print(f"Metrike sacuvane u {filename}")
+    elif izbor == '5':
+        port = unos_sa_podrazumevanim("Port", METRIKE_PORT or 9100, int)
+        try:
+            port = metrike.pokreni_server(port)
+            print(f"Metrike na http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            print(f"Server nije pokrenut: {e}")
+    elif izbor == '6':
+        metrike.resetuj()
+        print("Metrike resetovane.")
+    else:
+        print("Nepoznata opcija")
+
+
+def pokreni_metrike():
+    # Ucitavanje i cuvanje iz ovog modula se meri zajedno sa Graph/Trie operacijama
+    metrike.registruj(sys.modules[__name__], ('ucitaj_kontakte', 'ucitaj_blokirane', 'ucitaj_pozive',
+                                              'ucitaj_pozive_brzo', 'ucitaj_snapshot', 'ucitaj_pickle',
+                                              'checkpoint', 'osvezi_rangiranje', 'did_you_mean'), 'main')
+    if METRIKE_UKLJUCENE:
+        metrike.ukljuci()
+    if METRIKE_PORT:
+        try:
+            metrike.pokreni_server(METRIKE_PORT)
+        except OSError as e:
+            print(f"Server za metrike nije pokrenut: {e}")
+
 
 def inicijalizuj_sistem():
+    global graph
+
+    if BROJ_SHARDOVA:
+        print(f"\nGraf poziva se deli na {BROJ_SHARDOVA} procesa.")
+
+    if os.path.exists(SNAPSHOT_FAJL):
+        print("\nPronadjen snapshot sa sacuvanim podacima.")
+
+        if ucitaj_snapshot():
+            pokreni_zurnal()
+            print("\nSistem spreman za rad!")
+            return
 
+    # Stari pickle se ucitava jos ovaj put, a pri izlazu se cuva kao snapshot
     if os.path.exists('centrala_data.pkl'):
         print("\nPronadjen fajl sa sacuvanim podacima.")
 
         if ucitaj_pickle():
+            pokreni_zurnal()
             print("\nSistem spreman za rad!")
             return
 
     print("\nUcitavanje podataka iz fajlova...")
     print("--------------------------------------------" )
 
+    if BROJ_SHARDOVA:
+        graph = novi_graf()
+
     ucitaj_kontakte('phones.txt')
     ucitaj_blokirane('blocked.txt')
 
+    # Imenik i blokirani brojevi su spremni odmah, a pozivi stizu u graf u pozadini
     if os.path.exists('calls.txt'):
-        print("\nPronadjen fajl sa pozivima (calls.txt)")
-        ucitaj_pozive('calls.txt')
+        print("\nPronadjen fajl sa pozivima (calls.txt), ucitava se u pozadini.")
+        ucitaj_pozive_u_pozadini('calls.txt')
     else:
         print("\ncalls.txt ne postoji! Pokrenite generate_calls.py za generisanje.")
+        pokreni_zurnal()
 
 def main():
+    pokreni_metrike()
     inicijalizuj_sistem()
     while True:
+        if not ucitavanje_gotovo.is_set():
+            print(f"\n[Ucitavanje poziva u pozadini: {opis_napretka()}]")
+        elif napredak_ucitavanja['izvestaj']:
+            print(f"\n{napredak_ucitavanja['izvestaj']}")
+            napredak_ucitavanja['izvestaj'] = None
+
         print("====== TELEFONSKA CENTRALA ============")
         print("1. Simulacija pozivanja uživo")
         print("2. Simulacija pozivanja iz fajla")
@@ -765,34 +1529,73 @@ def main():
         print("4. Istorija poziva jednog broja")
         print("5. Pretraga telefonskog imenika")
         print("6. Simulacija opterećenja centrale")
+        print("7. Simulacija centrale (vise istovremenih poziva)")
+        print("8. Metrike i instrumentacija")
+        print("9. Prijem poziva uzivo (praćenje CDR fajla)")
+        print("10. Analiza saobracaja (najoptereceniji sat)")
         print("0. Izlaz")
 
 
         izbor = input("\nIzaberite opciju: ").strip()
 
         if izbor == '1':
-            simulacija_pozivanja_uzivo()
+            with pristup_grafu():
+                simulacija_pozivanja_uzivo()
         elif izbor == '2':
-            simulacija_pozivanja_iz_fajla()
+            with pristup_grafu():
+                simulacija_pozivanja_iz_fajla()
         elif izbor == '3':
-            istorija_poziva_dva_broja()
+            with pristup_grafu(samo_citanje=True):
+                istorija_poziva_dva_broja()
         elif izbor == '4':
-            istorija_poziva_jedan_broj()
+            with pristup_grafu(samo_citanje=True):
+                istorija_poziva_jedan_broj()
         elif izbor == '5':
             pretraga_imenika()
         elif izbor == '6':
-            simulacija_opterecenja()
+            with pristup_grafu():
+                simulacija_opterecenja()
+        elif izbor == '7':
+            with pristup_grafu():
+                simulacija_centrale()
+        elif izbor == '8':
+            meni_metrika()
+        elif izbor == '9':
+            with pristup_grafu():
+                prijem_poziva()
+        elif izbor == '10':
+            with pristup_grafu(samo_citanje=True):
+                analiza_saobracaja()
         elif izbor == '0':
             print("\nDovidjenja")
             break
         else:
             print("Nepoznata opcija. Pokušajte ponovo.")
 
+        if zurnal is None:
+            continue
+        if zurnal.broj_zapisa >= CHECKPOINT_SVAKIH:
+            checkpoint()
+        else:
+            zurnal.sinhronizuj()
+
 
 
 
+    # Promene su vec u zurnalu, pa se ceo snapshot prepisuje samo kada se zurnal dovoljno napuni
     print("\nČuvanje podataka...")
-    sacuvaj_pickle()
+    try:
+        sacekaj_ucitavanje()
+        if zurnal is None:
+            # Ucitavanje je palo pre otvaranja zurnala; nepotpun graf ne sme da zameni snapshot
+            print("\nUcitavanje poziva nije zavrseno, podaci nisu sacuvani. Dovidjenja")
+            return
+        if zurnal.broj_zapisa >= CHECKPOINT_SVAKIH or not os.path.exists(SNAPSHOT_FAJL):
+            checkpoint()
+        zurnal.zatvori()
+    finally:
+        if BROJ_SHARDOVA:
+            graph.zatvori()
     print("\nPodaci sacuvani. Dovidjenja")
 
 
@@ -0,0 +1,270 @@
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fuzzy_index import FuzzyIndex
+from graph import Graph
+from opterecenje import Histogram
+from shardovani_graf import ShardovaniGraf
+from trie import PhoneBookTrie
+
+# Metode koje se mere: (klasa ili modul, naziv atributa, naziv metrike)
+CILJEVI = [
+    (Graph, 'add_call', 'graph.add_call'),
+    (Graph, 'add_calls', 'graph.add_calls'),
+    (Graph, 'ucitaj_kolone', 'graph.ucitaj_kolone'),
+    (Graph, 'istorija_poziva', 'graph.istorija_poziva'),
+    (Graph, 'izracunaj_popularnost', 'graph.izracunaj_popularnost'),
+    (Graph, '_popularnost', 'graph.racunanje_popularnosti'),
+    (Graph, '_osvezi_rang', 'graph.osvezi_rang'),
+    (Graph, 'top_pop_brojevi', 'graph.top_pop_brojevi'),
+    (Graph, 'rang_broja', 'graph.rang_broja'),
+    (Graph, 'najoptereceniji_sat', 'graph.najoptereceniji_sat'),
+    (Graph, 'top_brojevi_u_intervalu', 'graph.top_brojevi_u_intervalu'),
+    (ShardovaniGraf, 'add_call', 'shardovani_graf.add_call'),
+    (ShardovaniGraf, 'add_calls', 'shardovani_graf.add_calls'),
+    (ShardovaniGraf, 'istorija_poziva', 'shardovani_graf.istorija_poziva'),
+    (ShardovaniGraf, 'izracunaj_popularnost', 'shardovani_graf.izracunaj_popularnost'),
+    (ShardovaniGraf, '_osvezi_sume', 'shardovani_graf.osvezi_sume'),
+    (ShardovaniGraf, 'top_pop_brojevi', 'shardovani_graf.top_pop_brojevi'),
+    (ShardovaniGraf, 'rang_broja', 'shardovani_graf.rang_broja'),
+    (PhoneBookTrie, 'add_contact', 'trie.add_contact'),
+    (PhoneBookTrie, 'search_by_phone', 'trie.search_by_phone'),
+    (PhoneBookTrie, 'search_by_first_name', 'trie.search_by_first_name'),
+    (PhoneBookTrie, 'search_by_last_name', 'trie.search_by_last_name'),
+    (PhoneBookTrie, 'autocomplete_phone', 'trie.autocomplete_phone'),
+    (PhoneBookTrie, 'autocomplete_first_name', 'trie.autocomplete_first_name'),
+    (PhoneBookTrie, 'autocomplete_last_name', 'trie.autocomplete_last_name'),
+    (PhoneBookTrie, 'ranked_autocomplete_phone', 'trie.ranked_autocomplete_phone'),
+    (PhoneBookTrie, 'ranked_autocomplete_first_name', 'trie.ranked_autocomplete_first_name'),
+    (PhoneBookTrie, 'ranked_autocomplete_last_name', 'trie.ranked_autocomplete_last_name'),
+    (PhoneBookTrie, 'fuzzy_search', 'trie.fuzzy_search'),
+    (PhoneBookTrie, 'refresh_scores', 'trie.refresh_scores'),
+    (FuzzyIndex, 'suggest', 'fuzzy_index.suggest'),
+]
+
+ukljuceno = False
+brojaci = {}
+histogrami = {}
+pocetak = time.time()
+
+_lock = threading.Lock()
+_originali = {}  # (vlasnik, naziv atributa) -> originalna funkcija
+_server = None
+
+
+# Instrumentacija se ukljucuje zamenom metoda omotacima, a iskljucuje vracanjem originala,
+# pa iskljucena ne kosta nista: meri se samo dok je ukljucena.
+
+def registruj(vlasnik, nazivi, prefiks):
+    # Dodatni ciljevi, npr. funkcije za ucitavanje iz main.py
+    for naziv in nazivi:
+        cilj = (vlasnik, naziv, f"{prefiks}.{naziv}")
+        if cilj not in CILJEVI:
+            CILJEVI.append(cilj)
+            if ukljuceno:
+                _omotaj(*cilj)
+
+
+def povecaj(naziv, n=1):
+    with _lock:
+        brojaci[naziv] = brojaci.get(naziv, 0) + n
+
+
+def zabelezi(naziv, ns):
+    with _lock:
+        histogram = histogrami.get(naziv)
+        if histogram is None:
+            histogram = histogrami[naziv] = Histogram()
+        histogram.dodaj(ns)
+
+
+def _meren(funkcija, naziv, kes=None):
+    # kes: None, 'brzi' (Graph.izracunaj_popularnost, koji pogodak vraca sam pa se tu broje
+    # samo pogoci) ili 'pun' (Graph._popularnost, svaki ostali pristup pop_cache-u)
+    sat = time.perf_counter_ns
+
+    @functools.wraps(funkcija)
+    def omotac(*args, **kwargs):
+        dogadjaj = None
+        if kes is not None:
+            graph, broj = args[0], args[1]
+            if graph._normal_broj(broj) in graph.pop_cache:
+                dogadjaj = 'pop_cache.pogodaka'
+            elif kes == 'pun':
+                dogadjaj = 'pop_cache.promasaja'
+
+        t0 = sat()
+        try:
+            return funkcija(*args, **kwargs)
+        except Exception:
+            dogadjaj = f"{naziv}.greske"
+            raise
+        finally:
+            ns = sat() - t0
+            with _lock:
+                histogram = histogrami.get(naziv)
+                if histogram is None:
+                    histogram = histogrami[naziv] = Histogram()
+                histogram.dodaj(ns)
+                if dogadjaj is not None:
+                    brojaci[dogadjaj] = brojaci.get(dogadjaj, 0) + 1
+
+    return omotac
+
+
+def _omotaj(vlasnik, atribut, naziv):
+    funkcija = getattr(vlasnik, atribut)
+    _originali[(vlasnik, atribut)] = funkcija
+    kes = None
+    if vlasnik is Graph and atribut in ('izracunaj_popularnost', '_popularnost'):
+        kes = 'brzi' if atribut == 'izracunaj_popularnost' else 'pun'
+    setattr(vlasnik, atribut, _meren(funkcija, naziv, kes))
+
+
+def ukljuci():
+    global ukljuceno
+    if ukljuceno:
+        return
+    for cilj in CILJEVI:
+        _omotaj(*cilj)
+    ukljuceno = True
+
+
+def iskljuci():
+    global ukljuceno
+    for (vlasnik, atribut), funkcija in _originali.items():
+        setattr(vlasnik, atribut, funkcija)
+    _originali.clear()
+    ukljuceno = False
+
+
+def resetuj():
+    global pocetak
+    with _lock:
+        brojaci.clear()
+        histogrami.clear()
+        pocetak = time.time()
+
+
+def stanje():
+    with _lock:
+        kopija_brojaca = dict(brojaci)
+        kopija_histograma = {}
+        for naziv, histogram in histogrami.items():
+            kopija = Histogram()
+            kopija.spoji(histogram)
+            kopija_histograma[naziv] = kopija
+
+    pogodaka = kopija_brojaca.get('pop_cache.pogodaka', 0)
+    promasaja = kopija_brojaca.get('pop_cache.promasaja', 0)
+
+    return {
+        'ukljuceno': ukljuceno,
+        'pocetak': pocetak,
+        'trajanje_s': time.time() - pocetak,
+        'brojaci': kopija_brojaca,
+        'pop_cache': {
+            'pogodaka': pogodaka,
+            'promasaja': promasaja,
+            'stopa_pogodaka': pogodaka / (pogodaka + promasaja) if pogodaka + promasaja else None,
+        },
+        'latencije_ns': {
+            naziv: {
+                'broj': h.broj,
+                'ukupno': h.suma,
+                'prosek': h.prosek(),
+                'p50': h.percentil(50),
+                'p90': h.percentil(90),
+                'p99': h.percentil(99),
+                'max': h.maksimum,
+            }
+            for naziv, h in sorted(kopija_histograma.items())
+        },
+    }
+
+
+def kao_json(podaci=None):
+    return json.dumps(podaci or stanje(), indent=2)
+
+
+def _oznaka(naziv):
+    return naziv.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def kao_prometheus(podaci=None):
+    # Prometheus tekstualni format; latencije kao summary u sekundama
+    podaci = podaci or stanje()
+    redovi = [
+        '# HELP centrala_latencija_sekundi Trajanje operacija centrale',
+        '# TYPE centrala_latencija_sekundi summary',
+    ]
+    for naziv, l in podaci['latencije_ns'].items():
+        oznaka = f'operacija="{_oznaka(naziv)}"'
+        for kvantil, kljuc in (('0.5', 'p50'), ('0.9', 'p90'), ('0.99', 'p99')):
+            redovi.append(f'centrala_latencija_sekundi{{{oznaka},quantile="{kvantil}"}} {l[kljuc] / 1e9:.9f}')
+        redovi.append(f'centrala_latencija_sekundi_sum{{{oznaka}}} {l["ukupno"] / 1e9:.9f}')
+        redovi.append(f'centrala_latencija_sekundi_count{{{oznaka}}} {l["broj"]}')
+
+    redovi += [
+        '# HELP centrala_dogadjaji_total Brojaci dogadjaja (greske, pop_cache pogoci i promasaji)',
+        '# TYPE centrala_dogadjaji_total counter',
+    ]
+    for naziv, vrednost in sorted(podaci['brojaci'].items()):
+        redovi.append(f'centrala_dogadjaji_total{{dogadjaj="{_oznaka(naziv)}"}} {vrednost}')
+
+    redovi += [
+        '# HELP centrala_metrike_ukljucene Da li je instrumentacija ukljucena',
+        '# TYPE centrala_metrike_ukljucene gauge',
+        f'centrala_metrike_ukljucene {int(podaci["ukljuceno"])}',
+    ]
+    return '\n'.join(redovi) + '\n'
+
+
+def sacuvaj(filename, format='json'):
+    tekst = kao_prometheus() if format == 'prometheus' else kao_json()
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(tekst)
+
+
+class _Zahtev(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            telo, tip = kao_prometheus(), 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path == '/metrics.json':
+            telo, tip = kao_json(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+
+        telo = telo.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', tip)
+        self.send_header('Content-Length', str(len(telo)))
+        self.end_headers()
+        self.wfile.write(telo)
+
+    def log_message(self, format, *args):
+        pass  # zahtevi se ne ispisuju preko menija
+
+
+def pokreni_server(port, adresa='127.0.0.1'):
+    # /metrics (Prometheus) i /metrics.json na lokalnoj adresi, u pozadinskoj niti
+    global _server
+    if _server is not None:
+        return _server.server_address[1]
+    _server = ThreadingHTTPServer((adresa, port), _Zahtev)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server.server_address[1]
+
+
+def zaustavi_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -0,0 +1,168 @@
+import time
+from bisect import bisect
+from itertools import accumulate, repeat
+
+OBRASCI = ('poisson', 'rafali')
+
+
+# Histogram latencija u nanosekundama sa logaritamskim buketima (16 po udvostrucenju,
+# greska ispod 7%), pa memorija ne raste sa brojem merenja
+class Histogram:
+
+    PODBUKETA = 16
+
+    def __init__(self):
+        self.buketi = {}
+        self.broj = 0
+        self.suma = 0
+        self.maksimum = 0
+
+    def _buket(self, ns):
+        if ns < self.PODBUKETA:
+            return ns
+        e = ns.bit_length() - 5
+        return self.PODBUKETA * (e + 1) + (ns >> e) - self.PODBUKETA
+
+    def _granice(self, buket):
+        if buket < self.PODBUKETA:
+            return buket, buket
+        e = buket // self.PODBUKETA - 1
+        m = buket % self.PODBUKETA + self.PODBUKETA
+        return m << e, ((m + 1) << e) - 1
+
+    def dodaj(self, ns):
+        ns = int(ns)
+        buket = self._buket(ns)
+        self.buketi[buket] = self.buketi.get(buket, 0) + 1
+        self.broj += 1
+        self.suma += ns
+        if ns > self.maksimum:
+            self.maksimum = ns
+
+    def spoji(self, drugi):
+        for buket, broj in drugi.buketi.items():
+            self.buketi[buket] = self.buketi.get(buket, 0) + broj
+        self.broj += drugi.broj
+        self.suma += drugi.suma
+        self.maksimum = max(self.maksimum, drugi.maksimum)
+
+    def percentil(self, p):
+        if not self.broj:
+            return 0
+        cilj = p / 100 * self.broj
+        ukupno = 0
+        for buket in sorted(self.buketi):
+            ukupno += self.buketi[buket]
+            if ukupno >= cilj:
+                donja, gornja = self._granice(buket)
+                return min((donja + gornja) / 2, self.maksimum)
+        return self.maksimum
+
+    def prosek(self):
+        return self.suma / self.broj if self.broj else 0
+
+    def __len__(self):
+        return self.broj
+
+    def __repr__(self):
+        return f"Histogram(broj={self.broj}, p50={self.percentil(50):.0f}ns, max={self.maksimum}ns)"
+
+
+def vremena_dolazaka(brzina, rng, obrazac='poisson', faktor_rafala=5.0, trajanje_rafala=1.0):
+    # Trenuci dolazaka (sekunde od pocetka). Rafali: Poisson sa faktor_rafala puta vecom
+    # brzinom tokom trajanje_rafala, pa tisina tako da prosecna brzina ostane ista
+    if brzina <= 0:
+        yield from repeat(None)  # bez rasporeda, sto brze moze
+        return
+
+    if obrazac not in OBRASCI:
+        raise ValueError(f"Nepoznat obrazac dolazaka: {obrazac}")
+
+    t = 0.0
+    if obrazac == 'poisson':
+        while True:
+            t += rng.expovariate(brzina)
+            yield t
+
+    ciklus = trajanje_rafala * faktor_rafala
+    while True:
+        t += rng.expovariate(brzina * faktor_rafala)
+        if t % ciklus >= trajanje_rafala:
+            # Dolazak je pao u tisinu; eksponencijalna raspodela nema memoriju pa se
+            # od pocetka sledeceg rafala izvlaci ispocetka
+            t = (t // ciklus + 1) * ciklus
+            continue
+        yield t
+
+
+def pokreni(operacije, tezine, brzina, trajanje, rng, obrazac='poisson', komanda=None, izvestaj=None):
+    # operacije: naziv -> funkcija bez argumenata; tezine odredjuju mesavinu operacija.
+    # Raspored je otvoren (open-loop): kada centrala kasni, operacije se izvrsavaju odmah
+    # jedna za drugom, pa ostvarena brzina pokazuje granicu kapaciteta.
+    # komanda je lista [None] u koju nit za unos upisuje 'p', 'n' ili 'q'.
+    # Latencija se meri od planiranog dolaska, ne od pocetka izvrsavanja, pa cekanje u redu
+    # kada centrala kasni ulazi u histogram (bez coordinated omission); samo vreme
+    # izvrsavanja operacije je posebno u 'servis'.
+    nazivi = list(operacije)
+    kumulativno = list(accumulate(tezine[naziv] for naziv in nazivi))
+    ukupna_tezina = kumulativno[-1]
+    funkcije = [operacije[naziv] for naziv in nazivi]
+    histogrami = [Histogram() for _ in nazivi]
+    servis = [Histogram() for _ in nazivi]
+
+    sat = time.perf_counter
+    sat_ns = time.perf_counter_ns
+    izbor = rng.random
+
+    start = sat()
+    sledeci_izvestaj = 1.0
+    izvrseno = 0
+
+    for dolazak in vremena_dolazaka(brzina, rng, obrazac):
+        sada = sat() - start
+
+        if komanda is not None and komanda[0] is not None:
+            if komanda[0] == 'q':
+                break
+            if komanda[0] == 'p':
+                pocetak_pauze = sat()
+                while komanda[0] not in ('n', 'q'):
+                    time.sleep(0.1)
+                if komanda[0] == 'q':
+                    break
+                # Raspored se pomera za trajanje pauze
+                start += sat() - pocetak_pauze
+                sada = sat() - start
+            komanda[0] = None
+
+        if sada >= trajanje:
+            break
+
+        if dolazak is not None and dolazak > sada:
+            if dolazak >= trajanje:
+                # Do kraja nema vise dolazaka, ali merenje traje punih trajanje sekundi
+                time.sleep(trajanje - sada)
+                break
+            if dolazak - sada > 0.001:
+                time.sleep(dolazak - sada)
+
+        i = bisect(kumulativno, izbor() * ukupna_tezina)
+        t0 = sat_ns()
+        funkcije[i]()
+        kraj = sat_ns()
+        # Bez rasporeda, ili kada operacija krene do 1 ms pre dolaska, racuna se od pocetka
+        planirano = t0 if dolazak is None else min(t0, int((start + dolazak) * 1e9))
+        histogrami[i].dodaj(kraj - planirano)
+        servis[i].dodaj(kraj - t0)
+        izvrseno += 1
+
+        if izvestaj is not None and sada >= sledeci_izvestaj:
+            izvestaj(sada, izvrseno)
+            sledeci_izvestaj = int(sada) + 1.0
+
+    return {
+        'proteklo': sat() - start,
+        'izvrseno': izvrseno,
+        'operacije': dict(zip(nazivi, histogrami)),
+        'servis': dict(zip(nazivi, servis)),
+    }
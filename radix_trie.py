@@ -0,0 +1,205 @@
+from heapq import nsmallest
+from operator import itemgetter
+
+from trie import Trie
+
+
+class RadixNode:
+
+    # Cvor nosi oznaku grane (vise karaktera); deca su indeksirana prvim karakterom oznake
+    __slots__ = ('label', 'children', 'is_end_of_word', 'data', 'broj_reci', 'broj_podataka', 'top')
+
+    def __init__(self, label=""):
+        self.label = label
+        self.children = {}
+        self.is_end_of_word = False
+        self.data = None  # lista se pravi tek kada cvor dobije prvi podatak
+
+        self.broj_reci = 0
+        self.broj_podataka = 0
+        self.top = None
+
+    def __getstate__(self):
+        return (self.label, self.children, self.is_end_of_word, self.data,
+                self.broj_reci, self.broj_podataka)
+
+    def __setstate__(self, stanje):
+        (self.label, self.children, self.is_end_of_word, self.data,
+         self.broj_reci, self.broj_podataka) = stanje
+        self.top = None
+
+    def __repr__(self):
+        return (f"RadixNode(label='{self.label}', children={len(self.children)}, "
+                f"is_end={self.is_end_of_word}, data_count={len(self.data or ())})")
+
+
+# Kompresovani (Patricia) trie, zamena za trie.Trie sa istim rezultatima i redosledom
+class RadixTrie(Trie):
+
+    def __init__(self, name="RadixTrie", fold=False):
+        self.root = RadixNode()
+        self.name = name
+        self.fold = fold
+
+    def __setstate__(self, stanje):
+        self.__dict__.update(stanje)
+
+    def insert(self, key, data=None, novi=False):
+        key = self._normalize_key(key)
+
+        if not key:
+            return
+
+        node = self.root
+        putanja = [node]
+        i = 0
+
+        while i < len(key):
+            child = node.children.get(key[i])
+
+            if child is None:
+                child = RadixNode(key[i:])
+                node.children[key[i]] = child
+                putanja.append(child)
+                node = child
+                break
+
+            label = child.label
+            j = 1
+            kraj = min(len(label), len(key) - i)
+            while j < kraj and label[j] == key[i + j]:
+                j += 1
+
+            if j < len(label):
+                # Kljuc se odvaja usred oznake, pa se grana deli na dva cvora
+                sredina = RadixNode(label[:j])
+                sredina.broj_reci = child.broj_reci
+                sredina.broj_podataka = child.broj_podataka
+                child.label = label[j:]
+                sredina.children[child.label[0]] = child
+                node.children[key[i]] = sredina
+                child = sredina
+
+            putanja.append(child)
+            node = child
+            i += j
+
+        nova_rec = not node.is_end_of_word
+        node.is_end_of_word = True
+
+        if data is not None and node.data is None:
+            node.data = []
+
+        if novi:
+            if data is not None:
+                node.data.append(data)
+            return
+
+        novi_podatak = False
+        if data is not None:
+            if data not in node.data:
+                node.data.append(data)
+                novi_podatak = True
+
+        if nova_rec or novi_podatak:
+            for cvor in putanja:
+                cvor.broj_reci += nova_rec
+                cvor.broj_podataka += novi_podatak
+                cvor.top = None
+
+    def search(self, key):
+
+        key = self._normalize_key(key)
+
+        node = self.root
+        i = 0
+
+        while i < len(key):
+            child = node.children.get(key[i])
+            if child is None or not key.startswith(child.label, i):
+                return None
+            i += len(child.label)
+            node = child
+
+        if node.is_end_of_word:
+            return node.data if node.data is not None else []
+        return None
+
+    def _locate(self, prefix):
+        node = self.root
+        i = 0
+
+        while i < len(prefix):
+            child = node.children.get(prefix[i])
+            if child is None:
+                return None, None
+
+            ostatak = prefix[i:]
+            if len(ostatak) < len(child.label):
+                # Prefiks se zavrsava usred oznake, rec se dopunjava do kraja oznake
+                if child.label.startswith(ostatak):
+                    return child, prefix[:i] + child.label
+                return None, None
+
+            if not prefix.startswith(child.label, i):
+                return None, None
+
+            i += len(child.label)
+            node = child
+
+        return node, prefix
+
+    def _find_node(self, key):
+        return self._locate(key)[0]
+
+    def _iter_words(self, node, current_word, max_results=None, ordered=False):
+
+        preostalo = max_results or None
+        stek = [(node, current_word)]
+
+        while stek:
+            node, current_word = stek.pop()
+
+            if node.is_end_of_word and node.data:
+                for data in node.data:
+                    yield current_word, data
+                    if preostalo is not None:
+                        preostalo -= 1
+                        if preostalo == 0:
+                            return
+
+            children = sorted(node.children.items()) if ordered else node.children.items()
+            for _, child_node in reversed(list(children)):
+                stek.append((child_node, current_word + child_node.label))
+
+    def _edges(self, node):
+        return ((child_node.label, child_node) for child_node in node.children.values())
+
+    def _top(self, node, current_word, k, score):
+        kes = node.top
+        if kes is not None and kes[0] == self._rank_version and kes[1] >= k:
+            return kes[2]
+
+        kandidati = []
+        if node.is_end_of_word and node.data:
+            kandidati = [(-score(data), current_word, i, data) for i, data in enumerate(node.data)]
+
+        for child_node in node.children.values():
+            kandidati.extend(self._top(child_node, current_word + child_node.label, k, score))
+
+        top = nsmallest(k, kandidati, key=itemgetter(0, 1, 2))
+        node.top = (self._rank_version, k, top)
+        return top
+
+    def invalidate(self, key):
+        key = self._normalize_key(key)
+
+        node = self.root
+        node.top = None
+        i = 0
+        while i < len(key):
+            node = node.children.get(key[i])
+            if node is None:
+                return
+            node.top = None
+            i += len(node.label)
@@ -0,0 +1,95 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+# Sortirana lista podeljena na blokove (kao "sorted list" strukture): dodavanje i uklanjanje
+# kostaju O(log N + velicina bloka), prvih n elemenata O(n), a rang elementa O(N / blok + log N)
+class RangLista:
+
+    def __init__(self, elementi=(), velicina_bloka=512):
+        self.velicina_bloka = velicina_bloka
+        self._blokovi = []
+        self._maksimumi = []
+        self._duzina = 0
+
+        elementi = sorted(elementi)
+        for i in range(0, len(elementi), velicina_bloka):
+            blok = elementi[i:i + velicina_bloka]
+            self._blokovi.append(blok)
+            self._maksimumi.append(blok[-1])
+        self._duzina = len(elementi)
+
+    def dodaj(self, element):
+        if not self._blokovi:
+            self._blokovi.append([element])
+            self._maksimumi.append(element)
+            self._duzina = 1
+            return
+
+        i = bisect_left(self._maksimumi, element)
+        if i == len(self._blokovi):
+            i -= 1
+            self._blokovi[i].append(element)
+            self._maksimumi[i] = element
+        else:
+            insort(self._blokovi[i], element)
+
+        self._duzina += 1
+
+        blok = self._blokovi[i]
+        if len(blok) > 2 * self.velicina_bloka:
+            polovina = len(blok) // 2
+            self._blokovi[i:i + 1] = [blok[:polovina], blok[polovina:]]
+            self._maksimumi[i:i + 1] = [blok[polovina - 1], blok[-1]]
+
+    def ukloni(self, element):
+        i = bisect_left(self._maksimumi, element)
+        if i == len(self._blokovi):
+            raise ValueError(f"{element!r} nije u listi")
+
+        blok = self._blokovi[i]
+        j = bisect_left(blok, element)
+        if j == len(blok) or blok[j] != element:
+            raise ValueError(f"{element!r} nije u listi")
+
+        del blok[j]
+        self._duzina -= 1
+
+        if not blok:
+            del self._blokovi[i]
+            del self._maksimumi[i]
+        else:
+            self._maksimumi[i] = blok[-1]
+
+    def indeks(self, element):
+        # Broj elemenata strogo manjih od zadatog
+        i = bisect_left(self._maksimumi, element)
+        pre = sum(len(blok) for blok in self._blokovi[:i])
+        if i < len(self._blokovi):
+            pre += bisect_left(self._blokovi[i], element)
+        return pre
+
+    def prvih(self, n):
+        rezultat = []
+        for blok in self._blokovi:
+            if len(rezultat) >= n:
+                break
+            rezultat.extend(blok[:n - len(rezultat)])
+        return rezultat
+
+    def __contains__(self, element):
+        i = bisect_left(self._maksimumi, element)
+        if i == len(self._blokovi):
+            return False
+        blok = self._blokovi[i]
+        j = bisect_right(blok, element)
+        return j > 0 and blok[j - 1] == element
+
+    def __iter__(self):
+        for blok in self._blokovi:
+            yield from blok
+
+    def __len__(self):
+        return self._duzina
+
+    def __repr__(self):
+        return f"RangLista(duzina={self._duzina}, blokova={len(self._blokovi)})"
@@ -0,0 +1,77 @@
+import threading
+from contextlib import contextmanager
+
+
+# Brava sa vise istovremenih citalaca i jednim piscem, sa smenjivanjem faza: dok pisac
+# ceka novi citaoci ne ulaze, a citaoci koji su cekali kada pisac pusti bravu ulaze pre
+# sledeceg pisca. Tako ni stalan unos poziva ni stalan niz upita ne izgladnjuju drugu stranu.
+# Citanje je reentrant (nit koja vec cita ulazi odmah), a pisanje nije: nit koja drzi bravu
+# ne sme da trazi pisanje.
+class RWLock:
+
+    def __init__(self):
+        self._uslov = threading.Condition(threading.Lock())
+        self._citaoci = 0
+        self._pisac = False
+        self._pisci_cekaju = 0
+        self._citaoci_cekaju = 0
+        self._red_citalaca = False  # citaoci koji su cekali na pisca ulaze pre sledeceg pisca
+        self._nit = threading.local()
+
+    def acquire_read(self):
+        dubina = getattr(self._nit, 'dubina', 0)
+        self._nit.dubina = dubina + 1
+        if dubina:
+            return
+
+        with self._uslov:
+            self._citaoci_cekaju += 1
+            while self._pisac or (self._pisci_cekaju and not self._red_citalaca):
+                self._uslov.wait()
+            self._citaoci_cekaju -= 1
+            if not self._citaoci_cekaju:
+                self._red_citalaca = False
+            self._citaoci += 1
+
+    def release_read(self):
+        self._nit.dubina -= 1
+        if self._nit.dubina:
+            return
+
+        with self._uslov:
+            self._citaoci -= 1
+            if not self._citaoci:
+                self._uslov.notify_all()
+
+    def acquire_write(self):
+        with self._uslov:
+            self._pisci_cekaju += 1
+            while self._pisac or self._citaoci or self._red_citalaca:
+                self._uslov.wait()
+            self._pisci_cekaju -= 1
+            self._pisac = True
+
+    def release_write(self):
+        with self._uslov:
+            self._pisac = False
+            self._red_citalaca = self._citaoci_cekaju > 0
+            self._uslov.notify_all()
+
+    @contextmanager
+    def za_citanje(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def za_pisanje(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def __repr__(self):
+        return f"RWLock(citaoci={self._citaoci}, pisac={self._pisac}, pisci_cekaju={self._pisci_cekaju})"
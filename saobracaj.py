@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+from heapq import nsmallest
+
+EPOHA = datetime(1970, 1, 1)
+EPOHA_DAN = EPOHA.toordinal()
+SATI_U_DANU = 24
+SMEROVI = ('oba', 'dolazeci', 'odlazeci')
+
+
+def sat_vremena(vreme):
+    # Redni broj sata od EPOHA za naivni datetime, bez racunanja sekundi
+    return (vreme.toordinal() - EPOHA_DAN) * SATI_U_DANU + vreme.hour
+
+
+def sat_sekundi(sekunde):
+    return int(sekunde // 3600)
+
+
+def vreme_sata(sat):
+    return EPOHA + timedelta(hours=sat)
+
+
+def _sat_od(od):
+    return sat_vremena(od)
+
+
+def _sat_do(do):
+    # Granica je iskljucena: sat u kome je do ulazi samo ako do nije tacno na pocetku sata
+    sat = sat_vremena(do)
+    return sat + 1 if (do.minute, do.second, do.microsecond) != (0, 0, 0) else sat
+
+
+# Zbirni saobracaj po vremenskim baketima, da se pitanja tipa "koji sat je bio najoptereceniji"
+# ne bi resavala prolazom kroz sve pozive. Za celu centralu: broj poziva i ukupno trajanje
+# po satu (sat -> vrednost). Za svaki broj: broj dolazecih i odlazecih poziva po danu
+# (dan -> {broj: poziva}). Baketi su retki, samo za sate i dane sa pozivima, pa jedan poziv
+# sa vremenom daleko od ostalih dodaje jedan baket umesto niza preko svih sati izmedju.
+# Upiti prolaze samo kroz bakete; granice intervala se zaokruzuju na sate, odnosno dane.
+#
+# Baketi po satu za svaki broj namerno ne postoje: broj retko ima vise od jednog poziva
+# u istom satu, pa bi to bio skoro jedan baket po pozivu, tj. jos jedna kopija poziva.
+# Takva pitanja za jedan broj resava Graph.broj_poziva_u_intervalu binarnom pretragom
+# kroz vremenski sortirane pozive cvora.
+class Saobracaj:
+
+    def __init__(self):
+        self.pozivi_po_satu = {}
+        self.trajanje_po_satu = {}
+        self.dolazeci_po_danu = {}
+        self.odlazeci_po_danu = {}
+
+    def dodaj(self, caller, callee, trajanje, sat, odlazeci=True, dolazeci=True):
+        # odlazeci/dolazeci biraju strane poziva koje se broje (shard broji samo svoje
+        # brojeve); zbir po satu ide uz odlazecu stranu, pa se svaki poziv broji jednom
+        if odlazeci:
+            self.pozivi_po_satu[sat] = self.pozivi_po_satu.get(sat, 0) + 1
+            self.trajanje_po_satu[sat] = self.trajanje_po_satu.get(sat, 0) + int(trajanje)
+
+        dan = sat // SATI_U_DANU
+        odlazeci_dana = self.odlazeci_po_danu.get(dan)
+        if odlazeci_dana is None:
+            odlazeci_dana = self.odlazeci_po_danu[dan] = {}
+            self.dolazeci_po_danu[dan] = {}
+        if odlazeci:
+            odlazeci_dana[caller] = odlazeci_dana.get(caller, 0) + 1
+        if dolazeci:
+            dolazeci_dana = self.dolazeci_po_danu[dan]
+            dolazeci_dana[callee] = dolazeci_dana.get(callee, 0) + 1
+
+    @classmethod
+    def iz_kolona(cls, brojevi, izvori, destinacije, vremena, trajanja):
+        # Isti oblik kao Graph.kolone()
+        saobracaj = cls()
+        pozivi_po_satu = saobracaj.pozivi_po_satu
+        trajanje_po_satu = saobracaj.trajanje_po_satu
+        odlazeci_po_danu = saobracaj.odlazeci_po_danu
+        dolazeci_po_danu = saobracaj.dolazeci_po_danu
+
+        for sekunde, a, b, t in zip(vremena, izvori, destinacije, trajanja):
+            sat = sat_sekundi(sekunde)
+            pozivi_po_satu[sat] = pozivi_po_satu.get(sat, 0) + 1
+            trajanje_po_satu[sat] = trajanje_po_satu.get(sat, 0) + t
+
+            dan = sat // SATI_U_DANU
+            odlazeci = odlazeci_po_danu.get(dan)
+            if odlazeci is None:
+                odlazeci = odlazeci_po_danu[dan] = {}
+                dolazeci_po_danu[dan] = {}
+            dolazeci = dolazeci_po_danu[dan]
+            caller = brojevi[a]
+            callee = brojevi[b]
+            odlazeci[caller] = odlazeci.get(caller, 0) + 1
+            dolazeci[callee] = dolazeci.get(callee, 0) + 1
+
+        return saobracaj
+
+    # ----- Upiti -----
+
+    def _sati(self, od=None, do=None):
+        # (sat, broj poziva) za sate sa pozivima u [od, do), bez redosleda
+        pocetak = _sat_od(od) if od is not None else None
+        kraj = _sat_do(do) if do is not None else None
+        if pocetak is None and kraj is None:
+            return self.pozivi_po_satu.items()
+        return [(sat, n) for sat, n in self.pozivi_po_satu.items()
+                if (pocetak is None or sat >= pocetak) and (kraj is None or sat < kraj)]
+
+    def _dani(self, po_danu, od=None, do=None):
+        # Dani sa pozivima koji dodiruju [od, do); od/do u sredini dana uzimaju ceo dan
+        pocetak = _sat_od(od) // SATI_U_DANU if od is not None else None
+        kraj = (_sat_do(do) + SATI_U_DANU - 1) // SATI_U_DANU if do is not None else None
+        return [dan for dan in po_danu
+                if (pocetak is None or dan >= pocetak) and (kraj is None or dan < kraj)]
+
+    def po_satu(self, od=None, do=None):
+        # {sat: (broj poziva, ukupno trajanje)} za sate sa pozivima u [od, do), za spajanje delova
+        return {sat: (n, self.trajanje_po_satu[sat]) for sat, n in self._sati(od, do)}
+
+    def najoptereceniji_sat(self, od=None, do=None):
+        # (pocetak sata, broj poziva, ukupno trajanje) ili None; kod istog broja raniji sat
+        najbolji = min(self._sati(od, do), key=lambda stavka: (-stavka[1], stavka[0]), default=None)
+        if najbolji is None:
+            return None
+        sat, poziva = najbolji
+        return vreme_sata(sat), poziva, self.trajanje_po_satu[sat]
+
+    def po_satu_dana(self, od=None, do=None):
+        # Lista od 24 (broj poziva, ukupno trajanje), indeks je sat u danu
+        pozivi = [0] * SATI_U_DANU
+        trajanje = [0] * SATI_U_DANU
+        for sat, n in self._sati(od, do):
+            pozivi[sat % SATI_U_DANU] += n
+            trajanje[sat % SATI_U_DANU] += self.trajanje_po_satu[sat]
+        return list(zip(pozivi, trajanje))
+
+    def po_danima(self, broj=None, od=None, do=None, smer='oba'):
+        # Lista (datum, broj poziva) po danima sa pozivima u opsegu, hronoloski, za celu
+        # centralu ili za jedan broj; dani bez poziva se ne navode
+        if smer not in SMEROVI:
+            raise ValueError(f"Nepoznat smer: {smer}")
+
+        po_danu = {}
+        if broj is None:
+            # Iz baketa po satu, pa je dan ceo i kada od/do padaju u sredinu dana
+            dani = set(self._dani(self.odlazeci_po_danu, od, do))
+            for sat, n in self.pozivi_po_satu.items():
+                dan = sat // SATI_U_DANU
+                if dan in dani:
+                    po_danu[dan] = po_danu.get(dan, 0) + n
+        else:
+            for dan in self._dani(self.odlazeci_po_danu, od, do):
+                ukupno = 0
+                if smer != 'odlazeci':
+                    ukupno += self.dolazeci_po_danu[dan].get(broj, 0)
+                if smer != 'dolazeci':
+                    ukupno += self.odlazeci_po_danu[dan].get(broj, 0)
+                if ukupno:
+                    po_danu[dan] = ukupno
+
+        return [(vreme_sata(dan * SATI_U_DANU).date(), po_danu[dan]) for dan in sorted(po_danu)]
+
+    def top_brojevi(self, n, od=None, do=None, smer='oba'):
+        # Brojevi sa najvise poziva u danima opsega; kod istog broja poziva manji broj ide prvi
+        if smer not in SMEROVI:
+            raise ValueError(f"Nepoznat smer: {smer}")
+
+        izvori = []
+        if smer != 'odlazeci':
+            izvori.append(self.dolazeci_po_danu)
+        if smer != 'dolazeci':
+            izvori.append(self.odlazeci_po_danu)
+
+        ukupno = {}
+        for dan in self._dani(self.odlazeci_po_danu, od, do):
+            for po_danu in izvori:
+                for broj, poziva in po_danu[dan].items():
+                    ukupno[broj] = ukupno.get(broj, 0) + poziva
+
+        return nsmallest(n, ukupno.items(), key=lambda stavka: (-stavka[1], stavka[0]))
+
+    def ukupno_poziva(self):
+        return sum(self.pozivi_po_satu.values())
+
+    def __repr__(self):
+        if not self.pozivi_po_satu:
+            return "Saobracaj(prazan)"
+        return (f"Saobracaj(od={vreme_sata(min(self.pozivi_po_satu))}, sati={len(self.pozivi_po_satu)}, "
+                f"poziva={self.ukupno_poziva()})")
@@ -0,0 +1,579 @@
+import multiprocessing
+import os
+import threading
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from heapq import merge, nsmallest
+from itertools import islice
+
+from graph import EPOHA, Edge, Graph, SKLADISTA, skor_popularnosti
+from rang_lista import RangLista
+from saobracaj import Saobracaj
+
+
+# Zbirni saobracaj sharda: broji samo strane poziva koje pripadaju brojevima sharda, pa
+# zbir po satu ima svaki poziv jednom (kod sharda pozivaoca), a dani po broju su potpuni
+# kod vlasnika broja
+class _SaobracajSharda(Saobracaj):
+
+    def __init__(self, svoji):
+        super().__init__()
+        self.svoji = svoji
+
+    def dodaj(self, caller, callee, trajanje, sat):
+        svoji = self.svoji
+        Saobracaj.dodaj(self, caller, callee, trajanje, sat, caller in svoji, callee in svoji)
+
+
+def shard_broja(broj, broj_shardova):
+    # crc32 umesto hash(), da raspodela bude ista u svakom procesu i pri svakom pokretanju
+    return zlib.crc32(broj.encode('utf-8')) % broj_shardova
+
+
+# Deo grafa u jednom procesu. Lokalni Graph dobija svaki poziv kome je bar jedan kraj
+# broj ovog sharda, pa su istorije (i parovi) njegovih brojeva potpune; drugi kraj je
+# samo "senka" cvora. Suma pozivalaca broja zavisi od broja dolazecih poziva pozivalaca
+# iz drugih shardova, pa uz svaku seriju stizu i promene ulaznog stepena od prethodne
+# serije (vodi ih koordinator); posle masovnog unosa sume se racunaju ispocetka (postavi_sume).
+class _Shard:
+
+    def __init__(self, skladiste):
+        self.graph = Graph(skladiste)
+        self.redni = {}      # broj ovog sharda -> globalni redni broj (redosled pojavljivanja)
+        self.graph.saobracaj = _SaobracajSharda(self.redni)
+        # Lokalne sume pozivalaca u Graph-u nisu tacne (senke nemaju sve dolazece pozive), pa
+        # se tamo nikad ne odrzavaju; tacne sume brojeva ovog sharda su u self.sume
+        self.graph.sume_zastarele = True
+
+        self.sume = {}       # broj ovog sharda -> suma pozivalaca; None dok ceka postavi_sume
+        self.skorovi = {}
+        self.rang = RangLista()  # kljucevi (-skor, redni broj, broj)
+        self.kljucevi = {}
+        self.promenjeni = set()
+        self.svi_promenjeni = False
+
+    def dodaj(self, brojevi, pozivi, ulazni=None, promene=None):
+        # ulazni: broj dolazecih poziva pozivalaca iz serije, posle serije; promene: promena
+        # broja dolazecih poziva po broju od prethodne serije ovom shardu. Bez njih (masovni
+        # unos) sume zastarevaju do postavi_sume
+        novi = []
+        for broj, redni in brojevi:
+            self.redni[broj] = redni
+            self.graph.add_phone(broj)
+            novi.append(broj)
+
+        if promene is None:
+            self.sume = None
+        sume = self.sume
+        prljavi = set()
+
+        if sume is not None:
+            for broj in novi:
+                sume[broj] = 0
+            prljavi.update(novi)
+
+            # Zbir za Y je sum(poziva X->Y * ulazni(X)): prvo promena ulaznog stepena
+            # za vec unete pozive, pa novi pozivi sa ulaznim stepenom posle serije
+            nodes = self.graph.nodes
+            for broj, promena in promene.items():
+                node = nodes.get(broj)
+                if node is None:
+                    continue
+                for pozvani, puta in self.graph._pozvani(node):
+                    if pozvani in sume:
+                        sume[pozvani] += puta * promena
+                        prljavi.add(pozvani)
+
+        self.graph.add_calls([(caller, callee, trajanje, EPOHA + timedelta(seconds=vreme))
+                              for caller, callee, trajanje, vreme in pozivi])
+
+        if sume is not None:
+            for caller, callee, _, _ in pozivi:
+                if callee in sume:
+                    sume[callee] += ulazni[caller]
+                    prljavi.add(callee)
+            self._osvezi_skorove(prljavi)
+
+    def _osvezi_skorove(self, brojevi):
+        nodes = self.graph.nodes
+        for broj in brojevi:
+            node = nodes[broj]
+            skor = 0.0
+            if node.dolazeci:
+                skor = skor_popularnosti(len(node.dolazeci), node.trajanje_dolazecih, self.sume[broj])
+
+            kljuc = (-skor, self.redni[broj], broj)
+            stari = self.kljucevi.get(broj)
+            if stari == kljuc:
+                continue
+            if stari is not None:
+                self.rang.ukloni(stari)
+            self.rang.dodaj(kljuc)
+            self.kljucevi[broj] = kljuc
+            self.skorovi[broj] = skor
+            self.promenjeni.add(broj)
+
+    def postavi_sume(self, ulazni):
+        nodes = self.graph.nodes
+        izvor = self.graph.skladiste.izvor
+        sume = {}
+        skorovi = {}
+        for broj in self.redni:
+            node = nodes[broj]
+            sume[broj] = sum(ulazni[izvor(poziv)] for poziv in node.dolazeci)
+            skorovi[broj] = 0.0
+            if node.dolazeci:
+                skorovi[broj] = skor_popularnosti(len(node.dolazeci), node.trajanje_dolazecih, sume[broj])
+
+        self.sume = sume
+        self.skorovi = skorovi
+        self.kljucevi = {broj: (-skor, self.redni[broj], broj) for broj, skor in skorovi.items()}
+        self.rang = RangLista(self.kljucevi.values())
+        self.promenjeni = set()
+        self.svi_promenjeni = True
+
+    def preuzmi_promenjene(self):
+        promenjeni = None if self.svi_promenjeni else self.promenjeni
+        self.promenjeni = set()
+        self.svi_promenjeni = False
+        return promenjeni
+
+    def popularnost(self, broj):
+        return self.skorovi.get(broj, 0.0)
+
+    def kljuc(self, broj):
+        return self.kljucevi.get(broj)
+
+    def top(self, n):
+        return self.rang.prvih(n)
+
+    def broj_manjih(self, kljuc):
+        return self.rang.indeks(kljuc)
+
+    def istorija(self, broj1, broj2=None):
+        return self.graph.istorija_poziva(broj1, broj2)
+
+    def interval(self, broj, od, do, najnoviji_prvo, limit, offset):
+        return self.graph.pozivi_u_intervalu(broj, od, do, najnoviji_prvo, limit, offset)
+
+    def broj_u_intervalu(self, broj, od, do):
+        return self.graph.broj_poziva_u_intervalu(broj, od, do)
+
+    def cvor(self, broj):
+        return self.graph.get_node(broj)
+
+    def saobracaj(self, upit, *args):
+        return getattr(self.graph.saobracaj, upit)(*args)
+
+    def kolone(self):
+        # Odlazeci pozivi brojeva ovog sharda, tako da svaki poziv dodje tacno jednom
+        skladiste = self.graph.skladiste
+        pozivi = []
+        for broj in self.redni:
+            for poziv in self.graph.nodes[broj].odlazeci:
+                vreme = skladiste.vreme(poziv)
+                if isinstance(vreme, datetime):
+                    vreme = (vreme - EPOHA).total_seconds()
+                pozivi.append((vreme, broj, skladiste.destinacija(poziv), int(skladiste.trajanje(poziv))))
+        return pozivi
+
+    def velicina(self):
+        return len(self.redni), len(self.graph.skladiste)
+
+
+def _radnik(veza, skladiste):
+    shard = _Shard(skladiste)
+    greska = None
+
+    while True:
+        komanda, args, odgovor = veza.recv()
+        if komanda == 'kraj':
+            break
+
+        try:
+            rezultat = getattr(shard, komanda)(*args)
+        except Exception as e:
+            rezultat = e
+
+        if not odgovor:
+            # Greska u seriji bez odgovora se prijavljuje uz sledeci odgovor
+            if isinstance(rezultat, Exception) and greska is None:
+                greska = rezultat
+            continue
+
+        if greska is not None:
+            rezultat, greska = greska, None
+        veza.send(rezultat)
+
+    veza.close()
+
+
+# Koordinator sa istim API-jem za upis i upite kao graph.Graph. Brojevi su rasporedjeni
+# po shard_broja() na procese; add_call ide shardovima oba kraja u serijama, a upiti se
+# salju vlasniku broja ili svim shardovima pa se rezultati spajaju. Pre svakog upita se
+# salju serije na cekanju, pa upit vidi sve prethodne upise. Koordinator broji dolazece
+# pozive svakog broja i pamti koga je svaki broj zvao; promena dolazecih poziva broja ide uz
+# seriju samo shardovima brojeva koje on zove (samo njima se menja suma pozivalaca), pa
+# shardovi azuriraju popularnost inkrementalno. Samo posle masovnog unosa (kao kod
+# Graph.add_calls) sume se u prvom upitu racunaju ispocetka iz celog recnika ulaznih poziva.
+# Zbirni saobracaj se vodi u shardovima, a upiti spajaju njihove delove.
+class ShardovaniGraf:
+
+    def __init__(self, broj_shardova=None, skladiste='objekti', velicina_serije=5000, kontekst=None):
+        if skladiste not in SKLADISTA:
+            raise ValueError(f"Nepoznato skladiste poziva: {skladiste}")
+
+        self.broj_shardova = broj_shardova or os.cpu_count() or 1
+        self._naziv_skladista = skladiste
+        self.velicina_serije = velicina_serije
+
+        self.nodes = {}  # broj -> globalni redni broj; cvorovi su u shardovima
+        self.vlasnik = {}  # broj -> shard
+        self.ulazni = {}  # broj -> broj dolazecih poziva
+        self.pozvani = {}  # broj -> brojevi koje je zvao
+        self.shardovi_pozvanih = {}  # broj -> shardovi brojeva koje je zvao
+        self.pop_cache = {}
+        self.sume_zastarele = False
+        self.zurnal = None
+        self.lock = threading.RLock()
+
+        self._brojevi = [[] for _ in range(self.broj_shardova)]
+        self._pozivi = [[] for _ in range(self.broj_shardova)]
+        self._promene = [{} for _ in range(self.broj_shardova)]  # promene ulaznih od poslednje serije
+
+        kontekst = kontekst or multiprocessing.get_context()
+        self._veze = []
+        self._procesi = []
+        for _ in range(self.broj_shardova):
+            veza, veza_radnika = kontekst.Pipe()
+            proces = kontekst.Process(target=_radnik, args=(veza_radnika, skladiste),
+                                      daemon=True)
+            proces.start()
+            veza_radnika.close()
+            self._veze.append(veza)
+            self._procesi.append(proces)
+
+    @property
+    def naziv_skladista(self):
+        return self._naziv_skladista
+
+    def _shard(self, broj):
+        return shard_broja(broj, self.broj_shardova)
+
+    def _posalji(self, i, komanda, *args):
+        self._veze[i].send((komanda, args, False))
+
+    def _pitaj(self, i, komanda, *args):
+        self._isprazni()
+        self._veze[i].send((komanda, args, True))
+        return self._odgovor(i)
+
+    def _pitaj_sve(self, komanda, *args):
+        # Zahtev ide svim shardovima odjednom, pa rade paralelno; odgovori se citaju svi
+        # i tek onda se prijavljuje greska, da veze ostanu uskladjene
+        self._isprazni()
+        for veza in self._veze:
+            veza.send((komanda, args, True))
+        rezultati = [veza.recv() for veza in self._veze]
+        for rezultat in rezultati:
+            if isinstance(rezultat, Exception):
+                raise rezultat
+        return rezultati
+
+    def _odgovor(self, i):
+        rezultat = self._veze[i].recv()
+        if isinstance(rezultat, Exception):
+            raise rezultat
+        return rezultat
+
+    def _isprazni(self, i=None):
+        for j in (range(self.broj_shardova) if i is None else (i,)):
+            if self._pozivi[j] or self._brojevi[j] or self._promene[j]:
+                ulazni = promene = None
+                if not self.sume_zastarele:
+                    promene = self._promene[j]
+                    ulazni = {poziv[0]: self.ulazni[poziv[0]] for poziv in self._pozivi[j]}
+                self._posalji(j, 'dodaj', self._brojevi[j], self._pozivi[j], ulazni, promene)
+                self._brojevi[j] = []
+                self._pozivi[j] = []
+                self._promene[j] = {}
+
+    def _zastarele_sume(self):
+        # Masovni unos: promene se ne prate, sume se racunaju ispocetka u prvom upitu
+        self.sume_zastarele = True
+        self._promene = [{} for _ in range(self.broj_shardova)]
+
+    def _normal_broj(self, broj):
+        if isinstance(broj, str):
+            return broj.replace(" ", "").replace("-", "")
+        return broj
+
+    def _registruj(self, broj):
+        if broj not in self.nodes:
+            i = self.vlasnik[broj] = self._shard(broj)
+            self.nodes[broj] = len(self.nodes)
+            self.ulazni[broj] = 0
+            self.pozvani[broj] = set()
+            self.shardovi_pozvanih[broj] = set()
+            self._brojevi[i].append((broj, self.nodes[broj]))
+
+    def add_phone(self, broj):
+        with self.lock:
+            self._registruj(broj)
+
+    def _dodaj_poziv(self, caller, callee, trajanje, vreme):
+        self._registruj(caller)
+        self._registruj(callee)
+
+        # Ulazni stepen pozvanog ulazi u sume brojeva koje on zove, pa se menjaju skor
+        # pozvanog i njihovi; pozivaocu se skor ne menja
+        self.ulazni[callee] += 1
+        if not self.sume_zastarele:
+            for i in self.shardovi_pozvanih[callee]:
+                promene = self._promene[i]
+                promene[callee] = promene.get(callee, 0) + 1
+        pop_cache = self.pop_cache
+        if pop_cache:
+            pop_cache.pop(callee, None)
+            for broj in self.pozvani[callee]:
+                pop_cache.pop(broj, None)
+
+        vlasnik_pozivaoca = self.vlasnik[caller]
+        vlasnik_pozvanog = self.vlasnik[callee]
+        self.pozvani[caller].add(callee)
+        self.shardovi_pozvanih[caller].add(vlasnik_pozvanog)
+
+        poziv = (caller, callee, trajanje, vreme)
+        self._u_seriju(vlasnik_pozivaoca, poziv)
+        if vlasnik_pozvanog != vlasnik_pozivaoca:
+            self._u_seriju(vlasnik_pozvanog, poziv)
+
+    def _u_seriju(self, i, poziv):
+        serija = self._pozivi[i]
+        serija.append(poziv)
+        if len(serija) >= self.velicina_serije:
+            self._isprazni(i)
+
+    def add_call(self, caller, callee, trajanje, timestamp=None):
+
+        caller = self._normal_broj(caller)
+        callee = self._normal_broj(callee)
+
+        if not caller or not callee or caller == callee:
+            return None
+
+        if timestamp is None:
+            timestamp = datetime.now()
+
+        with self.lock:
+            if self.zurnal is not None:
+                self.zurnal.zapisi_poziv(caller, callee, trajanje, timestamp)
+            self._dodaj_poziv(caller, callee, trajanje, (timestamp - EPOHA).total_seconds())
+
+        return Edge(caller, callee, trajanje, timestamp)
+
+    def add_calls(self, pozivi):
+        if not isinstance(pozivi, (list, tuple)):
+            pozivi = list(pozivi)
+
+        dodato = 0
+        with self.lock:
+            if len(pozivi) >= len(self.nodes):
+                self._zastarele_sume()
+
+            for caller, callee, trajanje, timestamp in pozivi:
+                caller = self._normal_broj(caller)
+                callee = self._normal_broj(callee)
+
+                if not caller or not callee or caller == callee:
+                    continue
+
+                if timestamp is None:
+                    timestamp = datetime.now()
+
+                if self.zurnal is not None:
+                    self.zurnal.zapisi_poziv(caller, callee, trajanje, timestamp)
+
+                self._dodaj_poziv(caller, callee, trajanje, (timestamp - EPOHA).total_seconds())
+                dodato += 1
+
+        return dodato
+
+    def _osvezi_sume(self):
+        if not self.sume_zastarele:
+            return
+
+        self._pitaj_sve('postavi_sume', self.ulazni)
+        self.pop_cache = {}
+        self.sume_zastarele = False
+
+    def preuzmi_promenjene_skorove(self):
+        # Unija promenjenih iz shardova, ili None ako su posle preracunavanja promenjeni svi
+        with self.lock:
+            self._osvezi_sume()
+            promenjeni = set()
+            for deo in self._pitaj_sve('preuzmi_promenjene'):
+                if deo is None:
+                    promenjeni = None
+                elif promenjeni is not None:
+                    promenjeni |= deo
+            return promenjeni
+
+    def izracunaj_popularnost(self, broj):
+        broj = self._normal_broj(broj)
+
+        with self.lock:
+            if broj not in self.nodes:
+                return 0.0
+
+            self._osvezi_sume()
+            skor = self.pop_cache.get(broj)
+            if skor is None:
+                skor = self.pop_cache[broj] = self._pitaj(self.vlasnik[broj], 'popularnost', broj)
+            return skor
+
+    def top_pop_brojevi(self, n):
+        with self.lock:
+            self._osvezi_sume()
+            delovi = self._pitaj_sve('top', n)
+            return [(broj, -skor) for skor, _, broj in islice(merge(*delovi), n)]
+
+    def rang_broja(self, broj):
+        broj = self._normal_broj(broj)
+
+        with self.lock:
+            if broj not in self.nodes:
+                return None
+
+            self._osvezi_sume()
+            kljuc = self._pitaj(self.vlasnik[broj], 'kljuc', broj)
+            return sum(self._pitaj_sve('broj_manjih', kljuc)) + 1
+
+    def get_node(self, broj):
+        # Kopija cvora iz sharda (liste poziva su potpune, sume pozivalaca nisu)
+        broj = self._normal_broj(broj)
+        with self.lock:
+            if broj not in self.nodes:
+                return None
+            return self._pitaj(self.vlasnik[broj], 'cvor', broj)
+
+    def istorija_poziva(self, broj1, broj2=None):
+        broj1 = self._normal_broj(broj1)
+        broj2 = self._normal_broj(broj2) if broj2 else None
+
+        with self.lock:
+            if broj1 not in self.nodes:
+                return []
+            return self._pitaj(self.vlasnik[broj1], 'istorija', broj1, broj2)
+
+    def pozivi_u_intervalu(self, broj, od=None, do=None, najnoviji_prvo=False, limit=None, offset=0):
+        broj = self._normal_broj(broj)
+
+        with self.lock:
+            if broj not in self.nodes:
+                return []
+            return self._pitaj(self.vlasnik[broj], 'interval', broj, od, do, najnoviji_prvo, limit, offset)
+
+    def broj_poziva_u_intervalu(self, broj, od=None, do=None):
+        broj = self._normal_broj(broj)
+
+        with self.lock:
+            if broj not in self.nodes:
+                return 0
+            return self._pitaj(self.vlasnik[broj], 'broj_u_intervalu', broj, od, do)
+
+    def kolone(self):
+        # Isti oblik kao Graph.kolone(), za snapshot
+        with self.lock:
+            pozivi = []
+            for deo in self._pitaj_sve('kolone'):
+                pozivi.extend(deo)
+            pozivi.sort(key=lambda poziv: poziv[0])
+
+            brojevi = list(self.nodes)
+            id_broja = self.nodes
+            izvori = array('I', (id_broja[poziv[1]] for poziv in pozivi))
+            destinacije = array('I', (id_broja[poziv[2]] for poziv in pozivi))
+            vremena = array('d', (poziv[0] for poziv in pozivi))
+            trajanja = array('I', (poziv[3] for poziv in pozivi))
+            return brojevi, izvori, destinacije, vremena, trajanja
+
+    def ucitaj_kolone(self, brojevi, izvori, destinacije, vremena, trajanja):
+        with self.lock:
+            if self.nodes:
+                raise ValueError("ucitaj_kolone radi samo nad praznim grafom")
+
+            self._zastarele_sume()
+            for broj in brojevi:
+                self._registruj(broj)
+            for i in range(len(vremena)):
+                self._dodaj_poziv(brojevi[izvori[i]], brojevi[destinacije[i]], trajanja[i], vremena[i])
+
+    # Zbirni saobracaj: svaki poziv je u zbiru po satu jednog sharda, a brojevi samo kod
+    # svog vlasnika, pa se delovi shardova sabiraju
+
+    def najoptereceniji_sat(self, od=None, do=None):
+        with self.lock:
+            zbir = Saobracaj()
+            for deo in self._pitaj_sve('saobracaj', 'po_satu', od, do):
+                for sat, (poziva, trajanje) in deo.items():
+                    zbir.pozivi_po_satu[sat] = zbir.pozivi_po_satu.get(sat, 0) + poziva
+                    zbir.trajanje_po_satu[sat] = zbir.trajanje_po_satu.get(sat, 0) + trajanje
+            return zbir.najoptereceniji_sat()
+
+    def saobracaj_po_satu_dana(self, od=None, do=None):
+        with self.lock:
+            delovi = self._pitaj_sve('saobracaj', 'po_satu_dana', od, do)
+            return [(sum(poziva for poziva, _ in sat), sum(trajanje for _, trajanje in sat))
+                    for sat in zip(*delovi)]
+
+    def saobracaj_po_danima(self, broj=None, od=None, do=None, smer='oba'):
+        broj = self._normal_broj(broj) if broj else None
+        with self.lock:
+            if broj is not None:
+                if broj not in self.nodes:
+                    return []
+                return self._pitaj(self.vlasnik[broj], 'saobracaj', 'po_danima', broj, od, do, smer)
+
+            po_danu = {}
+            for deo in self._pitaj_sve('saobracaj', 'po_danima', None, od, do, smer):
+                for dan, poziva in deo:
+                    po_danu[dan] = po_danu.get(dan, 0) + poziva
+            return sorted(po_danu.items())
+
+    def top_brojevi_u_intervalu(self, n, od=None, do=None, smer='oba'):
+        with self.lock:
+            delovi = self._pitaj_sve('saobracaj', 'top_brojevi', n, od, do, smer)
+            return nsmallest(n, (stavka for deo in delovi for stavka in deo),
+                             key=lambda stavka: (-stavka[1], stavka[0]))
+
+    def velicine_shardova(self):
+        with self.lock:
+            return self._pitaj_sve('velicina')
+
+    def zatvori(self):
+        with self.lock:
+            for veza in self._veze:
+                try:
+                    veza.send(('kraj', (), False))
+                except OSError:
+                    pass
+            for proces in self._procesi:
+                proces.join(timeout=5)
+            for veza in self._veze:
+                veza.close()
+            self._veze = []
+            self._procesi = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.zatvori()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return f"ShardovaniGraf(shardova={self.broj_shardova}, brojeva={len(self.nodes)})"
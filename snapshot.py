@@ -0,0 +1,182 @@
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+from array import array
+
+from graph import Graph
+from trie import Trie, PhoneBookTrie
+
+# Binarni snapshot stanja centrale:
+#   zaglavlje: MAGIJA, verzija formata, broj sekcija
+#   tabela sekcija: (naziv, pomeraj, duzina) za svaku sekciju
+#   sekcije: meta (JSON), tabele stringova (brojevi, kontakti, blokirani)
+#            i kolone poziva fiksne sirine (little-endian, poravnate na 8 bajtova)
+# Trie-ovi, indeks parova i popularnost se ne cuvaju vec se prave pri ucitavanju.
+
+MAGIJA = b'TCSNAP\r\n'
+VERZIJA_FORMATA = 1
+
+ZAGLAVLJE = struct.Struct('<8sII')
+SEKCIJA = struct.Struct('<8sQQ')
+
+RAZDVAJAC_POLJA = '\x1f'
+RAZDVAJAC_ZAPISA = '\x1e'
+
+KOLONE = (
+    ('izvori', 'I'),
+    ('destin', 'I'),
+    ('vremena', 'd'),
+    ('trajanja', 'I'),
+)
+
+
+def _tabela_stringova(stringovi):
+    return RAZDVAJAC_ZAPISA.join(stringovi).encode('utf-8')
+
+
+def _iz_tabele_stringova(podaci):
+    tekst = bytes(podaci).decode('utf-8')
+    return tekst.split(RAZDVAJAC_ZAPISA) if tekst else []
+
+
+def _kolona_u_bajtove(kolona):
+    if sys.byteorder == 'big':
+        kolona = array(kolona.typecode, kolona)
+        kolona.byteswap()
+    return kolona.tobytes()
+
+
+def sacuvaj(filename, graph, kontakti, blokirani_brojevi, sekvenca_zurnala=0):
+    brojevi, izvori, destinacije, vremena, trajanja = graph.kolone()
+
+    meta = {
+        'skladiste': graph.naziv_skladista,
+        'brojeva': len(brojevi),
+        'poziva': len(vremena),
+        'kontakata': len(kontakti),
+        'zurnal': sekvenca_zurnala,  # poslednji zapis zurnala koji je sadrzan u snapshot-u
+    }
+
+    kontakti_zapisi = [RAZDVAJAC_POLJA.join((info['original_broj'], info['puno_ime'], info['ime'], info['prezime']))
+                       for info in kontakti.values()]
+
+    sekcije = [
+        (b'meta', json.dumps(meta).encode('utf-8')),
+        (b'brojevi', _tabela_stringova(brojevi)),
+        (b'kontakti', _tabela_stringova(kontakti_zapisi)),
+        (b'blokir', _tabela_stringova(sorted(blokirani_brojevi))),
+        (b'izvori', _kolona_u_bajtove(izvori)),
+        (b'destin', _kolona_u_bajtove(destinacije)),
+        (b'vremena', _kolona_u_bajtove(vremena)),
+        (b'trajanja', _kolona_u_bajtove(trajanja)),
+    ]
+
+    pomeraj = ZAGLAVLJE.size + SEKCIJA.size * len(sekcije)
+    tabela = []
+    for naziv, podaci in sekcije:
+        pomeraj += -pomeraj % 8
+        tabela.append((naziv, pomeraj, len(podaci)))
+        pomeraj += len(podaci)
+
+    # Upis u privremeni fajl pa zamena, da prekid ne ostavi polovican snapshot
+    privremeni = filename + '.tmp'
+    with open(privremeni, 'wb') as f:
+        f.write(ZAGLAVLJE.pack(MAGIJA, VERZIJA_FORMATA, len(sekcije)))
+        for naziv, pomeraj, duzina in tabela:
+            f.write(SEKCIJA.pack(naziv, pomeraj, duzina))
+        for (naziv, pomeraj, _), (_, podaci) in zip(tabela, sekcije):
+            f.write(b'\0' * (pomeraj - f.tell()))
+            f.write(podaci)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(privremeni, filename)
+
+
+def ucitaj(filename, trie_class=Trie, skladiste='kolone', graph=None):
+    # Vraca recnik u istom obliku kao stari pickle: graph, phonebook_trie, blokirani_brojevi, kontakti
+    # (i sekvenca_zurnala, od koje se nastavlja ponavljanje zurnala). Umesto novog Graph-a
+    # pozivi se mogu ucitati u zadati prazan graf (npr. shardovani_graf.ShardovaniGraf).
+    # Podrazumevano skladiste su kolone: nizovi iz fajla postaju skladiste bez pravljenja
+    # Edge/datetime objekta po pozivu, a Edge se pravi tek kad ga upit vrati
+    with open(filename, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        magija, verzija, broj_sekcija = ZAGLAVLJE.unpack_from(mm, 0)
+        if magija != MAGIJA:
+            raise ValueError(f"{filename} nije snapshot telefonske centrale")
+        if verzija > VERZIJA_FORMATA:
+            raise ValueError(f"Snapshot verzije {verzija} nije podrzan (najvise {VERZIJA_FORMATA})")
+
+        pogled = memoryview(mm)
+        sekcije = {}
+        for i in range(broj_sekcija):
+            naziv, pomeraj, duzina = SEKCIJA.unpack_from(mm, ZAGLAVLJE.size + i * SEKCIJA.size)
+            sekcije[naziv.rstrip(b'\0').decode('ascii')] = pogled[pomeraj:pomeraj + duzina]
+
+        meta = json.loads(bytes(sekcije['meta']))
+        brojevi = _iz_tabele_stringova(sekcije['brojevi'])
+        kontakti_zapisi = _iz_tabele_stringova(sekcije['kontakti'])
+        blokirani = _iz_tabele_stringova(sekcije['blokir'])
+
+        kolone = []
+        for naziv, tip in KOLONE:
+            kolona = array(tip)
+            kolona.frombytes(sekcije[naziv])
+            if sys.byteorder == 'big':
+                kolona.byteswap()
+            kolone.append(kolona)
+
+        for sekcija in sekcije.values():
+            sekcija.release()
+        pogled.release()
+    finally:
+        mm.close()
+
+    if graph is None:
+        graph = Graph(skladiste or meta['skladiste'])
+    graph.ucitaj_kolone(brojevi, *kolone)
+
+    kontakti = {}
+    for zapis in kontakti_zapisi:
+        original_broj, puno_ime, ime, prezime = zapis.split(RAZDVAJAC_POLJA)
+        broj = original_broj.replace(" ", "").replace("-", "")
+        kontakti[broj] = {
+            'ime': ime,
+            'prezime': prezime,
+            'puno_ime': puno_ime,
+            'original_broj': original_broj
+        }
+
+    # Brojevi u kontakti su jedinstveni, pa trie-ovi ne proveravaju duplikate
+    phonebook_trie = PhoneBookTrie(trie_class)
+    phonebook_trie.add_contacts((broj, info['ime'], info['prezime']) for broj, info in kontakti.items())
+
+    return {
+        'graph': graph,
+        'phonebook_trie': phonebook_trie,
+        'blokirani_brojevi': set(blokirani),
+        'kontakti': kontakti,
+        'sekvenca_zurnala': meta.get('zurnal', 0)
+    }
+
+
+def konvertuj_pickle(pickle_fajl='centrala_data.pkl', snapshot_fajl='centrala_data.snap'):
+    with open(pickle_fajl, 'rb') as f:
+        data = pickle.load(f)
+
+    sacuvaj(snapshot_fajl, data['graph'], data['kontakti'], data['blokirani_brojevi'])
+    return data
+
+
+if __name__ == '__main__':
+    ulaz = sys.argv[1] if len(sys.argv) > 1 else 'centrala_data.pkl'
+    izlaz = sys.argv[2] if len(sys.argv) > 2 else 'centrala_data.snap'
+
+    print(f"Konverzija {ulaz} -> {izlaz}...")
+    data = konvertuj_pickle(ulaz, izlaz)
+    print(f"Sacuvano {len(data['graph'])} brojeva, {len(data['graph'].skladiste)} poziva "
+          f"i {len(data['kontakti'])} kontakata.")
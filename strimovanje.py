@@ -0,0 +1,342 @@
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+VELICINA_CITANJA = 256 * 1024
+
+# Oznake koje prolaze kroz faze: TIK kada nema novih linija (da bi se poslednja serija
+# poslala i kad fajl miruje), KRAJ posle poslednjeg dela
+TIK = None
+KRAJ = object()
+
+
+def _vreme(tekst):
+    return datetime.strptime(tekst, '%d.%m.%Y %H:%M:%S')
+
+
+def _trajanje(tekst):
+    sati, minuti, sekunde = map(int, tekst.split(':'))
+    return sati * 3600 + minuti * 60 + sekunde
+
+
+class Statistika:
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.bajtova = 0
+        self.procitano = 0    # neprazne linije
+        self.neispravnih = 0
+        self.blokiranih = 0
+        self.duplikata = 0
+        self.uneto = 0
+        self.serija = 0
+
+    def proteklo(self):
+        return time.perf_counter() - self.start
+
+    def brzina(self):
+        proteklo = self.proteklo()
+        return self.procitano / proteklo if proteklo > 0 else 0.0
+
+    def __repr__(self):
+        return (f"Statistika(procitano={self.procitano}, uneto={self.uneto}, neispravnih={self.neispravnih}, "
+                f"blokiranih={self.blokiranih}, duplikata={self.duplikata})")
+
+
+# ===== Faze =====
+# Svaka faza je generator nad delovima (liste zapisa) i TIK oznakama; rad po delovima
+# umesto po zapisu drzi cenu generatora malom i kod stotina hiljada linija u sekundi.
+
+def parsiraj(delovi, stat):
+    for deo in delovi:
+        if deo is TIK:
+            yield deo
+            continue
+
+        zapisi = []
+        for linija in deo:
+            polja = linija.split(',', 4)
+            if len(polja) < 4:
+                if linija.strip():
+                    stat.procitano += 1
+                    stat.neispravnih += 1
+                continue
+            stat.procitano += 1
+            zapisi.append(polja)
+        yield zapisi
+
+
+def normalizuj(delovi, normalizuj_broj, parsiraj_vreme, parsiraj_trajanje):
+    for deo in delovi:
+        if deo is TIK:
+            yield deo
+            continue
+
+        yield [(normalizuj_broj(polja[0].strip()), normalizuj_broj(polja[1].strip()),
+                parsiraj_trajanje(polja[3].strip()), parsiraj_vreme(polja[2].strip()))
+               for polja in deo]
+
+
+def validiraj(delovi, validan, stat):
+    for deo in delovi:
+        if deo is TIK:
+            yield deo
+            continue
+
+        ispravni = [poziv for poziv in deo if validan(poziv[0]) and validan(poziv[1])]
+        stat.neispravnih += len(deo) - len(ispravni)
+        yield ispravni
+
+
+def filtriraj_blokirane(delovi, blokirani_brojevi, stat):
+    # Skup se cita pri svakom delu, pa blokada uneta za vreme pracenja odmah vazi
+    for deo in delovi:
+        if deo is TIK or not blokirani_brojevi:
+            yield deo
+            continue
+
+        dozvoljeni = [poziv for poziv in deo
+                      if poziv[0] not in blokirani_brojevi and poziv[1] not in blokirani_brojevi]
+        stat.blokiranih += len(deo) - len(dozvoljeni)
+        yield dozvoljeni
+
+
+def dedupliciraj(delovi, prozor, stat):
+    # Pamti se samo poslednjih `prozor` poziva, da memorija ne raste sa ulazom
+    videni = set()
+    redosled = deque()
+
+    for deo in delovi:
+        if deo is TIK:
+            yield deo
+            continue
+
+        jedinstveni = []
+        for poziv in deo:
+            if poziv in videni:
+                stat.duplikata += 1
+                continue
+            videni.add(poziv)
+            redosled.append(poziv)
+            if len(redosled) > prozor:
+                videni.discard(redosled.popleft())
+            jedinstveni.append(poziv)
+        yield jedinstveni
+
+
+def serije(delovi, velicina, max_cekanje):
+    # Serija ide dalje kada se napuni ili kada je najstariji poziv u njoj cekao max_cekanje
+    serija = []
+    pocetak = 0.0
+
+    for deo in delovi:
+        if deo:
+            if not serija:
+                pocetak = time.monotonic()
+            serija.extend(deo)
+
+        while len(serija) >= velicina:
+            yield serija[:velicina]
+            serija = serija[velicina:]
+            pocetak = time.monotonic()
+
+        if serija and time.monotonic() - pocetak >= max_cekanje:
+            yield serija
+            serija = []
+
+    if serija:
+        yield serija
+
+
+# Prati fajl koji raste (kao tail -f) ili standardni ulaz i unosi pozive u graf kroz faze
+# parsiranje -> normalizacija -> validacija -> blokirani -> duplikati -> serije. Citanje,
+# obrada i unos rade u posebnim nitima povezanim ogranicenim redovima, pa kada unos kasni
+# citanje staje, a memorija ostaje ista bez obzira na velicinu ulaza.
+class Prijem:
+
+    def __init__(self, graph, blokirani_brojevi, normalizuj_broj=None, validan=None, parsiraj_vreme=None,
+                 parsiraj_trajanje=None, velicina_serije=5000, max_cekanje=0.5, prozor_duplikata=100000,
+                 max_delova=16, max_serija=4, interval=0.2):
+        self.graph = graph
+        self.blokirani_brojevi = blokirani_brojevi
+        self.normalizuj_broj = normalizuj_broj or (lambda broj: broj)
+        self.validan = validan or (lambda broj: bool(broj))
+        self.parsiraj_vreme = parsiraj_vreme or _vreme
+        self.parsiraj_trajanje = parsiraj_trajanje or _trajanje
+        self.velicina_serije = velicina_serije
+        self.max_cekanje = max_cekanje
+        self.prozor_duplikata = prozor_duplikata
+        self.interval = interval
+
+        self.red_delova = queue.Queue(max_delova)
+        self.red_serija = queue.Queue(max_serija)
+        self.stop = threading.Event()
+        self.stat = Statistika()
+        self.greska = None
+
+    def zaustavi(self):
+        self.stop.set()
+
+    # ----- Citanje -----
+
+    def _stavi(self, deo):
+        # Blokira dok u redu nema mesta (backpressure), ali ne posle zaustavljanja
+        while not self.stop.is_set():
+            try:
+                self.red_delova.put(deo, timeout=self.interval)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _citaj_fajl(self, filename, prati, od_pocetka):
+        f = open(filename, 'rb')
+        try:
+            if not od_pocetka:
+                f.seek(0, os.SEEK_END)
+            pozicija = f.tell()
+            ostatak = b''
+
+            while not self.stop.is_set():
+                deo = f.read(VELICINA_CITANJA)
+                if deo:
+                    pozicija += len(deo)
+                    self.stat.bajtova += len(deo)
+                    celo, _, ostatak = (ostatak + deo).rpartition(b'\n')
+                    if celo and not self._stavi(celo.decode('utf-8', 'replace').split('\n')):
+                        return
+                    continue
+
+                if not prati:
+                    break
+
+                # Fajl je skracen ili zamenjen novim (rotacija): cita se novi od pocetka
+                try:
+                    info = os.stat(filename)
+                    if info.st_ino != os.fstat(f.fileno()).st_ino or info.st_size < pozicija:
+                        f.close()
+                        f = open(filename, 'rb')
+                        pozicija = 0
+                        ostatak = b''
+                        continue
+                except FileNotFoundError:
+                    pass
+                self.stop.wait(self.interval)
+
+            if ostatak and not self.stop.is_set():
+                self._stavi([ostatak.decode('utf-8', 'replace')])
+        finally:
+            f.close()
+
+    def _citaj_ulaz(self, ulaz):
+        # Standardni ulaz se cita red po red: readline vraca red cim stigne, a deli
+        # bafer sa input() iz menija, pa se ne gube vec baferisani redovi
+        for linija in iter(ulaz.readline, ''):
+            self.stat.bajtova += len(linija)
+            if not self._stavi([linija.rstrip('\n')]):
+                return
+
+    def _citanje(self, izvor, prati, od_pocetka):
+        try:
+            if izvor == '-':
+                self._citaj_ulaz(sys.stdin)
+            else:
+                self._citaj_fajl(izvor, prati, od_pocetka)
+        except Exception as e:
+            self.greska = e
+            self.stop.set()
+        finally:
+            self._stavi_kraj()
+
+    def _stavi_kraj(self):
+        # KRAJ mora da stigne i posle zaustavljanja, inace obrada ceka do isteka reda
+        while True:
+            try:
+                self.red_delova.put(KRAJ, timeout=self.interval)
+                return
+            except queue.Full:
+                if self.stop.is_set() and not self._obrada.is_alive():
+                    return
+
+    # ----- Obrada i unos -----
+
+    def _delovi(self):
+        while True:
+            try:
+                deo = self.red_delova.get(timeout=self.interval)
+            except queue.Empty:
+                if self.stop.is_set():
+                    return
+                yield TIK
+                continue
+            if deo is KRAJ:
+                return
+            yield deo
+
+    def _faze(self):
+        stat = self.stat
+        tok = parsiraj(self._delovi(), stat)
+        tok = normalizuj(tok, self.normalizuj_broj, self.parsiraj_vreme, self.parsiraj_trajanje)
+        tok = validiraj(tok, self.validan, stat)
+        tok = filtriraj_blokirane(tok, self.blokirani_brojevi, stat)
+        tok = dedupliciraj(tok, self.prozor_duplikata, stat)
+        return serije(tok, self.velicina_serije, self.max_cekanje)
+
+    def _obradi(self):
+        try:
+            for serija in self._faze():
+                self.red_serija.put(serija)
+        except Exception as e:
+            self.greska = e
+            self.stop.set()
+        finally:
+            self.red_serija.put(KRAJ)
+
+    def _unesi(self):
+        # Greska pri unosu zaustavlja prijem, ali se red i dalje prazni da obrada ne bi stala
+        while True:
+            serija = self.red_serija.get()
+            if serija is KRAJ:
+                return
+            if self.greska is not None:
+                continue
+            try:
+                self.graph.add_calls(serija)
+            except Exception as e:
+                self.greska = e
+                self.stop.set()
+                continue
+            self.stat.uneto += len(serija)
+            self.stat.serija += 1
+
+    def pokreni(self, izvor, prati=True, od_pocetka=True, izvestaj=None, interval_izvestaja=1.0):
+        # izvor: putanja fajla ili '-' za standardni ulaz; prati=False cita fajl samo do kraja.
+        # Blokira do kraja ulaza ili do Ctrl+C; vraca Statistika
+        self._obrada = threading.Thread(target=self._obradi, daemon=True)
+        unos = threading.Thread(target=self._unesi, daemon=True)
+        citanje = threading.Thread(target=self._citanje, args=(izvor, prati, od_pocetka), daemon=True)
+        self._obrada.start()
+        unos.start()
+        citanje.start()
+
+        try:
+            while unos.is_alive():
+                unos.join(interval_izvestaja)
+                if izvestaj is not None and unos.is_alive():
+                    izvestaj(self)
+        except KeyboardInterrupt:
+            self.zaustavi()
+            unos.join()
+
+        # Citac standardnog ulaza moze da ostane blokiran u readline; nit je daemon
+        citanje.join(self.interval * 2)
+        if self.greska is not None:
+            raise self.greska
+        return self.stat
+
+    def popunjenost(self):
+        return self.red_delova.qsize(), self.red_delova.maxsize, self.red_serija.qsize(), self.red_serija.maxsize
@@ -1,3 +1,31 @@
+import threading
+from heapq import nsmallest
+from operator import itemgetter
+
+from rw_lock import RWLock
+
+
+# Preslovljavanje cirilice u latinicu i uklanjanje dijakritika (posle lower()).
+# đ i ђ postaju "dj", a zatim se svako "dj" svodi na "d", pa "Đorđević", "Djordjevic"
+# i "Dordevic" daju isti kljuc
+SKIDANJE_AKCENATA = str.maketrans({
+    'č': 'c', 'ć': 'c', 'š': 's', 'ž': 'z', 'đ': 'dj',
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'ђ': 'dj', 'е': 'e', 'ж': 'z',
+    'з': 'z', 'и': 'i', 'ј': 'j', 'к': 'k', 'л': 'l', 'љ': 'lj', 'м': 'm', 'н': 'n',
+    'њ': 'nj', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'ћ': 'c', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'c', 'џ': 'dz', 'ш': 's',
+})
+
+
+# Top-k kesevi u cvorovima se prave za najmanje TOP_K rezultata, pa upiti za manje
+# (npr. 5 za autocomplete i 20 za pretragu) uzimaju pocetak istog kesa
+TOP_K = 20
+
+
+def fold_key(key):
+    return key.lower().translate(SKIDANJE_AKCENATA).replace('dj', 'd')
+
+
 class TrieNode:
 
     def __init__(self):
@@ -5,43 +33,116 @@ class TrieNode:
         self.is_end_of_word = False
         self.data = []
 
+        # Broj reci i podataka u podstablu ovog cvora (ukljucujuci i sam cvor)
+        self.broj_reci = 0
+        self.broj_podataka = 0
+
+        # Kes najboljih podataka podstabla: (verzija, k, [(-skor, rec, i, podatak), ...])
+        self.top = None
+
+    def __getstate__(self):
+        stanje = self.__dict__.copy()
+        stanje.pop('top', None)
+        return stanje
+
+    def __setstate__(self, stanje):
+        self.__dict__.update(stanje)
+        self.top = None
+
     def __repr__(self):
         return f"TrieNode(children={len(self.children)}, is_end={self.is_end_of_word}, data_count={len(self.data)})"
 
 
 class Trie:
 
-    def __init__(self, name="Trie"):
+    # Funkcija skora za koju vaze top-k kesevi u cvorovima i njihova verzija
+    _rank_score = None
+    _rank_version = 0
+
+    # Sa fold=True kljucevi se cuvaju bez akcenata i u latinici (za imena), a podatak
+    # ostaje u originalnom obliku
+    fold = False
+
+    def __init__(self, name="Trie", fold=False):
         self.root = TrieNode()
         self.name = name
+        self.fold = fold
+
+    def __getstate__(self):
+        stanje = self.__dict__.copy()
+        stanje.pop('_rank_score', None)
+        return stanje
+
+    def __setstate__(self, stanje):
+        # Stariji pickle fajlovi nemaju brojace u cvorovima
+        self.__dict__.update(stanje)
+        if not hasattr(self.root, 'broj_podataka'):
+            self._prebroj()
+
+    def _prebroj(self):
+        # Brojaci i top-k kesevi svih cvorova iz pocetka (stari pickle, posle masovnog unosa)
+        redosled = []
+        stek = [self.root]
+        while stek:
+            node = stek.pop()
+            redosled.append(node)
+            stek.extend(node.children.values())
+
+        # Deca su u redosledu posle roditelja, pa obrnut prolaz racuna podstabla odozdo
+        for node in reversed(redosled):
+            node.broj_reci = 1 if node.is_end_of_word else 0
+            node.broj_podataka = len(node.data or ())
+            node.top = None
+            for child in node.children.values():
+                node.broj_reci += child.broj_reci
+                node.broj_podataka += child.broj_podataka
 
     def _normalize_key(self, key):
 
         if isinstance(key, str):
             key = key.replace(" ", "").replace("-", "")
             if not key.isdigit():
-                key = key.lower()
+                key = fold_key(key) if self.fold else key.lower()
         return key
 
-    def insert(self, key, data=None):
+    def insert(self, key, data=None, novi=False):
+        # novi=True je masovni unos: pozivalac zna da podatak jos nije u trie-u, pa se
+        # preskace linearna provera duplikata, a brojace i keseve na putanji posle svih
+        # unosa jednom racuna _prebroj()
         key = self._normalize_key(key)
 
         if not key:
             return
 
         node = self.root
-
+        putanja = [node]
 
         for char in key:
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = TrieNode()
+            node = child
+            putanja.append(node)
 
+        nova_rec = not node.is_end_of_word
         node.is_end_of_word = True
 
+        if novi:
+            if data is not None:
+                node.data.append(data)
+            return
+
+        novi_podatak = False
         if data is not None:
             if data not in node.data:
                 node.data.append(data)
+                novi_podatak = True
+
+        if nova_rec or novi_podatak:
+            for cvor in putanja:
+                cvor.broj_reci += nova_rec
+                cvor.broj_podataka += novi_podatak
+                cvor.top = None
 
     def search(self, key):
 
@@ -58,63 +159,268 @@ class Trie:
             return node.data
         return None
 
-    def starts_with(self, prefix, max_results=None):
-
-        prefix = self._normalize_key(prefix)
-
+    def _find_node(self, key):
         node = self.root
 
-        for char in prefix:
+        for char in key:
             if char not in node.children:
-                return []
+                return None
             node = node.children[char]
 
-        results = []
-        self._collect_all_words(node, prefix, results)
+        return node
 
-        if max_results:
-            results = results[:max_results]
+    def _locate(self, prefix):
+        # (cvor, rec do tog cvora) za vec normalizovan prefiks
+        return self._find_node(prefix), prefix
 
-        return results
+    def count_prefix(self, prefix):
+        # Broj (rec, podatak) parova sa datim prefiksom, isto sto i len(starts_with(prefix))
+        node = self._find_node(self._normalize_key(prefix))
+        return node.broj_podataka if node else 0
+
+    def count_words(self, prefix=""):
+        node = self._find_node(self._normalize_key(prefix))
+        return node.broj_reci if node else 0
 
-    def _collect_all_words(self, node, current_word, results):
+    def starts_with(self, prefix, max_results=None, ordered=False):
 
+        return list(self.iter_starts_with(prefix, max_results, ordered))
+
+    def iter_starts_with(self, prefix, max_results=None, ordered=False):
+        # Generator (rec, podatak) parova; staje cim vrati max_results rezultata,
+        # a sa ordered=True reci idu leksikografskim redom umesto redom dodavanja
+        prefix = self._normalize_key(prefix)
+
+        node, word = self._locate(prefix)
+        if node is None:
+            return
+
+        yield from self._iter_words(node, word, max_results, ordered)
+
+    def _iter_words(self, node, current_word, max_results=None, ordered=False):
+
+        preostalo = max_results or None
+        stek = [(node, current_word)]
+
+        while stek:
+            node, current_word = stek.pop()
+
+            if node.is_end_of_word:
+                for data in node.data: #zato sto jedno ime moze imati vise brojeva tj vise data
+                    yield current_word, data
+                    if preostalo is not None:
+                        preostalo -= 1
+                        if preostalo == 0:
+                            return
+
+            children = sorted(node.children.items()) if ordered else node.children.items()
+            # Na stek idu obrnutim redom da bi se prvo dete obradilo prvo
+            for char, child_node in reversed(list(children)):
+                stek.append((child_node, current_word + char))
+
+    def autocomplete(self, prefix, max=5, ordered=False):
+
+        return self.starts_with(prefix, max_results=max, ordered=ordered)
+
+
+    def ranked(self, prefix, score, max_results=5, skorovi=None):
+        # Najboljih max_results (rec, podatak) parova po score(podatak); kesirano po cvoru,
+        # pa je upit O(prefix + k) dok se skorovi ne promene. skorovi ({id(podatak): skor})
+        # su unapred izracunati skorovi za podatke iz bez_skora(), pa se score tada ne zove
+        prefix = self._normalize_key(prefix)
+
+        node, word = self._locate(prefix)
+        if node is None:
+            return []
+
+        if score is not self._rank_score:
+            self._rank_score = score
+            self._rank_version += 1
+
+        if skorovi is not None:
+            score = lambda data: skorovi[id(data)]
+        top = self._top(node, word, max(max_results, TOP_K), score)
+        return [(word, data) for _, word, _, data in top[:max_results]]
+
+    def bez_skora(self, prefix, score, max_results=5):
+        # Podaci za koje bi ranked(prefix, score, max_results) zvao score, tj. podaci iz
+        # podstabala bez vazeceg top-k kesa
+        node, _ = self._locate(self._normalize_key(prefix))
+        if node is None:
+            return []
+
+        vazeci = score is self._rank_score
+        k = max(max_results, TOP_K)
+        podaci = []
+        stek = [node]
+        while stek:
+            node = stek.pop()
+            kes = node.top
+            if vazeci and kes is not None and kes[0] == self._rank_version and kes[1] >= k:
+                continue
+            if node.is_end_of_word and node.data:
+                podaci.extend(node.data)
+            stek.extend(child for _, child in self._edges(node))
+        return podaci
+
+    def _top(self, node, current_word, k, score):
+        kes = node.top
+        if kes is not None and kes[0] == self._rank_version and kes[1] >= k:
+            return kes[2]
+
+        kandidati = []
         if node.is_end_of_word:
-            for data in node.data: #zato sto jedno ime moze imati vise brojeva tj vise data
-                results.append((current_word, data))
+            kandidati = [(-score(data), current_word, i, data) for i, data in enumerate(node.data)]
 
         for char, child_node in node.children.items():
-            self._collect_all_words(child_node, current_word + char, results)
+            kandidati.extend(self._top(child_node, current_word + char, k, score))
 
-    def autocomplete(self, prefix, max=5):
-
-        return self.starts_with(prefix, max_results=max)
+        top = nsmallest(k, kandidati, key=itemgetter(0, 1, 2))
+        node.top = (self._rank_version, k, top)
+        return top
 
+    def invalidate(self, key):
+        # Skor podataka pod kljucem se promenio, brisu se samo kesevi na putanji do njega
+        key = self._normalize_key(key)
 
-    def get_all_entries(self):
+        node = self.root
+        node.top = None
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return
+            node.top = None
+
+    def invalidate_all(self):
+        self._rank_version += 1
+
+    def _edges(self, node):
+        # (oznaka grane, dete); kod obicnog trie-a oznaka je jedan karakter
+        return node.children.items()
+
+    def fuzzy_search(self, query, max_edits=1, max_results=None, prefix=False):
+        # Reci na Levenshtein rastojanju <= max_edits od upita, kao (rec, podatak, rastojanje).
+        # Uz trie se nosi jedan red DP tabele, a grana se odseca cim je minimum reda > max_edits.
+        # Sa prefix=True rastojanje je najmanje rastojanje upita do nekog prefiksa reci, pa se
+        # uz red nosi i najmanji row[-1] na putanji
+        query = self._normalize_key(query)
+        if not query:
+            return []
 
         results = []
-        self._collect_all_words(self.root, "", results)
+        prvi_red = list(range(len(query) + 1))
+        stek = [(self.root, "", prvi_red, prvi_red[-1])]
+
+        while stek:
+            node, current_word, row, najblizi = stek.pop()
+
+            for label, child_node in self._edges(node):
+                word = current_word + label
+                child_row = row
+                child_najblizi = najblizi
+                for char in label:
+                    prethodni = child_row
+                    child_row = [prethodni[0] + 1]
+                    for j, q_char in enumerate(query, 1):
+                        child_row.append(min(child_row[j - 1] + 1,
+                                             prethodni[j] + 1,
+                                             prethodni[j - 1] + (q_char != char)))
+                    child_najblizi = min(child_najblizi, child_row[-1])
+                    if min(child_row) > max_edits:
+                        break
+                else:
+                    rastojanje = child_najblizi if prefix else child_row[-1]
+                    if rastojanje <= max_edits and child_node.is_end_of_word:
+                        for data in child_node.data or ():
+                            results.append((word, data, rastojanje))
+
+                    stek.append((child_node, word, child_row, child_najblizi))
+                    continue
+
+                if prefix and child_najblizi <= max_edits:
+                    # Dalje se rastojanje do prefiksa ne moze smanjiti (svaki sledeci red ima
+                    # minimum > max_edits), pa sve reci u podstablu imaju child_najblizi
+                    for match_word, data in self._iter_words(child_node, word):
+                        results.append((match_word, data, child_najblizi))
+
+        results.sort(key=lambda x: x[2])
+        if max_results:
+            results = results[:max_results]
         return results
 
+    def get_all_entries(self):
+
+        return list(self._iter_words(self.root, ""))
+
     def size(self):
-        return len([x for x in self.get_all_entries()])
+        return self.root.broj_podataka
 
     def __len__(self):
         return self.size()
 
     def __repr__(self):
-        return f"Trie(name='{self.name}', size={self.size()})"
+        return f"{type(self).__name__}(name='{self.name}', size={self.size()})"
 
 
 class PhoneBookTrie:
 
-    def __init__(self):
-        self.phone_trie = Trie("Phone Numbers")
-        self.first_name_trie = Trie("First Names")
-        self.last_name_trie = Trie("Last Names")
+    def __init__(self, trie_class=Trie):
+        # trie_class moze biti i radix_trie.RadixTrie (manje memorije za velike imenike)
+        self.phone_trie = trie_class("Phone Numbers")
+        self.first_name_trie = trie_class("First Names", fold=True)
+        self.last_name_trie = trie_class("Last Names", fold=True)
+        self._napravi_brave()
+
+    def _napravi_brave(self):
+        # Kao kod Graph: dodavanje kontakta pise, pretrage citaju, a top-k kesevi
+        # rangiranih pretraga se menjaju jedan po jedan pod rang_lock.
+        #
+        # Redosled brava u celom programu: Graph.lock (citanje), Graph.rang_lock,
+        # PhoneBookTrie.lock, PhoneBookTrie.rang_lock. Funkcija skora rangirane pretrage
+        # cita graf (a citanje grafa moze da ceka lock za pisanje zbog suma pozivalaca), pa
+        # se nikad ne zove pod bravama imenika: skorovi se racunaju pre, a pod rang_lock
+        # se samo upisuju u keseve
+        self.lock = RWLock()
+        self.rang_lock = threading.Lock()
+        self._osvezavanja = 0  # broj refresh_scores poziva, menja se pod rang_lock
+
+    def __getstate__(self):
+        stanje = self.__dict__.copy()
+        stanje.pop('lock', None)
+        stanje.pop('rang_lock', None)
+        return stanje
+
+    def __setstate__(self, stanje):
+        self.__dict__.update(stanje)
+        # Stariji pickle fajlovi imaju trie-ove imena bez fold (kljucevi samo u malim slovima),
+        # pa se njihovi unosi ponovo ubacuju kroz fold_key
+        for atribut in ('first_name_trie', 'last_name_trie'):
+            trie = getattr(self, atribut)
+            if not trie.fold:
+                setattr(self, atribut, self._sa_fold(trie))
+        self._napravi_brave()
+
+    @staticmethod
+    def _sa_fold(trie):
+        trie_fold = type(trie)(trie.name, fold=True)
+        for rec, data in trie._iter_words(trie.root, ""):
+            trie_fold.insert(rec, data, novi=True)
+        trie_fold._prebroj()
+        return trie_fold
 
     def add_contact(self, phone_number, first_name=None, last_name=None):
+        with self.lock.za_pisanje():
+            self._add_contact(phone_number, first_name, last_name)
+
+    def add_contacts(self, kontakti):
+        # Masovni unos (broj, ime, prezime) za razlicite brojeve koji jos nisu u imeniku
+        with self.lock.za_pisanje():
+            for phone_number, first_name, last_name in kontakti:
+                self._add_contact(phone_number, first_name, last_name, novi=True)
+            for trie in (self.phone_trie, self.first_name_trie, self.last_name_trie):
+                trie._prebroj()
+
+    def _add_contact(self, phone_number, first_name=None, last_name=None, novi=False):
 
         contact_data = {
             'phone': phone_number,
@@ -122,39 +428,104 @@ class PhoneBookTrie:
             'last_name': last_name
         }
 
-        self.phone_trie.insert(phone_number, contact_data)
+        self.phone_trie.insert(phone_number, contact_data, novi)
 
         if first_name:
-            self.first_name_trie.insert(first_name, contact_data)
+            self.first_name_trie.insert(first_name, contact_data, novi)
 
         if last_name:
-            self.last_name_trie.insert(last_name, contact_data)
+            self.last_name_trie.insert(last_name, contact_data, novi)
 
-    def search_by_phone(self, phone_prefix):
-        return self.phone_trie.starts_with(phone_prefix)
+    def search_by_phone(self, phone_prefix, max_results=None, ordered=False):
+        with self.lock.za_citanje():
+            return self.phone_trie.starts_with(phone_prefix, max_results, ordered)
 
-    def search_by_first_name(self, name_prefix):
-        return self.first_name_trie.starts_with(name_prefix)
+    def search_by_first_name(self, name_prefix, max_results=None, ordered=False):
+        with self.lock.za_citanje():
+            return self.first_name_trie.starts_with(name_prefix, max_results, ordered)
 
-    def search_by_last_name(self, name_prefix):
-        return self.last_name_trie.starts_with(name_prefix)
+    def search_by_last_name(self, name_prefix, max_results=None, ordered=False):
+        with self.lock.za_citanje():
+            return self.last_name_trie.starts_with(name_prefix, max_results, ordered)
 
-    def search_all(self, query):
+    def search_all(self, query, max_results=None, ordered=False):
 
         return {
-            'phones': self.search_by_phone(query),
-            'first_names': self.search_by_first_name(query),
-            'last_names': self.search_by_last_name(query)
+            'phones': self.search_by_phone(query, max_results, ordered),
+            'first_names': self.search_by_first_name(query, max_results, ordered),
+            'last_names': self.search_by_last_name(query, max_results, ordered)
         }
 
-    def autocomplete_phone(self, prefix, max_suggestions=5):
-        return self.phone_trie.autocomplete(prefix, max_suggestions)
-
-    def autocomplete_first_name(self, prefix, max_suggestions=5):
-        return self.first_name_trie.autocomplete(prefix, max_suggestions)
+    def autocomplete_phone(self, prefix, max_suggestions=5, ordered=False):
+        with self.lock.za_citanje():
+            return self.phone_trie.autocomplete(prefix, max_suggestions, ordered)
+
+    def autocomplete_first_name(self, prefix, max_suggestions=5, ordered=False):
+        with self.lock.za_citanje():
+            return self.first_name_trie.autocomplete(prefix, max_suggestions, ordered)
+
+    def autocomplete_last_name(self, prefix, max_suggestions=5, ordered=False):
+        with self.lock.za_citanje():
+            return self.last_name_trie.autocomplete(prefix, max_suggestions, ordered)
+
+    def ranked_autocomplete_phone(self, prefix, score, max_suggestions=5):
+        return self._ranked(self.phone_trie, prefix, score, max_suggestions)
+
+    def ranked_autocomplete_first_name(self, prefix, score, max_suggestions=5):
+        return self._ranked(self.first_name_trie, prefix, score, max_suggestions)
+
+    def ranked_autocomplete_last_name(self, prefix, score, max_suggestions=5):
+        return self._ranked(self.last_name_trie, prefix, score, max_suggestions)
+
+    def _ranked(self, trie, prefix, score, max_suggestions):
+        # Skorovi za podatke bez vazeceg kesa se racunaju bez brava imenika (vidi
+        # _napravi_brave). Ako su se u medjuvremenu skorovi osvezili ili kesevi obrisali za
+        # podatke bez skora, racuna se ponovo
+        skorovi = {}
+        while True:
+            with self.lock.za_citanje():
+                osvezavanja = self._osvezavanja
+                podaci = trie.bez_skora(prefix, score, max_suggestions)
+
+            for data in podaci:
+                if id(data) not in skorovi:
+                    skorovi[id(data)] = score(data)
+
+            with self.lock.za_citanje(), self.rang_lock:
+                if self._osvezavanja != osvezavanja:
+                    skorovi = {}
+                elif all(id(data) in skorovi for data in trie.bez_skora(prefix, score, max_suggestions)):
+                    return trie.ranked(prefix, score, max_suggestions, skorovi)
+
+    def fuzzy_search(self, query, max_edits=1, max_results=None, prefix=False):
+        # Pretraga imena i prezimena otporna na greske u kucanju
+        with self.lock.za_citanje():
+            return {
+                'first_names': self.first_name_trie.fuzzy_search(query, max_edits, max_results, prefix),
+                'last_names': self.last_name_trie.fuzzy_search(query, max_edits, max_results, prefix)
+            }
+
+    def refresh_scores(self, phones=None):
+        # phones=None znaci da su se promenili svi skorovi
+        with self.lock.za_citanje(), self.rang_lock:
+            self._refresh_scores(phones)
+
+    def _refresh_scores(self, phones):
+        if phones is None or phones:
+            self._osvezavanja += 1
+        if phones is None:
+            self.phone_trie.invalidate_all()
+            self.first_name_trie.invalidate_all()
+            self.last_name_trie.invalidate_all()
+            return
 
-    def autocomplete_last_name(self, prefix, max_suggestions=5):
-        return self.last_name_trie.autocomplete(prefix, max_suggestions)
+        for phone in phones:
+            for contact_data in self.phone_trie.search(phone) or ():
+                self.phone_trie.invalidate(phone)
+                if contact_data['first_name']:
+                    self.first_name_trie.invalidate(contact_data['first_name'])
+                if contact_data['last_name']:
+                    self.last_name_trie.invalidate(contact_data['last_name'])
 
     def __repr__(self):
         return (f"PhoneBookTrie(\n"
@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+EPOHA = datetime(1970, 1, 1)
+
+# Tipovi zapisa u zurnalu
+POZIV = 'P'
+KONTAKT = 'K'
+BLOKIRAN = 'B'
+ODBLOKIRAN = 'O'
+
+
+# Zurnal promena (write-ahead log) koji se samo dopisuje. Svaki red je JSON niz
+# [sekvenca, tip, polja...] i CRC32 tog niza, pa se polovican poslednji red posle pada
+# prepoznaje i odseca. fsync se radi na svakih fsync_svakih zapisa ili kada od
+# prethodnog prodje fsync_interval sekundi (proverava se pri sledecem zapisu).
+class Zurnal:
+
+    def __init__(self, filename, sekvenca=0, fsync_svakih=256, fsync_interval=1.0):
+        self.filename = filename
+        self.fsync_svakih = fsync_svakih
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+
+        # Postojeci ispravni zapisi ostaju, a ostatak posle njih (polovican red) se brise
+        zapisi, kraj = procitaj(filename)
+        self.sekvenca = max([sekvenca] + [zapis[0] for zapis in zapisi])
+        self.broj_zapisa = len(zapisi)
+
+        self.f = open(filename, 'ab')
+        self.f.truncate(kraj)
+        self.na_cekanju = 0
+        self.poslednji_fsync = time.monotonic()
+
+    def _zapisi(self, tip, *polja):
+        with self.lock:
+            self.sekvenca += 1
+            telo = json.dumps([self.sekvenca, tip, *polja], ensure_ascii=False).encode('utf-8')
+            self.f.write(b'%s\t%08x\n' % (telo, zlib.crc32(telo)))
+            self.broj_zapisa += 1
+            self.na_cekanju += 1
+
+            if (self.na_cekanju >= self.fsync_svakih
+                    or time.monotonic() - self.poslednji_fsync >= self.fsync_interval):
+                self._fsync()
+
+    def _fsync(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.na_cekanju = 0
+        self.poslednji_fsync = time.monotonic()
+
+    def zapisi_poziv(self, caller, callee, trajanje, timestamp):
+        self._zapisi(POZIV, caller, callee, trajanje, (timestamp - EPOHA).total_seconds())
+
+    def zapisi_kontakt(self, puno_ime, original_broj):
+        self._zapisi(KONTAKT, puno_ime, original_broj)
+
+    def zapisi_blokadu(self, broj, blokiran=True):
+        self._zapisi(BLOKIRAN if blokiran else ODBLOKIRAN, broj)
+
+    def sinhronizuj(self):
+        with self.lock:
+            if self.na_cekanju:
+                self._fsync()
+
+    def isprazni(self):
+        # Posle checkpoint-a (snapshot sa sekvencom) zurnal vise nije potreban
+        with self.lock:
+            self.f.flush()
+            self.f.truncate(0)
+            os.fsync(self.f.fileno())
+            self.broj_zapisa = 0
+            self.na_cekanju = 0
+
+    def zatvori(self):
+        self.sinhronizuj()
+        self.f.close()
+
+    def __repr__(self):
+        return f"Zurnal(filename='{self.filename}', sekvenca={self.sekvenca}, zapisa={self.broj_zapisa})"
+
+
+def procitaj(filename):
+    # Vraca (ispravni zapisi, pomeraj posle poslednjeg ispravnog); staje na prvom losem redu
+    zapisi = []
+    kraj = 0
+
+    if not os.path.exists(filename):
+        return zapisi, kraj
+
+    with open(filename, 'rb') as f:
+        for red in f:
+            if not red.endswith(b'\n'):
+                break
+            telo, _, crc = red[:-1].rpartition(b'\t')
+            try:
+                if int(crc, 16) != zlib.crc32(telo):
+                    break
+                zapisi.append(json.loads(telo))
+            except ValueError:
+                break
+            kraj += len(red)
+
+    return zapisi, kraj
+
+
+def vreme_zapisa(epoha_sekunde):
+    return EPOHA + timedelta(seconds=epoha_sekunde)